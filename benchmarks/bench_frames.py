@@ -0,0 +1,258 @@
+# * Library imports
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Runs without a display or camera
+os.environ.setdefault("MPLBACKEND", "Agg")
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# * File imports
+from src.data_handling import RAW_TO_TEMP_GAIN, RAW_TO_TEMP_OFFSET, divide_into_quadrants, get_quadrant_statistics
+from src.data_recording import ThermalRecorder, ThrmReader, iter_frames
+from src.data_visualization import DataToImage
+from src.data_visualization.render_engine import RenderEngine
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+BASELINE_VERSION = 1
+SIZES = {"640x512": (512, 640), "1280x1024": (1024, 1280)}
+# Polygon in display coordinates (DataToImage.heatmap_scale), roughly the middle third of the frame
+POLYGON = [(200, 150), (440, 140), (500, 260), (430, 380), (210, 370), (150, 260)]
+
+
+class Benchmark:
+    def __init__(self, min_time: float = 0.5, max_iterations: int = 2000, warmup: int = 3,
+                 only: Optional[str] = None):
+        """
+        Time callables and collect the results.
+
+        Every case is called warmup times, then repeatedly until min_time has
+        passed or max_iterations calls were made. The median call time is the
+        figure compared against the baseline, p95 and min show the spread.
+
+        Args:
+            min_time: Seconds spent timing each case
+            max_iterations: Upper bound on timed calls per case
+            warmup: Untimed calls first (allocation, caches, lazy setup)
+            only: Run only cases whose name contains this
+        """
+        self.min_time = min_time
+        self.max_iterations = max_iterations
+        self.warmup = warmup
+        self.only = only
+        self.results: Dict[str, dict] = {}
+
+    def run(self, name: str, function: Callable[[], object], frames: int = 1, bytes_per_call: int = 0,
+            max_iterations: Optional[int] = None):
+        """Time function(), frames and bytes_per_call give the per-call work for the throughput columns."""
+        if self.only is not None and self.only not in name:
+            return None
+        for _ in range(self.warmup):
+            function()
+
+        max_iterations = max_iterations or self.max_iterations
+        times = []
+        started = time.perf_counter()
+        while len(times) < max_iterations and (time.perf_counter() - started < self.min_time or len(times) < 3):
+            call_started = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - call_started)
+
+        times = np.array(times)
+        median = float(np.median(times))
+        result = {
+            "iterations": len(times),
+            "median_ms": median * 1000,
+            "p95_ms": float(np.percentile(times, 95)) * 1000,
+            "min_ms": float(times.min()) * 1000,
+            "frames_per_s": frames / median if median else 0.0,
+        }
+        if bytes_per_call:
+            result["mb_per_s"] = bytes_per_call / median / 1e6 if median else 0.0
+        self.results[name] = result
+        print(f"{name:<40} {result['median_ms']:>10.3f} ms  p95 {result['p95_ms']:>9.3f} ms  "
+              f"{result['frames_per_s']:>10.1f} frames/s")
+        return result
+
+
+def make_frames(shape: Tuple[int, int], count: int = 8, seed: int = 0) -> np.ndarray:
+    """Raw uint16 counts resembling a scene between ~20 and ~60 °C with a hot spot and sensor noise."""
+    rng = np.random.default_rng(seed)
+    rows, cols = shape
+    y, x = np.mgrid[0:rows, 0:cols]
+    spot = np.exp(-((y - rows / 2) ** 2 + (x - cols / 2) ** 2) / (2 * (rows / 8) ** 2))
+    base = (20.0 + 40.0 * spot - RAW_TO_TEMP_OFFSET) / RAW_TO_TEMP_GAIN
+    return np.stack([(base + rng.normal(0, 4, shape)).astype(np.uint16) for _ in range(count)])
+
+
+def new_data_to_image(workdir: Path) -> DataToImage:
+    """DataToImage with a polygon, its export directory inside workdir."""
+    # DataToImage creates ./data/exports in the working directory
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        image = DataToImage(headless=True, record_summary=False)
+    finally:
+        os.chdir(cwd)
+    image.output_dir = workdir / "exports"
+    image.output_dir.mkdir(parents=True, exist_ok=True)
+    image.polygon_points = list(POLYGON)
+    return image
+
+
+def bench_size(bench: Benchmark, label: str, shape: Tuple[int, int], workdir: Path, record_frames: int):
+    frames = make_frames(shape)
+    temperatures = RAW_TO_TEMP_GAIN * frames.astype(np.float64) + RAW_TO_TEMP_OFFSET
+    frame_bytes = frames[0].nbytes
+    counter = iter(range(1 << 62))
+
+    # Raw counts to °C, as in ProcessData
+    bench.run(f"convert/{label}", lambda: RAW_TO_TEMP_GAIN * frames[next(counter) % len(frames)] + RAW_TO_TEMP_OFFSET)
+
+    image = new_data_to_image(workdir)
+    bench.run(f"polygon_matrix/{label}", lambda: image.get_polygon_matrix(temperatures[next(counter) % len(frames)]))
+
+    def quadrant_statistics():
+        # get_quadrant_statistics prints every call, the print is part of its cost
+        with contextlib.redirect_stdout(io.StringIO()):
+            q1, q2, q3, q4, _, _ = divide_into_quadrants(temperatures[next(counter) % len(frames)])
+            get_quadrant_statistics(q1, q2, q3, q4)
+    bench.run(f"quadrant_stats/{label}", quadrant_statistics)
+
+    engine = RenderEngine(colormap="jet", range_mode="smoothed", output_size=(640, 512))
+    bench.run(f"render_engine/{label}", lambda: engine.render(temperatures[next(counter) % len(frames)]))
+    bench.run(f"render_frame/{label}", lambda: image.render_frame(temperatures[next(counter) % len(frames)]))
+
+    # write_frame is the raw buffer subscriber on the capture path, it only queues the frame.
+    # Fewer calls than the recorder queue holds, so no call takes the drop path.
+    image.start_recording()
+    bench.run(f"write_frame/{label}", lambda: image.write_frame(frames[next(counter) % len(frames)]),
+              bytes_per_call=frame_bytes, max_iterations=200)
+    image.stop_recording()
+
+    for codec in (None, "zlib"):
+        name = codec or "raw"
+        path = workdir / f"bench_{label}_{name}.bin"
+
+        def record():
+            # Submit to file closed, the recorder thread's full write path
+            recorder = ThermalRecorder(path, shape, codec=codec, max_queue=record_frames + 1)
+            recorder.start()
+            for i in range(record_frames):
+                recorder.submit(frames[i % len(frames)], timestamp=float(i))
+            recorder.stop()
+            recorder.join()
+        bench.run(f"record_{name}/{label}", record, frames=record_frames, bytes_per_call=record_frames * frame_bytes)
+
+        if not path.exists():
+            continue
+
+        def read_sequential():
+            # Opened per call so compressed chunks are decoded every time, not served from the chunk cache
+            with ThrmReader(path) as reader:
+                for i in range(len(reader)):
+                    np.asarray(reader.frame(i)).sum()
+        bench.run(f"read_{name}/{label}", read_sequential, frames=record_frames,
+                  bytes_per_call=record_frames * frame_bytes)
+
+        def read_temperatures():
+            for _ in iter_frames(path):
+                pass
+        bench.run(f"iter_frames_{name}/{label}", read_temperatures, frames=record_frames,
+                  bytes_per_call=record_frames * frame_bytes)
+
+
+def machine_info() -> dict:
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results: Dict[str, dict], baseline: dict, threshold: float) -> List[Tuple[str, float, float, float]]:
+    """
+    (name, baseline ms, current ms, ratio) of every case in both runs, ratio = current / baseline.
+
+    Prints a table and marks ratios above 1 + threshold as regressions and
+    below 1 / (1 + threshold) as improvements.
+    """
+    rows = []
+    print(f"\n{'case':<40} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, result in results.items():
+        if name not in baseline["results"]:
+            print(f"{name:<40} {'-':>10} {result['median_ms']:>10.3f} {'new':>7}")
+            continue
+        before = baseline["results"][name]["median_ms"]
+        ratio = result["median_ms"] / before if before else float("inf")
+        mark = "  REGRESSION" if ratio > 1 + threshold else "  faster" if ratio < 1 / (1 + threshold) else ""
+        print(f"{name:<40} {before:>10.3f} {result['median_ms']:>10.3f} {ratio:>7.2f}{mark}")
+        rows.append((name, before, result["median_ms"], ratio))
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the frame hot paths without a camera")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES),
+                        help="Frame sizes to benchmark")
+    parser.add_argument("--only", default=None, metavar="SUBSTRING", help="Run only cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds spent timing each case")
+    parser.add_argument("--record-frames", type=int, default=64, help="Frames per recording in the record/read cases")
+    parser.add_argument("--output", default=None, metavar="PATH", help="Write the results as JSON")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write the results to {BASELINE_PATH.name}")
+    parser.add_argument("--compare", nargs="?", const=str(BASELINE_PATH), default=None, metavar="BASELINE",
+                        help="Compare against a baseline file (default baseline.json), exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Relative slowdown of the median counted as a regression")
+    args = parser.parse_args(argv)
+
+    bench = Benchmark(min_time=args.min_time, only=args.only)
+    workdir = Path(tempfile.mkdtemp(prefix="thermal_bench_"))
+    try:
+        for label in args.sizes:
+            bench_size(bench, label, SIZES[label], workdir, args.record_frames)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {"version": BASELINE_VERSION, "machine": machine_info(),
+              "settings": {"min_time": args.min_time, "record_frames": args.record_frames},
+              "results": bench.results}
+    for path in ([args.output] if args.output else []) + ([BASELINE_PATH] if args.save_baseline else []):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=1, sort_keys=True)
+        print(f"Results written to {path}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if baseline.get("version") != BASELINE_VERSION:
+            print(f"Unsupported baseline version {baseline.get('version')}")
+            return 2
+        print(f"Baseline from {baseline['machine']['created']} on {baseline['machine']['processor']} "
+              f"({baseline['machine']['platform']})")
+        regressions = [row for row in compare(bench.results, baseline, args.threshold)
+                       if row[3] > 1 + args.threshold]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold * 100:.0f}%")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,35 +1,168 @@
 # * Library imports
 import sys
+import signal
 import asyncio
+import argparse
 import PySpin
-import matplotlib
-
-if sys.platform == 'darwin':
-    matplotlib.use('MacOSX')
-else:
-    matplotlib.use('TkAgg')
 
 # * File imports
-from src.calibration import set_calibration, get_all_nodes
-from src.data_acquisition import DataCapture
-from src.data_handling import ProcessData, DataCumulated, DataExport
-from src.data_visualization import DataToImage, DataAverage
+from src.calibration import set_calibration, get_all_nodes, load_profiles, ProfileManager
+from src.data_acquisition import DataCapture, DataReplay, load_header_layout
+from src.data_handling import ProcessData, DataExport
+from src.data_recording import parse_time
+from src.data_visualization import DataToImage
+from src.util_functions import (MetricsReporter, metrics, tracer, runtime_profiler, PROFILE_MODES, PipelineConfig,
+                                load_pipeline_config, STAGES)
+
+
+def time_argument(value: str):
+    # parse_time as an argparse type, a bad --from/--to is a usage error before anything starts
+    try:
+        return parse_time(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def select_chart_backend():
+    # Only the chart stages use matplotlib, it is imported when one of them is enabled
+    import matplotlib
+
+    if sys.platform == 'darwin':
+        matplotlib.use('MacOSX')
+    else:
+        matplotlib.use('TkAgg')
+
 
 class Camera:
-    def __init__(self):
-        self.system: any = PySpin.System.GetInstance()
-        self.camera_list: any = self.system.GetCameras()
-        self.camera: any = self.camera_list.GetByIndex(0) if self.camera_list.GetSize() > 0 else None
+    def __init__(self, pipeline: PipelineConfig = None, record_codec: str = None,
+                 record_sparse: bool = False, replay: str = None, replay_speed: float = 1.0,
+                 replay_loop: bool = False, replay_from: str = None, replay_to: str = None,
+                 snapshot: str = None, profile: str = None, fpa_drift: float = 0.0, header_layout: dict = None,
+                 metrics_file: str = "./data/exports/metrics.json", trace_every: int = 8,
+                 profiler_seconds: float = 10.0, profiler_mode: str = "sampling"):
         self.dev_mode: bool = False
+        self.pipeline: PipelineConfig = pipeline if pipeline is not None else PipelineConfig()
+        self.pipeline.validate()
+        self.headless: bool = not self.pipeline.enabled("display")
+        self.replay: str = replay
+        self.snapshot: str = snapshot
+        self.initial_profile: str = profile
+
+        if replay is None:
+            self.system: any = PySpin.System.GetInstance()
+            self.camera_list: any = self.system.GetCameras()
+            self.camera: any = self.camera_list.GetByIndex(0) if self.camera_list.GetSize() > 0 else None
+            self.data_capture = DataCapture(camera=self.camera, header_layout=header_layout)
+        else:
+            # Recorded frames stand in for the camera, the rest of the pipeline is unchanged
+            self.system = self.camera_list = self.camera = None
+            self.data_capture = DataReplay(replay, speed=replay_speed, loop=replay_loop,
+                                           start_time=replay_from, stop_time=replay_to, header_layout=header_layout)
+
+        self.data_process = ProcessData(drift_coefficient=fpa_drift)
+        if fpa_drift and not (header_layout and "fpa_temperature" in header_layout):
+            print("Warning: --fpa-drift needs a --header-layout with an fpa_temperature field, "
+                  "drift is not compensated")
+        # Preloaded calibration profiles, switched at runtime without restarting acquisition
+        self.profiles = ProfileManager(load_profiles(), process=self.data_process, camera=self.camera)
+        # Also hosts the recorder, so it exists even when its view loop does not run
+        stream_port = self.pipeline.stream_port if self.pipeline.enabled("stream") else None
+        self.data_image = DataToImage(headless=self.headless, video=self.pipeline.enabled("video"),
+                                      stream_port=stream_port,
+                                      record_codec=record_codec, record_sparse=record_sparse,
+                                      profile_manager=self.profiles)
+        self.data_export = DataExport() if self.pipeline.enabled("export") else None
+
+        # Pipeline metrics for the on-screen HUD and the periodic snapshot file
+        self.metrics_reporter = MetricsReporter(metrics, path=metrics_file or None)
+        # Capture to screen/disk age of every trace_every-th frame, reported as latency.<path>
+        tracer.sample_every = trace_every
+        # On-demand profiling of the running pipeline ('f', SIGUSR1 or /profile on the stream port)
+        runtime_profiler.seconds = profiler_seconds
+        runtime_profiler.mode = profiler_mode
+
+        # Chart windows load matplotlib (and scipy for the 3D chart) only when enabled
+        self.data_average = self.data_cumulated = None
+        if self.pipeline.needs_charts:
+            select_chart_backend()
+        if self.pipeline.enabled("average"):
+            from src.data_visualization import DataAverage
+            self.data_average = DataAverage()
+        if self.pipeline.enabled("cumulated"):
+            from src.data_handling import DataCumulated
+            self.data_cumulated = DataCumulated()
+        print(f"Pipeline stages: capture, {self.pipeline.describe()}")
+
+    def start_stages(self, process: bool = True) -> dict:
+        """Start the enabled stages after capture, returns stage name -> task."""
+        tasks = {}
+        # Processes the raw data and saves it to the processed buffer
+        if process and self.pipeline.enabled("process"):
+            tasks["process"] = asyncio.create_task(self.data_process.process_data())
+        # Converts the processed data to an image, fills the polygon buffer and feeds the view sinks
+        if self.pipeline.runs_view_loop:
+            tasks["image"] = asyncio.create_task(self.data_image.data_to_image())
+        # Exports recorded data
+        if self.data_export is not None:
+            tasks["export"] = asyncio.create_task(self.data_export.start_export(update_interval=1.00))
+        # Displays the average temperature in a chart
+        if self.data_average is not None:
+            tasks["average"] = asyncio.create_task(self.data_average.data_chart())
+        # Displays the accumulated temperature in a chart
+        if self.data_cumulated is not None:
+            tasks["cumulated"] = asyncio.create_task(self.data_cumulated.data_cumulated())
+        # Records every raw frame, from the raw buffer subscription
+        if self.pipeline.enabled("record"):
+            self.data_image.start_recording()
+        return tasks
+
+    async def stop_stages(self, tasks: dict):
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        if self.data_image.is_recording:
+            self.data_image.stop_recording()
+        await self.data_image.wait_recordings_closed()
+
+    async def replay_main(self):
+        if self.initial_profile is not None:
+            self.profiles.switch(self.initial_profile)
 
-        self.data_capture = DataCapture(camera=self.camera)
-        self.data_image = DataToImage()
-        self.data_process = ProcessData()
-        self.data_average = DataAverage()
-        self.data_cumulated = DataCumulated()
-        self.data_export = DataExport()
+        # Replays the recording into the raw (v2) or processed (v1) buffer
+        replay_task = asyncio.create_task(self.data_capture.data_replay())
+        # Version 1 recordings already hold temperatures
+        tasks = self.start_stages(process=self.data_capture.publishes_raw)
+
+        try:
+            # Stop everything when the replay ends or the window is closed
+            await asyncio.wait([replay_task] + ([tasks["image"]] if "image" in tasks else []),
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            replay_task.cancel()
+            await asyncio.gather(replay_task, return_exceptions=True)
+            await self.stop_stages(tasks)
+            self.data_capture.close()
 
     async def main(self):
+        self.metrics_reporter.start()
+        # kill -USR1 <pid> starts a runtime profile, or ends the running one (POSIX only)
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, "SIGUSR1"):
+            loop.add_signal_handler(signal.SIGUSR1, runtime_profiler.toggle)
+        try:
+            if self.replay is not None:
+                await self.replay_main()
+            else:
+                await self.camera_main()
+        finally:
+            if hasattr(signal, "SIGUSR1"):
+                loop.remove_signal_handler(signal.SIGUSR1)
+            runtime_profiler.stop()
+            await runtime_profiler.wait_written()
+            self.metrics_reporter.stop()
+            self.metrics_reporter.join(timeout=2.0)
+
+    async def camera_main(self):
         try:
             # Gets the amount of cameras available
             num_cameras = self.camera_list.GetSize()
@@ -45,23 +178,21 @@ class Camera:
                     raise Exception("Failed getting all nodes")
 
             # Sets the calibration
-            if not set_calibration(cam=self.camera):
+            if not set_calibration(cam=self.camera, snapshot=self.snapshot):
                 raise Exception("Calibration failed")
 
+            # Camera nodes and conversion of the starting profile
+            self.profiles.switch(self.initial_profile if self.initial_profile is not None else
+                                 self.profiles.active_id)
+
             # Captures the image and saves it and its raw data as a matrix to data.txt
             capture_task = asyncio.create_task(self.data_capture.data_capture())
-            # Processes the raw data and saves it to the processed buffer
-            process_task = asyncio.create_task(self.data_process.process_data())
-            # Processes the raw data and converts it to an image
-            image_task = asyncio.create_task(self.data_image.data_to_image())
-            # Exports recorded data
-            export_task = asyncio.create_task(self.data_export.start_export(update_interval=1.00))
-            # Displays the average temperature in a chart
-            # data_average_task = asyncio.create_task(self.data_average.data_chart())
-            # Displays the accumulated temperature in a chart
-            # data_cumulated_task = asyncio.create_task(self.data_cumulated.data_cumulated())
-
-            await asyncio.gather(capture_task, process_task, image_task, export_task)
+            tasks = self.start_stages()
+
+            try:
+                await asyncio.gather(capture_task, *tasks.values())
+            finally:
+                await self.stop_stages(tasks)
 
         except PySpin.SpinnakerException as ex:
             print(f"Spinnaker Exception: {ex}")
@@ -99,8 +230,79 @@ class Camera:
                 print(f"Error during system cleanup: {ex}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FLIR thermal camera acquisition")
+    parser.add_argument("--pipeline", default=None, metavar="PATH",
+                        help="JSON pipeline config selecting the stages that run (see README)")
+    parser.add_argument("--stages", default=None, metavar="LIST",
+                        help=f"Stages to run, e.g. 'process,record' or '+stream,-export' to change single ones "
+                             f"({', '.join(STAGES)})")
+    parser.add_argument("--headless", action="store_true",
+                        help="No windows, write the heatmap to rolling video files instead")
+    parser.add_argument("--stream-port", type=int, default=None,
+                        help="Serve the heatmap as MJPEG and ROI statistics as JSON on this port")
+    parser.add_argument("--record-codec", default=None,
+                        help="Compress recordings in delta-encoded chunks with this codec (zlib, lzma, bz2, zstd, lz4)")
+    parser.add_argument("--record-sparse", action="store_true",
+                        help="With a polygon ROI, record only the ROI pixels")
+    parser.add_argument("--replay", default=None, metavar="PATH",
+                        help="Feed a THRM recording through the pipeline instead of the camera")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed relative to the recorded timing, 0 replays as fast as possible")
+    parser.add_argument("--loop", action="store_true", help="Restart the replay at the end")
+    parser.add_argument("--from", dest="replay_from", type=time_argument, default=None, metavar="TIME",
+                        help="Replay from this time, e.g. 14:02, '2025-11-27 14:02:30' or epoch seconds")
+    parser.add_argument("--to", dest="replay_to", type=time_argument, default=None, metavar="TIME",
+                        help="Replay up to this time")
+    parser.add_argument("--restore-snapshot", default=None, metavar="PATH",
+                        help="Restore a nodemap snapshot after calibrating, writing only changed nodes")
+    parser.add_argument("--profile", default=None,
+                        help="Calibration profile id or name from params/profiles.json to start with ('n' cycles)")
+    parser.add_argument("--fpa-drift", type=float, default=0.0, metavar="COEFF",
+                        help="Compensate FPA temperature drift, °C of reading per °C of FPA change (0 disables)")
+    parser.add_argument("--header-layout", default=None, metavar="PATH",
+                        help="JSON header row layout checked against this camera, enables header decoding "
+                             "(frame counter drops, FPA temperature)")
+    parser.add_argument("--metrics-file", default="./data/exports/metrics.json", metavar="PATH",
+                        help="Write a JSON snapshot of the pipeline metrics here every 5 s ('' disables the file)")
+    parser.add_argument("--trace-every", type=int, default=8, metavar="N",
+                        help="Trace the capture-to-screen/disk age of one frame in N (0 disables tracing)")
+    parser.add_argument("--profiler-seconds", type=float, default=10.0, metavar="SECONDS",
+                        help="Length of a runtime profile started with 'f', SIGUSR1 or /profile")
+    parser.add_argument("--profiler-mode", default="sampling", choices=PROFILE_MODES,
+                        help="Runtime profile mode: sampling (all threads, low overhead) or cprofile "
+                             "(every call on the event loop thread)")
+    args = parser.parse_args()
+
+    # Config file, then the shorthand options, then --stages
+    try:
+        pipeline = load_pipeline_config(args.pipeline) if args.pipeline else PipelineConfig()
+        if args.headless:
+            pipeline.set("display", False)
+            pipeline.set("video", True)
+        if args.stream_port is not None:
+            pipeline.stream_port = args.stream_port
+            pipeline.set("stream", True)
+        if args.stages:
+            pipeline.apply_spec(args.stages)
+        pipeline.validate()
+    except (OSError, ValueError) as e:
+        print(f"Pipeline config error: {e}")
+        sys.exit(2)
+
+    try:
+        header_layout = load_header_layout(args.header_layout) if args.header_layout else None
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Header layout error: {e}")
+        sys.exit(2)
+
     try:
-        camera = Camera()
+        camera = Camera(pipeline=pipeline, record_codec=args.record_codec,
+                        record_sparse=args.record_sparse, replay=args.replay, replay_speed=args.speed,
+                        replay_loop=args.loop, replay_from=args.replay_from, replay_to=args.replay_to,
+                        snapshot=args.restore_snapshot, profile=args.profile, fpa_drift=args.fpa_drift,
+                        header_layout=header_layout,
+                        metrics_file=args.metrics_file, trace_every=args.trace_every,
+                        profiler_seconds=args.profiler_seconds, profiler_mode=args.profiler_mode)
         asyncio.run(camera.main())
     except KeyboardInterrupt:
         print("Exiting program")
@@ -1,2 +1,6 @@
 from .set_calibration import set_calibration
 from .get_all_nodes import get_all_nodes
+from .calibration_profile import parse_cal_params, load_profile, apply_nodes, apply_profile, apply_calibration
+from .nodemap_snapshot import (capture_snapshot, save_snapshot, load_snapshot, diff_snapshots, diff_live,
+                               apply_snapshot)
+from .profile_manager import CalibrationProfile, ProfileManager, load_profiles
@@ -0,0 +1,235 @@
+# * Library imports
+import os
+import json
+import math
+import time
+import re
+import hashlib
+import PySpin
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+CAL_PARAMS_PATH = Path(__file__).parent / "params" / "cal_params.txt"
+CACHE_DIR = Path(__file__).parent / "params" / ".cache"
+# 2: limit entries (*Min/*Max/*Inc) are left out
+# 3: only CAL_PARAM_NODES are taken from the file
+PROFILE_VERSION = 3
+
+# Node pointer class per profile section
+NODE_TYPES = {
+    "int": PySpin.CIntegerPtr,
+    "float": PySpin.CFloatPtr,
+    "str": PySpin.CStringPtr,
+    "bool": PySpin.CBooleanPtr,
+    "enum": PySpin.CEnumerationPtr,
+}
+
+# cal_params.txt type column to profile section, String and Enum lines are not applied
+PARAM_TYPES = {
+    "Integer": ("int", int),
+    "Float": ("float", float),
+}
+# Feature nodes taken from cal_params.txt. The file is a full nodemap dump (detector bias, integration
+# times, raw registers), add a node here only to deliberately write its dumped value to the camera.
+CAL_PARAM_NODES = ("Width", "Height", "OffsetX", "OffsetY")
+# Never applied from a dump: read-only limits (WidthMax, PS0FrameRateMin, HeightInc), raw registers and
+# expressions (UserSetLoadDefaultReg, DetectorBiasMinExpr) and converter/implementation nodes
+EXCLUDED_NODE = re.compile(r"(Min|Max|Inc|Reg|Expr)$|ValConv|Impl")
+
+
+def parse_cal_params(path=CAL_PARAMS_PATH, nodes: Iterable[str] = CAL_PARAM_NODES) -> dict:
+    """
+    Parse a cal_params.txt dump ("Type Name: value" per line) into {section: {node: value}}.
+
+    Only the Integer and Float lines of the listed nodes are kept, the rest
+    of the dump is a record of the camera state, not something to write.
+    EXCLUDED_NODE names are skipped even when listed.
+
+    Args:
+        path: Parameter file
+        nodes: Node names to take from the file
+    """
+    allowed = set(nodes)
+    profile = {section: {} for section in NODE_TYPES}
+    with open(path, "r") as param_file:
+        for line in param_file:
+            parts = line.strip().split(" ")
+            if len(parts) >= 3 and parts[0] in PARAM_TYPES:
+                section, convert = PARAM_TYPES[parts[0]]
+                # The dump writes "Name:", the node itself is called "Name"
+                name = parts[1].rstrip(":")
+                if name not in allowed or EXCLUDED_NODE.search(name):
+                    continue
+                profile[section][name] = convert(" ".join(parts[2:]))
+    return profile
+
+
+def load_profile(path=CAL_PARAMS_PATH, cache_dir=CACHE_DIR,
+                 nodes: Iterable[str] = CAL_PARAM_NODES) -> Tuple[dict, bool]:
+    """
+    Compiled profile for a parameter file, parsed once and cached as JSON.
+
+    The cache file is named after the SHA-256 of the parameter file, so an
+    edited file is parsed again and old entries are simply never read. A
+    cache compiled for another node list is parsed again as well.
+
+    Returns:
+        (profile, loaded from cache)
+    """
+    with open(path, "rb") as param_file:
+        digest = hashlib.sha256(param_file.read()).hexdigest()
+    cache_file = Path(cache_dir) / f"{Path(path).stem}.{digest[:16]}.json"
+    nodes = sorted(set(nodes))
+
+    if cache_file.exists():
+        try:
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+            if (cached.get("version") == PROFILE_VERSION and cached.get("sha256") == digest
+                    and cached.get("allowed") == nodes):
+                return cached["nodes"], True
+        except Exception as e:
+            print(f"Ignoring unreadable calibration cache {cache_file}: {e}")
+
+    profile = parse_cal_params(path, nodes)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_file.with_name(cache_file.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": PROFILE_VERSION, "source": str(path), "sha256": digest, "allowed": nodes,
+                       "nodes": profile}, f)
+        os.replace(tmp, cache_file)
+    except OSError as e:
+        print(f"Could not cache calibration profile: {e}")
+    return profile, False
+
+
+def merge_profiles(base: dict, overrides: dict) -> dict:
+    """Profile with the override values winning, override nodes are applied first."""
+    merged = {}
+    for section in NODE_TYPES:
+        merged[section] = dict(overrides.get(section, {}))
+        for name, value in base.get(section, {}).items():
+            merged[section].setdefault(name, value)
+    return merged
+
+
+def read_value(section: str, node):
+    """Current value of a node pointer, enumerations by entry symbol."""
+    if section == "enum":
+        return node.GetCurrentEntry().GetSymbolic()
+    return node.GetValue()
+
+
+def write_value(section: str, node, value):
+    if section == "enum":
+        entry = node.GetEntryByName(value)
+        if not (PySpin.IsAvailable(entry) and PySpin.IsReadable(entry)):
+            raise PySpin.SpinnakerException(f"No enumeration entry '{value}'")
+        node.SetIntValue(entry.GetValue())
+    else:
+        node.SetValue(value)
+
+
+def _same_value(section: str, current, value) -> bool:
+    if section == "float":
+        return math.isclose(current, value, rel_tol=1e-6, abs_tol=1e-9)
+    return current == value
+
+
+def _apply_node(nodemap, section: str, name: str, value, stats: dict) -> Tuple[str, Optional[str]]:
+    """Read-compare-write one node, returns (written, unchanged, unavailable or failed, error message)."""
+    started = time.perf_counter()
+    try:
+        node = NODE_TYPES[section](nodemap.GetNode(name))
+        if not (PySpin.IsAvailable(node) and PySpin.IsWritable(node)):
+            return "unavailable", None
+        if PySpin.IsReadable(node) and _same_value(section, read_value(section, node), value):
+            return "unchanged", None
+    except PySpin.SpinnakerException as e:
+        return "failed", f"Spinnaker Exception reading {name}: {e}"
+    finally:
+        stats["read_seconds"] += time.perf_counter() - started
+
+    started = time.perf_counter()
+    try:
+        write_value(section, node, value)
+        return "written", None
+    except PySpin.SpinnakerException as e:
+        return "failed", f"Spinnaker Exception ({name}): {e}"
+    finally:
+        stats["write_seconds"] += time.perf_counter() - started
+
+
+def apply_nodes(nodemap, nodes: Iterable[Tuple[str, str, object]]) -> dict:
+    """
+    Write (section, name, value) nodes in the given order, only those whose value differs.
+
+    Every node is read first and only written when the value changes, so a
+    camera that already holds the values costs one read per node. A node
+    can be locked until an enumeration or selector written later in the
+    pass changes (Gain under GainAuto, OffsetX under Width), so nodes that
+    were unavailable or rejected the value get a second try once the pass
+    wrote anything. What is still unavailable or failing then is counted,
+    not fatal.
+
+    Returns:
+        Counts of written, unchanged, unavailable and failed nodes, the number
+        of nodes retried and the read and write time in seconds
+    """
+    stats = {"written": 0, "unchanged": 0, "unavailable": 0, "failed": 0, "retried": 0, "read_seconds": 0.0,
+             "write_seconds": 0.0}
+    deferred = []
+
+    for section, name, value in nodes:
+        outcome, error = _apply_node(nodemap, section, name, value, stats)
+        if outcome in ("unavailable", "failed"):
+            deferred.append((section, name, value, outcome, error))
+        else:
+            stats[outcome] += 1
+
+    retry = stats["written"] > 0
+    for section, name, value, outcome, error in deferred:
+        if retry:
+            stats["retried"] += 1
+            outcome, error = _apply_node(nodemap, section, name, value, stats)
+        if error is not None:
+            print(error)
+        stats[outcome] += 1
+
+    return stats
+
+
+def profile_nodes(profile: dict) -> List[Tuple[str, str, object]]:
+    """(section, name, value) of a profile, enumerations first since they gate other nodes."""
+    sections = ["enum"] + [section for section in NODE_TYPES if section != "enum"]
+    return [(section, name, value) for section in sections for name, value in profile.get(section, {}).items()]
+
+
+def apply_profile(nodemap, profile: dict) -> dict:
+    """
+    Write the nodes of a profile whose current value differs.
+
+    Enumerations (modes such as GainAuto and the *Selector nodes) are
+    written before the values they unlock, see apply_nodes.
+    """
+    return apply_nodes(nodemap, profile_nodes(profile))
+
+
+def apply_calibration(nodemap, path=CAL_PARAMS_PATH, overrides: Optional[dict] = None,
+                      cache_dir=CACHE_DIR) -> dict:
+    """Load (or compile) the profile for path, merge overrides and apply it, with per-phase timing."""
+    started = time.perf_counter()
+    profile, cached = load_profile(path, cache_dir)
+    if overrides:
+        profile = merge_profiles(profile, overrides)
+    load_seconds = time.perf_counter() - started
+
+    stats = apply_profile(nodemap, profile)
+    stats.update({
+        "nodes": sum(len(nodes) for nodes in profile.values()),
+        "cached": cached,
+        "load_seconds": load_seconds,
+        "total_seconds": time.perf_counter() - started,
+    })
+    return stats
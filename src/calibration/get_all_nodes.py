@@ -1,48 +1,23 @@
 # Library imports
 import PySpin
+from typing import Optional
 
-def get_all_nodes(cam: PySpin.Camera) -> bool:
+from .nodemap_snapshot import capture_snapshot, default_snapshot_path, save_snapshot
+
+def get_all_nodes(cam: PySpin.Camera, path: Optional[str] = None) -> bool:
     try:
-        cam.Init()
+        # Left initialized, set_calibration and DataCapture use the camera next
+        if not cam.IsInitialized():
+            cam.Init()
 
         nodemap = cam.GetNodeMap()
-        nodes = nodemap.GetNodes()
-
         print(f"Nodemap: {nodemap}")
-        open("params/30_150_all_nodes_25mm.txt", "w").close()
-
-        with open("params/30_150_all_nodes_25mm.txt", "a") as file:
-            for node in nodes:
-                if PySpin.IsAvailable(node) and PySpin.IsWritable(node):
-                    node_name = node.GetName()
-                    node_type = None
-                    node_value = None
-
-                    if PySpin.IsReadable(node):
-                        if node.GetPrincipalInterfaceType() == PySpin.intfIFloat:
-                            node_type = "float"
-                            node_value = PySpin.CFloatPtr(node).GetValue()
-                        elif node.GetPrincipalInterfaceType() == PySpin.intfIInteger:
-                            node_type = "int"
-                            node_value = PySpin.CIntegerPtr(node).GetValue()
-                        elif node.GetPrincipalInterfaceType() == PySpin.intfIString:
-                            node_type = "str"
-                            node_value = PySpin.CStringPtr(node).GetValue()
-                        elif node.GetPrincipalInterfaceType() == PySpin.intfIBoolean:
-                            node_type = "bool"
-                            node_value = PySpin.CBooleanPtr(node).GetValue()
-                        elif node.GetPrincipalInterfaceType() == PySpin.intfIEnumeration:
-                            node_type = "enum"
-                            node_value = PySpin.CEnumerationPtr(node).GetCurrentEntry().GetSymbolic()
-                        elif node.GetPrincipalInterfaceType() == PySpin.intfICommand:
-                            node_value = "Command Node (No Value)"
-                        else:
-                            node_value = "Unsupported Node Type"
 
-                    file.write(f"{node_type} {node_name} {node_value}\n")
-        cam.DeInit()
+        # Available and writable nodes, like the old text dump, as a versioned JSON snapshot
+        snapshot = capture_snapshot(nodemap, writable_only=True)
+        path = save_snapshot(snapshot, path or default_snapshot_path(snapshot))
 
-        print("Successfully gotten all nodes")
+        print(f"Successfully gotten all nodes: {len(snapshot['nodes'])} saved to {path}")
         return True
     except PySpin.SpinnakerException as ex:
         print(f"Error: {ex}")
@@ -0,0 +1,140 @@
+# * Library imports
+import os
+import json
+import time
+import PySpin
+from pathlib import Path
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+# * File imports
+from .calibration_profile import NODE_TYPES, apply_nodes, read_value
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DIR = Path(__file__).parent / "params" / "snapshots"
+
+# Principal interface type to snapshot type, resolved once instead of an if/elif chain per node
+INTERFACE_TYPES = {
+    PySpin.intfIInteger: "int",
+    PySpin.intfIFloat: "float",
+    PySpin.intfIString: "str",
+    PySpin.intfIBoolean: "bool",
+    PySpin.intfIEnumeration: "enum",
+}
+
+# Identify the camera in the snapshot header
+DEVICE_NODES = ("DeviceVendorName", "DeviceModelName", "DeviceSerialNumber", "DeviceFirmwareVersion")
+
+
+def _read_node(node) -> Optional[Tuple[str, object]]:
+    """(type, value) of a value node, None for commands, categories and unreadable nodes."""
+    node_type = INTERFACE_TYPES.get(node.GetPrincipalInterfaceType())
+    if node_type is None or not (PySpin.IsAvailable(node) and PySpin.IsReadable(node)):
+        return None
+    return node_type, read_value(node_type, NODE_TYPES[node_type](node))
+
+
+def capture_snapshot(nodemap, writable_only: bool = True, names=None) -> dict:
+    """
+    Read the nodemap into a snapshot in one pass.
+
+    Args:
+        nodemap: Camera nodemap (cam.GetNodeMap())
+        writable_only: Keep only nodes that can be written back, like get_all_nodes did
+        names: Only these nodes, None walks the whole nodemap
+
+    Returns:
+        {"version", "created", "device", "nodes": {name: {"type", "value"}}}
+    """
+    nodes = {}
+    source = nodemap.GetNodes() if names is None else (nodemap.GetNode(name) for name in names)
+
+    for node in source:
+        if node is None or (writable_only and not PySpin.IsWritable(node)):
+            continue
+        try:
+            entry = _read_node(node)
+        except PySpin.SpinnakerException as e:
+            print(f"Spinnaker Exception reading {node.GetName()}: {e}")
+            continue
+        if entry is not None:
+            nodes[node.GetName()] = {"type": entry[0], "value": entry[1]}
+
+    device = {}
+    for name in DEVICE_NODES:
+        node = nodemap.GetNode(name)
+        try:
+            entry = _read_node(node) if node is not None else None
+        except PySpin.SpinnakerException:
+            entry = None
+        if entry is not None:
+            device[name] = entry[1]
+
+    return {"version": SNAPSHOT_VERSION, "created": datetime.now().isoformat(), "device": device, "nodes": nodes}
+
+
+def save_snapshot(snapshot: dict, path) -> Path:
+    """Write a snapshot as JSON, atomically, the nodes in captured nodemap order."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(snapshot, f, indent=1)
+    os.replace(tmp, path)
+    return path
+
+
+def load_snapshot(path) -> dict:
+    with open(path, "r") as f:
+        snapshot = json.load(f)
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {snapshot.get('version')} in {path}")
+    return snapshot
+
+
+def diff_snapshots(old: dict, new: dict) -> List[Tuple[str, object, object]]:
+    """
+    Changed parameters between two snapshots as (name, old value, new value),
+    None stands for a node that is missing on that side.
+    """
+    old_nodes, new_nodes = old["nodes"], new["nodes"]
+    changes = []
+    for name in sorted(old_nodes.keys() | new_nodes.keys()):
+        old_value = old_nodes[name]["value"] if name in old_nodes else None
+        new_value = new_nodes[name]["value"] if name in new_nodes else None
+        if old_value != new_value:
+            changes.append((name, old_value, new_value))
+    return changes
+
+
+def diff_live(snapshot: dict, nodemap) -> List[Tuple[str, object, object]]:
+    """Parameters of the snapshot that differ on the camera, only those nodes are read."""
+    live = capture_snapshot(nodemap, writable_only=False, names=snapshot["nodes"].keys())
+    return diff_snapshots(snapshot, live)
+
+
+def snapshot_nodes(snapshot: dict) -> List[Tuple[str, str, object]]:
+    """
+    (section, name, value) of a snapshot in write order for apply_nodes.
+
+    Enumerations go first, the rest keeps the captured nodemap order, which
+    lists a selector before the features it selects. Snapshots saved by
+    older versions have sorted nodes, the retry pass of apply_nodes covers
+    the dependencies their order misses.
+    """
+    entries = [(entry["type"], name, entry["value"]) for name, entry in snapshot["nodes"].items()]
+    return sorted(entries, key=lambda entry: entry[0] != "enum")
+
+
+def apply_snapshot(nodemap, snapshot: dict) -> dict:
+    """Restore a snapshot, writing only the nodes whose value differs (see apply_nodes)."""
+    started = time.perf_counter()
+    stats = apply_nodes(nodemap, snapshot_nodes(snapshot))
+    stats["nodes"] = len(snapshot["nodes"])
+    stats["total_seconds"] = time.perf_counter() - started
+    return stats
+
+
+def default_snapshot_path(snapshot: dict) -> Path:
+    serial = snapshot["device"].get("DeviceSerialNumber", "camera")
+    return SNAPSHOT_DIR / f"{serial}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -0,0 +1,61 @@
+# * Library imports
+import sys
+import time
+import argparse
+import PySpin
+
+# * File imports
+from .nodemap_snapshot import (apply_snapshot, capture_snapshot, default_snapshot_path, diff_live, diff_snapshots,
+                               load_snapshot, save_snapshot)
+
+
+def _print_changes(changes):
+    for name, old_value, new_value in changes:
+        print(f"  {name}: {old_value} -> {new_value}")
+    print(f"{len(changes)} changed parameters")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Capture, compare and restore camera nodemap snapshots")
+    commands = parser.add_subparsers(dest="command", required=True)
+    capture_parser = commands.add_parser("capture", help="Save the nodemap of the first camera")
+    capture_parser.add_argument("output", nargs="?", default=None, help="Snapshot file, defaults to params/snapshots")
+    capture_parser.add_argument("--all", action="store_true", help="Include read-only nodes")
+    diff_parser = commands.add_parser("diff", help="Compare two snapshots, or one against the camera")
+    diff_parser.add_argument("snapshots", nargs="+", help="One snapshot (against the camera) or two")
+    apply_parser = commands.add_parser("apply", help="Write the changed parameters of a snapshot to the camera")
+    apply_parser.add_argument("snapshot")
+    args = parser.parse_args()
+    if args.command == "diff" and len(args.snapshots) > 2:
+        diff_parser.error("diff takes one snapshot (against the camera) or two")
+
+    if args.command == "diff" and len(args.snapshots) == 2:
+        _print_changes(diff_snapshots(load_snapshot(args.snapshots[0]), load_snapshot(args.snapshots[1])))
+        sys.exit(0)
+
+    system = PySpin.System.GetInstance()
+    camera_list = system.GetCameras()
+    try:
+        if camera_list.GetSize() == 0:
+            raise Exception("No cameras detected")
+        cam = camera_list.GetByIndex(0)
+        cam.Init()
+        nodemap = cam.GetNodeMap()
+
+        started = time.perf_counter()
+        if args.command == "capture":
+            snapshot = capture_snapshot(nodemap, writable_only=not args.all)
+            path = save_snapshot(snapshot, args.output or default_snapshot_path(snapshot))
+            print(f"{len(snapshot['nodes'])} nodes saved to {path} in {time.perf_counter() - started:.2f} s")
+        elif args.command == "diff":
+            _print_changes(diff_live(load_snapshot(args.snapshots[0]), nodemap))
+        else:
+            print(apply_snapshot(nodemap, load_snapshot(args.snapshot)))
+
+        cam.DeInit()
+        del cam
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        camera_list.Clear()
+        system.ReleaseInstance()
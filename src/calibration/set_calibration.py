@@ -1,60 +1,42 @@
+import time
 import PySpin
 
-def set_node_value(nodemap, node_name, value, node_type):
+from typing import Optional
+
+from .calibration_profile import apply_calibration
+from .nodemap_snapshot import apply_snapshot, load_snapshot
+
+# Applied on top of cal_params.txt
+PARAM_OVERRIDES = {
+    "int": {
+        "Width": 640,
+        "Height": 513,
+        "OffsetX": 0,
+        "OffsetY": 0,
+    },
+    "float": {},
+    "str": {
+        # "PS0CalibrationLoadTag": "25mm, Empty, 35C - 150C"
+    },
+    "bool": {},
+}
+
+def set_calibration(cam: PySpin.Camera, snapshot: Optional[str] = None) -> bool:
     try:
-        node = node_type(nodemap.GetNode(node_name))
-        if PySpin.IsAvailable(node) and PySpin.IsWritable(node):
-            node.SetValue(value)
-        else:
-            print(f"{node_type}: {node_name} parameter not available or writable.")
-    except PySpin.SpinnakerException as e:
-        print(f"Spinnaker Exception ({node_name}): {e}")
-
-def set_calibration(cam: PySpin.Camera) -> bool:
-    try:
-        cam.Init()
+        started = time.perf_counter()
+        # The camera stays initialized for DataCapture, no DeInit/Init round trip
+        if not cam.IsInitialized():
+            cam.Init()
         nodemap = cam.GetNodeMap()
+        init_seconds = time.perf_counter() - started
 
-        int_params = {
-            "Width": 640,
-            "Height": 513,
-            "OffsetX": 0,
-            "OffsetY": 0,
-        }
-
-        float_params = {}
-
-        str_params = {
-            # "PS0CalibrationLoadTag": "25mm, Empty, 35C - 150C"
-        }
-
-        bool_params = {}
-
-        with open("src/calibration/params/cal_params.txt", "r") as param_file:
-            for line in param_file:
-                parts = line.strip().split(" ")
-                if len(parts) >= 3:
-                    data_type = parts[0]
-                    name = parts[1]
-                    value = " ".join(parts[2:])
-
-                    if data_type == "Integer":
-                        int_params[name] = int(value)
-                    elif data_type == "Float":
-                        float_params[name] = float(value)
-                    # elif data_type == "String":
-                    #     str_params[name] = value
-                    # elif data_type == "bool":
-                    #     bool_params[name] = bool(value)
+        stats = apply_calibration(nodemap, overrides=PARAM_OVERRIDES)
 
-        for param, value in int_params.items():
-            set_node_value(nodemap=nodemap, node_name=param, value=value, node_type=PySpin.CIntegerPtr)
-        for param, value in float_params.items():
-            set_node_value(nodemap=nodemap, node_name=param, value=value, node_type=PySpin.CFloatPtr)
-        for param, value in str_params.items():
-            set_node_value(nodemap=nodemap, node_name=param, value=value, node_type=PySpin.CStringPtr)
-        for param, value in bool_params.items():
-            set_node_value(nodemap=nodemap, node_name=param, value=value, node_type=PySpin.CBooleanPtr)
+        # A saved nodemap snapshot (nodemap_tool capture) restores a known state on top, changed nodes only
+        if snapshot is not None:
+            snapshot_stats = apply_snapshot(nodemap, load_snapshot(snapshot))
+            print(f"Snapshot {snapshot}: {snapshot_stats['written']} written, {snapshot_stats['unchanged']} unchanged, "
+                  f"{snapshot_stats['failed']} failed in {snapshot_stats['total_seconds'] * 1000:.1f} ms")
 
         try:
             temperature_node = PySpin.CFloatPtr(nodemap.GetNode("DeviceTemperature"))
@@ -65,11 +47,14 @@ def set_calibration(cam: PySpin.Camera) -> bool:
         except PySpin.SpinnakerException as e:
             print(f"Spinnaker Exception (DeviceTemperature): {e}")
 
-        cam.DeInit()
-        cam.Init()
-        print("Calibration parameters set successfully.")
+        print(f"Calibration parameters set successfully: {stats['nodes']} nodes, {stats['written']} written, "
+              f"{stats['unchanged']} unchanged, {stats['unavailable']} not writable, {stats['failed']} failed")
+        print(f"Calibration timing: init {init_seconds * 1000:.1f} ms, "
+              f"load {stats['load_seconds'] * 1000:.1f} ms ({'cached' if stats['cached'] else 'parsed'}), "
+              f"read {stats['read_seconds'] * 1000:.1f} ms, write {stats['write_seconds'] * 1000:.1f} ms, "
+              f"total {(time.perf_counter() - started) * 1000:.1f} ms")
 
         return True
     except PySpin.SpinnakerException as ex:
         print(f"Error: {ex}")
-        return False
\ No newline at end of file
+        return False
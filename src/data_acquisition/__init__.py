@@ -1 +1,3 @@
-from .data_capture import DataCapture
\ No newline at end of file
+from .data_capture import DataCapture
+from .data_replay import DataReplay
+from .header_row import HeaderDecoder, DropDetector, load_header_layout
\ No newline at end of file
@@ -1,25 +1,73 @@
 # * Library imports
+import time
 import PySpin
 import numpy as np
 import asyncio
+from typing import Optional
 
 # * File imports
 from ..data_buffer import raw_data_buffer
+from ..util_functions import metrics, tracer
+from .header_row import DropDetector, HeaderDecoder
 
 class DataCapture:
-    def __init__(self, camera: PySpin.Camera, data_buffer = raw_data_buffer):
+    def __init__(self, camera: PySpin.Camera, data_buffer = raw_data_buffer,
+                 header_layout: Optional[dict] = None):
+        """
+        Pull frames from the camera into the raw buffer.
+
+        The camera sends a telemetry row in front of the image (Height 513).
+        It is passed along with the image rows in the frame metadata, both as
+        views of one copy of the camera buffer: Spinnaker reuses the buffer
+        once the image is released, while the raw buffer and the recorder
+        queue keep frames for longer. With a header_layout the row is also
+        decoded into metadata fields (frame counter, camera timestamp, FPA
+        temperature) and gaps in the frame counter are counted as dropped
+        frames; without one nothing is decoded, as the offsets are camera and
+        firmware specific. Sampled frames also carry their capture time under
+        "trace" (util_functions.tracing).
+
+        Args:
+            camera: Initialized or uninitialized camera
+            data_buffer: Buffer receiving (image, metadata)
+            header_layout: Checked header row layout (header_row.load_header_layout), None leaves the row undecoded
+        """
         self.camera = camera
         self.data_buffer = data_buffer
+        self.header_layout = header_layout
+        self.header_decoder = None
+        self.drop_detector = DropDetector()
+
+    def decode_header(self, header_row: np.ndarray) -> dict:
+        """Frame metadata from the header row, the row itself is kept for recordings."""
+        if self.header_layout is None:
+            return {"header_row": header_row}
+        if self.header_decoder is None:
+            self.header_decoder = HeaderDecoder(self.header_layout, row_bytes=header_row.nbytes)
+        meta = self.header_decoder.decode(header_row)
+        meta["header_row"] = header_row
+        if "frame_counter" in meta:
+            meta["frames_dropped"] = self.drop_detector.update(meta["frame_counter"])
+            if meta["frames_dropped"]:
+                metrics.count("capture.dropped", meta["frames_dropped"])
+        return meta
+
+    def get_stats(self) -> dict:
+        return self.drop_detector.get_stats()
 
     async def data_capture(self):
         try:
             try:
-                self.camera.Init()
+                # set_calibration leaves the camera initialized, a second Init is a full re-handshake
+                if not self.camera.IsInitialized():
+                    self.camera.Init()
                 self.camera.BeginAcquisition()
 
                 while True:
                     try:
                         image = self.camera.GetNextImage()
+                        started = time.perf_counter()
+                        trace = tracer.start()
 
                         if image.IsIncomplete():
                             print(
@@ -31,12 +79,18 @@ class DataCapture:
                                 PySpin.PixelFormat_Mono16, PySpin.PixelFormat_BGR16]
                             dtype = np.uint16 if is_16bit else np.uint8
 
+                            # Copied out of the camera buffer, which is recycled after image.Release()
                             np_image = np.frombuffer(image.GetData(), dtype=dtype).reshape(
-                                image.GetHeight(), image.GetWidth())
+                                image.GetHeight(), image.GetWidth()).copy()
 
                             isinstance(np_image, np.ndarray)
 
-                            self.data_buffer.add(np_image[1:])
+                            meta = self.decode_header(np_image[0])
+                            meta["trace"] = trace
+                            tracer.mark("raw", trace)
+                            self.data_buffer.add(np_image[1:], meta)
+                            metrics.count("capture.frames")
+                            metrics.observe("capture", time.perf_counter() - started)
 
                         image.Release()
 
@@ -50,6 +104,10 @@ class DataCapture:
                 print(f"Error: {ex}")
 
             finally:
+                stats = self.get_stats()
+                if stats["frames_dropped"]:
+                    print(f"Camera frame counter: {stats['frames_dropped']} frames dropped in "
+                          f"{stats['drop_events']} gaps ({stats['drop_rate'] * 100:.2f}%)")
                 self.camera.EndAcquisition()
                 self.camera.DeInit()
         except asyncio.CancelledError:
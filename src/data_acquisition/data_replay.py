@@ -0,0 +1,165 @@
+# * Library imports
+import time
+import asyncio
+import datetime
+import numpy as np
+from typing import Optional
+
+# * File imports
+from ..data_buffer import raw_data_buffer, processed_data_buffer
+from ..data_recording import ThrmReader
+from ..util_functions import metrics, tracer
+from .header_row import HeaderDecoder
+
+
+class DataReplay:
+    def __init__(self, filename, speed: Optional[float] = 1.0, loop: bool = False, start: int = 0,
+                 stop: Optional[int] = None, start_time=None, stop_time=None, raw_buffer=raw_data_buffer,
+                 processed_buffer=processed_data_buffer, header_layout: Optional[dict] = None):
+        """
+        Feed a THRM recording back into the pipeline in place of DataCapture.
+
+        Version 2 recordings hold raw sensor counts and are published to the
+        raw buffer, so ProcessData, DataToImage and the exporters run exactly as
+        with a camera, together with the header row when the recording stored
+        it (decoded with header_layout, like DataCapture). Version 1 recordings hold temperatures and go straight to
+        the processed buffer (ProcessData must not run).
+
+        Raw frames carry the recording's conversion as meta["conversion"]
+        (gain, offset, tag), the one of the frame's calibration profile when
+        the recording switched profiles, so ProcessData converts them as they
+        were converted live rather than with its active profile.
+
+        Sparse recordings only hold the ROI pixels. Their frames are published
+        with the ROI as meta["valid_mask"], and ProcessData sets the pixels
+        outside it to NaN instead of converting the 0 fill to °C.
+
+        Args:
+            filename: Recording to replay
+            speed: Playback rate relative to the recorded timing, None or 0 replays as fast as possible
+            loop: Start over at the end instead of finishing
+            start: First frame to replay
+            stop: Frame to stop before, None replays to the end
+            start_time: Replay from this time instead of start ("14:02", ISO string, datetime or epoch seconds)
+            stop_time: Replay up to this time instead of stop
+            raw_buffer: Buffer receiving raw frames (version 2)
+            processed_buffer: Buffer receiving temperature frames (version 1)
+            header_layout: Checked header row layout (header_row.load_header_layout), None leaves the rows undecoded
+        """
+        self.reader = ThrmReader(filename)
+        self.speed = speed or None
+        self.loop = loop
+        if start_time is not None or stop_time is not None:
+            time_start, time_stop = self.reader.time_range(start_time, stop_time)
+            start = time_start if start_time is not None else start
+            stop = time_stop if stop_time is not None else stop
+        self.positions = range(len(self.reader))[start:stop]
+        self.raw_buffer = raw_buffer
+        self.processed_buffer = processed_buffer
+        # Stored header rows are decoded like live capture does, only with a configured layout
+        self.header_decoder = HeaderDecoder(header_layout, row_bytes=self.reader.header_row_bytes) \
+            if header_layout is not None and self.reader.header_row_bytes else None
+        # (first frame of the ROI, its mask), rebuilt when the replay crosses a ROI change
+        self._valid_mask = (None, None)
+
+        self.frames_published = 0
+        self.max_lag = 0.0
+        self.elapsed = 0.0
+
+    @property
+    def publishes_raw(self) -> bool:
+        """True when frames go to the raw buffer and ProcessData is needed."""
+        return self.reader.version >= 2
+
+    def valid_mask(self, i: int) -> Optional[np.ndarray]:
+        """Mask of the pixels stored for frame i of a sparse recording, None for full frames."""
+        if not self.reader.sparse:
+            return None
+        position = int(np.searchsorted(self.reader.rois['first_frame'], i, side='right')) - 1
+        if self._valid_mask[0] != position:
+            self._valid_mask = (position, self.reader.roi_mask(i))
+        return self._valid_mask[1]
+
+    def publish(self, i: int):
+        started = time.perf_counter()
+        # Traced from the moment the frame is published, like a capture
+        trace = tracer.start()
+        # Copies, the reader returns read-only views into its memory map
+        if self.publishes_raw:
+            meta = {}
+            if self.reader.header_row_bytes:
+                header_row = self.reader.header_row(i)
+                if self.header_decoder is not None:
+                    meta = self.header_decoder.decode(header_row)
+                meta["header_row"] = header_row
+            meta["trace"] = trace
+            tag = self.reader.tag(i) if self.reader.conversions else 0
+            meta["conversion"] = (*self.reader.conversion(tag), tag)
+            if self.reader.sparse:
+                meta["valid_mask"] = self.valid_mask(i)
+            tracer.mark("raw", trace)
+            self.raw_buffer.add(np.array(self.reader.frame(i)), meta)
+        else:
+            timestamp = float(self.reader.timestamps[i])
+            current_time = datetime.datetime.fromtimestamp(timestamp).strftime("%d-%m-%Y %H:%M:%S")
+            # Temperatures, NaN marks the pixels a sparse recording did not store
+            self.processed_buffer.add(temp_data=np.array(self.reader.frame(i, fill_value=np.nan)),
+                                      time_data=np.array([current_time]), trace=trace)
+        self.frames_published += 1
+        metrics.count("capture.frames")
+        metrics.observe("capture", time.perf_counter() - started)
+
+    async def data_replay(self):
+        print(f"Replaying {len(self.positions)} frames from {self.reader.path} "
+              f"at {f'{self.speed}x' if self.speed else 'maximum speed'}")
+        started = time.perf_counter()
+
+        try:
+            if not self.positions:
+                print("Nothing to replay: the selected range holds no frames")
+                return
+
+            while True:
+                pass_started = time.perf_counter()
+                first_timestamp = float(self.reader.timestamps[self.positions[0]]) if self.positions else 0.0
+
+                for i in self.positions:
+                    if self.speed:
+                        due = pass_started + (float(self.reader.timestamps[i]) - first_timestamp) / self.speed
+                        delay = due - time.perf_counter()
+                        if delay > 0:
+                            await asyncio.sleep(delay)
+                        else:
+                            self.max_lag = max(self.max_lag, -delay)
+                            metrics.observe("capture.lag", -delay)
+
+                    self.publish(i)
+
+                    # Let the pipeline stages run between frames, also at maximum speed
+                    if not self.speed or delay <= 0:
+                        await asyncio.sleep(0)
+
+                if not self.loop:
+                    break
+                # Other tasks run at least once per pass, however short the pass
+                await asyncio.sleep(0)
+
+        except asyncio.CancelledError:
+            pass
+
+        finally:
+            self.elapsed = time.perf_counter() - started
+            stats = self.get_stats()
+            print(f"Replay finished: {stats['frames_published']} frames in {stats['elapsed']:.2f} s "
+                  f"({stats['frames_per_second']:.1f} frames/s, max lag {stats['max_lag_ms']:.1f} ms)")
+
+    def get_stats(self) -> dict:
+        return {
+            "frames_published": self.frames_published,
+            "elapsed": self.elapsed,
+            "frames_per_second": self.frames_published / self.elapsed if self.elapsed else 0.0,
+            "max_lag_ms": self.max_lag * 1000,
+        }
+
+    def close(self):
+        self.reader.close()
@@ -0,0 +1,130 @@
+# * Library imports
+import json
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+HEADER_LAYOUT_VERSION = 1
+
+# Field name to (byte offset, numpy type, scale, add) in the first image row.
+# The camera is configured for Height 513 and sends its telemetry in front of
+# the 512 image rows. These offsets are a template, not checked against a
+# camera: capture and replay only decode with a layout that was configured
+# (load_header_layout), after comparing it with a dump of a real row
+# (HeaderDecoder.dump).
+DEFAULT_LAYOUT: Dict[str, Tuple[int, str, float, float]] = {
+    "frame_counter": (0, '<u4', 1.0, 0.0),
+    "timestamp_us": (4, '<u8', 1.0, 0.0),
+    # Centikelvin to °C
+    "fpa_temperature": (12, '<u2', 0.01, -273.15),
+    "housing_temperature": (14, '<u2', 0.01, -273.15),
+}
+
+COUNTER_BITS = 32
+
+
+def load_header_layout(path) -> Dict[str, Tuple[int, str, float, float]]:
+    """
+    Header row layout from a JSON file.
+
+    {"version": 1, "fields": {"frame_counter": [0, "<u4", 1.0, 0.0], ...}},
+    each field as [byte offset, numpy type, scale, add] like DEFAULT_LAYOUT.
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    if data.get("version") != HEADER_LAYOUT_VERSION:
+        raise ValueError(f"Unsupported header layout version {data.get('version')} in {path}")
+    layout = {}
+    for name, field in data.get("fields", {}).items():
+        if len(field) != 4:
+            raise ValueError(f"Header field '{name}' in {path} needs [offset, type, scale, add], got {field}")
+        offset, field_type, scale, add = field
+        layout[name] = (int(offset), str(np.dtype(field_type).str), float(scale), float(add))
+    if not layout:
+        raise ValueError(f"Header layout {path} has no fields")
+    return layout
+
+
+class HeaderDecoder:
+    def __init__(self, layout: Optional[Dict[str, Tuple[int, str, float, float]]] = None, row_bytes: int = 1280):
+        """
+        Decode the telemetry header row of a raw frame.
+
+        The layout is compiled once into a structured dtype with explicit
+        offsets, so decoding is a single view of the row's bytes: no copy and
+        no per-field struct calls. Fields with a scale or add are converted
+        to float, the others stay integers.
+
+        Args:
+            layout: Field name to (byte offset, numpy type, scale, add), DEFAULT_LAYOUT if None
+            row_bytes: Size of the header row in bytes (640 uint16 pixels)
+        """
+        self.layout = dict(DEFAULT_LAYOUT if layout is None else layout)
+        self.row_bytes = row_bytes
+        self.dtype = np.dtype({
+            "names": list(self.layout),
+            "formats": [field[1] for field in self.layout.values()],
+            "offsets": [field[0] for field in self.layout.values()],
+            "itemsize": row_bytes,
+        })
+        self._conversions = [(name, scale, add) for name, (_, _, scale, add) in self.layout.items()
+                             if scale != 1.0 or add != 0.0]
+
+    def decode(self, row: np.ndarray) -> dict:
+        """Field values of one header row (any dtype, at least row_bytes long)."""
+        record = np.ascontiguousarray(row).view(np.uint8)[:self.row_bytes].view(self.dtype)[0]
+        fields = {name: record[name].item() for name in self.layout}
+        for name, scale, add in self._conversions:
+            fields[name] = fields[name] * scale + add
+        return fields
+
+    def decode_many(self, rows: np.ndarray) -> np.ndarray:
+        """Raw field values of (n, row_bytes) header rows as a structured array view."""
+        rows = np.ascontiguousarray(rows).view(np.uint8).reshape(len(rows), -1)[:, :self.row_bytes]
+        return np.ascontiguousarray(rows).view(self.dtype).reshape(len(rows))
+
+    def dump(self, row: np.ndarray, words: int = 16) -> str:
+        """First words 16-bit words of a row in hex, for checking the layout against a camera."""
+        data = np.ascontiguousarray(row).view(np.uint8)[:words * 2].view('<u2')
+        return " ".join(f"{word:04x}" for word in data)
+
+
+class DropDetector:
+    def __init__(self, counter_bits: int = COUNTER_BITS):
+        """
+        Count frames the camera sent but we never received, from gaps in its frame counter.
+
+        The counter wraps at 2 ** counter_bits. A counter that goes backwards
+        by more than half the range is taken as a camera restart, not a drop.
+        """
+        self.modulo = 1 << counter_bits
+        self.last_counter = None
+        self.frames_seen = 0
+        self.frames_dropped = 0
+        self.drop_events = 0
+        self.restarts = 0
+
+    def update(self, counter: int) -> int:
+        """Register the counter of a received frame, returns the number of frames missed before it."""
+        self.frames_seen += 1
+        last, self.last_counter = self.last_counter, counter
+        if last is None:
+            return 0
+
+        gap = (counter - last - 1) % self.modulo
+        if gap >= self.modulo // 2:
+            self.restarts += 1
+            return 0
+        if gap:
+            self.frames_dropped += gap
+            self.drop_events += 1
+        return gap
+
+    def get_stats(self) -> dict:
+        return {
+            "frames_seen": self.frames_seen,
+            "frames_dropped": self.frames_dropped,
+            "drop_events": self.drop_events,
+            "restarts": self.restarts,
+            "drop_rate": self.frames_dropped / (self.frames_seen + self.frames_dropped)
+            if self.frames_seen else 0.0,
+        }
@@ -1,3 +1,3 @@
-from .raw_data_buffer import RawDataBuffer, raw_data_buffer, get_raw_buffered_data
+from .raw_data_buffer import RawDataBuffer, raw_data_buffer, get_raw_buffered_data, get_raw_buffered_meta
 from .polygon_data_buffer import PolygonDataBuffer, polygon_data_buffer, get_polygon_buffered_data
 from .processed_data_buffer import ProcessedDataBuffer, processed_data_buffer, get_processed_buffered_temp_data, get_processed_buffered_time_data
\ No newline at end of file
@@ -1,17 +1,24 @@
 # * Library imports
 from collections import deque
+from typing import Optional
 import numpy as np
 
 class PolygonDataBuffer:
     def __init__(self, max_size: int = 10):
         self.buffer = deque(maxlen=max_size)
+        # Capture time of sampled frames (util_functions.tracing), None for the others
+        self.trace_buffer = deque(maxlen=max_size)
 
-    def add(self, data: np.ndarray):
+    def add(self, data: np.ndarray, trace: Optional[float] = None):
         self.buffer.append(data)
+        self.trace_buffer.append(trace)
 
     def export(self) -> list:
         return list(self.buffer)
 
+    def latest_trace(self) -> Optional[float]:
+        return self.trace_buffer[-1] if self.trace_buffer else None
+
 polygon_data_buffer = PolygonDataBuffer()
 
 def get_polygon_buffered_data() -> list:
@@ -1,15 +1,22 @@
 # * Library imports
 from collections import deque
+from typing import Optional
 import numpy as np
 
 class ProcessedDataBuffer:
     def __init__(self, max_size: int = 10):
         self.temp_buffer = deque(maxlen=max_size)
         self.time_buffer = deque(maxlen=max_size)
+        # Calibration profile id each frame was converted with
+        self.tag_buffer = deque(maxlen=max_size)
+        # Capture time of sampled frames (util_functions.tracing), None for the others
+        self.trace_buffer = deque(maxlen=max_size)
 
-    def add(self, temp_data: np.ndarray, time_data: np.ndarray):
+    def add(self, temp_data: np.ndarray, time_data: np.ndarray, tag: int = 0, trace: Optional[float] = None):
         self.temp_buffer.append(temp_data)
         self.time_buffer.append(time_data)
+        self.tag_buffer.append(tag)
+        self.trace_buffer.append(trace)
 
     def export_temp(self) -> list:
         return list(self.temp_buffer)
@@ -17,6 +24,15 @@ class ProcessedDataBuffer:
     def export_time(self) -> list:
         return list(self.time_buffer)
 
+    def export_tag(self) -> list:
+        return list(self.tag_buffer)
+
+    def latest_tag(self) -> int:
+        return self.tag_buffer[-1] if self.tag_buffer else 0
+
+    def latest_trace(self) -> Optional[float]:
+        return self.trace_buffer[-1] if self.trace_buffer else None
+
 processed_data_buffer = ProcessedDataBuffer()
 
 def get_processed_buffered_temp_data() -> list:
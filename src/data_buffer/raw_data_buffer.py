@@ -1,18 +1,42 @@
 # * Library imports
 from collections import deque
+from typing import Optional
 import numpy as np
 
 class RawDataBuffer:
     def __init__(self, max_size: int = 10):
         self.buffer = deque(maxlen=max_size)
+        # Per-frame metadata decoded from the camera header row, aligned with buffer
+        self.meta_buffer = deque(maxlen=max_size)
+        # Called with every frame and its metadata, for consumers that must not miss any (recorders)
+        self.subscribers = []
 
-    def add(self, data: np.ndarray):
+    def add(self, data: np.ndarray, meta: Optional[dict] = None):
         self.buffer.append(data)
+        self.meta_buffer.append(meta)
+        for callback in self.subscribers:
+            callback(data, meta)
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
 
     def export(self) -> list:
         return list(self.buffer)
 
+    def export_meta(self) -> list:
+        return list(self.meta_buffer)
+
+    def latest_meta(self) -> Optional[dict]:
+        return self.meta_buffer[-1] if self.meta_buffer else None
+
 raw_data_buffer = RawDataBuffer()
 
 def get_raw_buffered_data() -> list:
-    return raw_data_buffer.export()
\ No newline at end of file
+    return raw_data_buffer.export()
+
+def get_raw_buffered_meta() -> list:
+    return raw_data_buffer.export_meta()
@@ -1,4 +1,13 @@
-from .data_cumulated import DataCumulated
-from .proccess_data import ProcessData
-from .quadrant_data import divide_into_quadrants, get_quadrant_statistics
-from .data_export import DataExport
\ No newline at end of file
+from .proccess_data import ProcessData, RAW_TO_TEMP_GAIN, RAW_TO_TEMP_OFFSET
+from .quadrant_data import divide_into_quadrants, get_quadrant_statistics, quadrant_slices
+from .roi import polygon_mask
+from .data_export import DataExport
+from .segment_writer import SegmentWriter, read_segment, list_segments
+
+
+def __getattr__(name):
+    # The 3D chart pulls in matplotlib and scipy, loaded only when it is used
+    if name == "DataCumulated":
+        from .data_cumulated import DataCumulated
+        return DataCumulated
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,32 +1,62 @@
 # * Library imports
+import time
 import asyncio
 import numpy as np
 from pathlib import Path
 from datetime import datetime
 
 # * File imports
-from ..data_buffer import get_polygon_buffered_data
+from ..data_buffer import get_polygon_buffered_data, polygon_data_buffer
+from ..util_functions import metrics, tracer
+from .segment_writer import SegmentWriter
 
 
 class DataExport:
-    def __init__(self, output_dir="./data/exports", file_prefix="polygon_data"):
+    def __init__(self, output_dir="./data/exports", file_prefix="polygon_data", backend="binary",
+                 max_segment_bytes=512 << 20, max_segment_seconds=3600.0, max_segments=48, max_total_bytes=None):
         """
         Initialize PolygonDataExport with output directory and file naming options.
 
+        The binary backend appends every exported frame to rotating float32 .npy
+        segments (see SegmentWriter), one buffered write per frame. The text
+        backend keeps the old behaviour of overwriting a single .txt file with
+        the latest frame; use export_convert to render segments as text offline.
+
         Args:
-            output_dir: Directory where text files will be saved
+            output_dir: Directory where export files will be saved
             file_prefix: Prefix for generated filenames
+            backend: "binary" for .npy segments, "text" for np.savetxt
+            max_segment_bytes: Binary backend, segment size before rotating
+            max_segment_seconds: Binary backend, segment duration before rotating
+            max_segments: Binary backend, segments kept on disk (None keeps all)
+            max_total_bytes: Binary backend, total size kept on disk (None for no limit)
         """
+        if backend not in ("binary", "text"):
+            raise ValueError(f"Unknown export backend '{backend}'")
+
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.file_prefix = file_prefix
+        self.backend = backend
         self.current_file = None
         self.is_exporting = False
-
-    def _generate_filename(self):
+        self.segment_writer = None
+        if backend == "binary":
+            self.segment_writer = SegmentWriter(self.output_dir, file_prefix, max_segment_bytes=max_segment_bytes,
+                                                max_segment_seconds=max_segment_seconds, max_segments=max_segments,
+                                                max_total_bytes=max_total_bytes)
+        self.frames_exported = 0
+        self.last_export_ms = 0.0
+
+    def _generate_filename(self, extension=".txt", prefix=None):
         """Generate a unique filename with timestamp."""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return self.output_dir / f"{self.file_prefix}_{timestamp}.txt"
+        return self.output_dir / f"{prefix or self.file_prefix}_{timestamp}{extension}"
+
+    def _write_segment(self, matrix_data, timestamp):
+        self.segment_writer.write(matrix_data, timestamp)
+        self.segment_writer.flush()
+        self.current_file = self.segment_writer.current_file
 
     async def start_export(self, update_interval=1.0):
         """
@@ -40,26 +70,44 @@ class DataExport:
             return
 
         self.is_exporting = True
-        self.current_file = self._generate_filename()
+        if self.backend == "text":
+            self.current_file = self._generate_filename()
+            print(f"Started polygon data export to: {self.current_file}")
+        else:
+            print(f"Started polygon data export to segments in: {self.output_dir}")
 
-        print(f"Started polygon data export to: {self.current_file}")
+        last_matrix = None
 
         try:
             while self.is_exporting:
                 # Get current data from polygon buffer
                 buffered_data = get_polygon_buffered_data()
 
-                if buffered_data and len(buffered_data) > 0:
-                    # Get the last frame (matrix)
-                    matrix_data = buffered_data[-1]
+                # Get the last frame (matrix), skip it if it was already exported
+                if buffered_data and buffered_data[-1] is not last_matrix:
+                    matrix_data = last_matrix = buffered_data[-1]
+                    trace = polygon_data_buffer.latest_trace()
+                    started = time.perf_counter()
 
                     # Write matrix to file
-                    await asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: np.savetxt(self.current_file, matrix_data, fmt='%.4f')
-                    )
-
-                    print(f"Exported matrix with shape {matrix_data.shape}")
+                    if self.backend == "binary":
+                        await asyncio.get_event_loop().run_in_executor(
+                            None, self._write_segment, matrix_data, time.time())
+                    else:
+                        await asyncio.get_event_loop().run_in_executor(
+                            None,
+                            lambda: np.savetxt(self.current_file, matrix_data, fmt='%.4f')
+                        )
+                        print(f"Exported matrix with shape {matrix_data.shape}")
+
+                    self.frames_exported += 1
+                    self.last_export_ms = (time.perf_counter() - started) * 1000
+                    metrics.count("export.frames")
+                    if self.backend == "binary":
+                        # Segments store float32
+                        metrics.count("export.bytes", matrix_data.size * 4)
+                    metrics.observe("export", self.last_export_ms / 1000)
+                    tracer.mark("export", trace)
 
                 await asyncio.sleep(update_interval)
 
@@ -68,7 +116,12 @@ class DataExport:
             import traceback
             traceback.print_exc()
         finally:
-            print(f"Export stopped. Data saved to: {self.current_file}")
+            if self.segment_writer is not None:
+                self.segment_writer.close()
+                print(f"Export stopped. {self.frames_exported} frames in {self.segment_writer.segments_written} "
+                      f"segments, {self.segment_writer.segments_deleted} old segments removed")
+            else:
+                print(f"Export stopped. Data saved to: {self.current_file}")
 
     def stop_export(self):
         """Stop the continuous export process."""
@@ -84,16 +137,20 @@ class DataExport:
             print("No polygon data in buffer to export")
             return None
 
-        filename = self._generate_filename()
-
         # Get the last frame (matrix)
         matrix_data = buffered_data[-1]
 
         # Save matrix to file
-        await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: np.savetxt(filename, matrix_data, fmt='%.4f')
-        )
+        if self.backend == "binary":
+            # Own prefix so the snapshot is not mistaken for a segment
+            filename = self._generate_filename(".npy", prefix=f"{self.file_prefix}_snapshot")
+            await asyncio.get_event_loop().run_in_executor(None, np.save, filename, matrix_data)
+        else:
+            filename = self._generate_filename()
+            await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: np.savetxt(filename, matrix_data, fmt='%.4f')
+            )
 
         print(f"Exported matrix with shape {matrix_data.shape} to {filename}")
         return str(filename)
@@ -0,0 +1,64 @@
+# * Library imports
+import argparse
+import numpy as np
+from pathlib import Path
+from typing import List, Optional
+
+# * File imports
+from .segment_writer import list_segments, read_segment
+
+
+def convert_segment(segment, output_dir=None, fmt: str = "txt", start: int = 0, stop: Optional[int] = None,
+                    step: int = 1) -> List[Path]:
+    """
+    Render frames of an export segment as text, one file per frame.
+
+    Files are named <segment>_<frame>.txt (or .csv) and match the format the
+    text export backend wrote (np.savetxt, 4 decimals, NaN outside the ROI).
+
+    Args:
+        segment: Segment .npy file written by the binary export backend
+        output_dir: Directory for the text files, defaults to next to the segment
+        fmt: "txt" (space separated) or "csv"
+        start: First frame to convert
+        stop: Frame to stop before, None converts to the end
+        step: Convert every step-th frame
+
+    Returns:
+        The written files
+    """
+    segment = Path(segment)
+    output_dir = Path(output_dir) if output_dir else segment.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    delimiter = "," if fmt == "csv" else " "
+
+    frames, timestamps = read_segment(segment)
+    written = []
+    for i in range(len(frames))[start:stop:step]:
+        filename = output_dir / f"{segment.stem}_{i:06d}.{fmt}"
+        np.savetxt(filename, frames[i], fmt='%.4f', delimiter=delimiter, header=f"timestamp {timestamps[i]:.6f}")
+        written.append(filename)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert binary export segments to text")
+    parser.add_argument("segments", nargs="*", help="Segment .npy files, defaults to all in --dir")
+    parser.add_argument("--dir", default="./data/exports", help="Export directory searched when no files are given")
+    parser.add_argument("--prefix", default="polygon_data", help="Segment prefix searched when no files are given")
+    parser.add_argument("--format", choices=("txt", "csv"), default="txt")
+    parser.add_argument("--output", default=None, help="Output directory")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--stop", type=int, default=None)
+    parser.add_argument("--step", type=int, default=1)
+    parser.add_argument("--last", action="store_true", help="Only the newest frame, like the old text export")
+    args = parser.parse_args()
+
+    segments = [Path(path) for path in args.segments] or list_segments(args.dir, args.prefix)
+    if args.last:
+        segments = segments[-1:]
+        args.start, args.stop, args.step = -1, None, 1
+
+    for segment in segments:
+        files = convert_segment(segment, args.output, args.format, args.start, args.stop, args.step)
+        print(f"{segment}: {len(files)} frames converted")
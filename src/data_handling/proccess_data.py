@@ -1,18 +1,70 @@
 # * Library imports
+import time
 import asyncio
 import numpy as np
 import datetime
+from typing import Optional
 
 # * File imports
-from ..data_buffer import get_raw_buffered_data, processed_data_buffer
+from ..data_buffer import get_raw_buffered_data, get_raw_buffered_meta, processed_data_buffer
+from ..util_functions import metrics, tracer
+
+# Linear raw count to °C calibration
+# RAW_TO_TEMP_GAIN, RAW_TO_TEMP_OFFSET = 0.0107143, -44.2857
+# Bik precizak
+RAW_TO_TEMP_GAIN = 0.0130303
+RAW_TO_TEMP_OFFSET = -62.4242
 
 class ProcessData:
-    def __init__(self, raw_buffer=None, processed_buffer=None):
+    def __init__(self, raw_buffer=None, processed_buffer=None, drift_coefficient: float = 0.0,
+                 fpa_reference: Optional[float] = None):
+        """
+        Convert raw counts to °C.
+
+        Drift compensation uses the FPA temperature decoded from the camera
+        header row: the offset is shifted by -drift_coefficient * (fpa - reference)
+        per frame, so it costs nothing beyond the normal conversion.
+
+        Args:
+            drift_coefficient: °C of reading change per °C of FPA temperature change, 0 disables compensation
+            fpa_reference: FPA temperature the calibration was made at, None uses the first frame's
+        """
         self.raw_buffer = raw_buffer or get_raw_buffered_data()
         self.processed_buffer = processed_buffer or processed_data_buffer
         self.time_list = []
+        # (gain, offset, profile id) swapped as one object so a frame never mixes two profiles
+        self.conversion = (RAW_TO_TEMP_GAIN, RAW_TO_TEMP_OFFSET, 0)
+        self.drift_coefficient = drift_coefficient
+        self.fpa_reference = fpa_reference
+        self.drift_correction = 0.0
+
+    @property
+    def gain(self) -> float:
+        return self.conversion[0]
+
+    @property
+    def offset(self) -> float:
+        return self.conversion[1]
+
+    @property
+    def profile_id(self) -> int:
+        return self.conversion[2]
+
+    def set_conversion(self, gain: float, offset: float, profile_id: int = 0):
+        """Switch the raw to °C conversion, takes effect with the next frame."""
+        self.conversion = (gain, offset, profile_id)
+
+    def update_drift(self, meta: Optional[dict]) -> float:
+        """Offset correction for the frame's FPA temperature, 0 without compensation or telemetry."""
+        if not self.drift_coefficient or not meta or meta.get("fpa_temperature") is None:
+            return self.drift_correction
+        if self.fpa_reference is None:
+            self.fpa_reference = meta["fpa_temperature"]
+        self.drift_correction = -self.drift_coefficient * (meta["fpa_temperature"] - self.fpa_reference)
+        return self.drift_correction
 
     async def process_data(self):
+        last_data = None
         try:
             while True:
                 self.raw_buffer = get_raw_buffered_data()
@@ -23,15 +75,34 @@ class ProcessData:
 
                 data = self.raw_buffer[-1]
 
-                # data_matrix = 0.0107143 * data - 44.2857
-                # Bik precizak
-                data_matrix = 0.0130303 * data - 62.4242
+                # Each captured frame is converted once, its trace stamp would otherwise age on repeats
+                if data is last_data:
+                    await asyncio.sleep(0)
+                    continue
+                last_data = data
+
+                started = time.perf_counter()
+                meta_list = get_raw_buffered_meta()
+                meta = meta_list[-1] if meta_list else None
+                # Replays carry the conversion the frame was recorded with
+                conversion = meta.get("conversion") if meta else None
+                gain, offset, profile_id = conversion or self.conversion
+                offset += self.update_drift(meta)
+                data_matrix = gain * data + offset
+                # Pixels the source has no value for (sparse replays) become NaN, not a converted 0
+                valid_mask = meta.get("valid_mask") if meta else None
+                if valid_mask is not None:
+                    data_matrix[~valid_mask] = np.nan
 
                 current_time = datetime.datetime.now().strftime("%d-%m-%Y %H:%M:%S")
                 self.time_list.append(current_time)
                 np_time_list = np.array(self.time_list)
 
-                self.processed_buffer.add(temp_data=data_matrix, time_data=np_time_list)
+                trace = meta.get("trace") if meta else None
+                self.processed_buffer.add(temp_data=data_matrix, time_data=np_time_list, tag=profile_id, trace=trace)
+                tracer.mark("process", trace)
+                metrics.count("process.frames")
+                metrics.observe("process", time.perf_counter() - started)
 
                 await asyncio.sleep(0)
         except asyncio.CancelledError:
@@ -1,15 +1,26 @@
 # * Library imports
 import numpy as np
 
+def quadrant_slices(shape):
+    """(row slice, col slice) of Q1..Q4 for a frame of the given shape, see divide_into_quadrants."""
+    rows, cols = shape[-2:]
+    mid_row = rows // 2
+    mid_col = cols // 2
+
+    return (
+        (slice(mid_row//2, mid_row), slice(mid_col//2, mid_col)),  # Top-left
+        (slice(mid_row//2, mid_row), slice(mid_col, mid_col+mid_col//2)),  # Top-right
+        (slice(mid_row, mid_row+mid_row//2), slice(mid_col//2, mid_col)),  # Bottom-left
+        (slice(mid_row, mid_row+mid_row//2), slice(mid_col, mid_col+mid_col//2)),  # Bottom-right
+    )
+
 def divide_into_quadrants(matrix):
     rows, cols = matrix.shape
     mid_row = rows // 2
     mid_col = cols // 2
 
-    quadrant1 = matrix[mid_row//2:mid_row, mid_col//2:mid_col]  # Top-left
-    quadrant2 = matrix[mid_row//2:mid_row, mid_col:mid_col+mid_col//2]  # Top-right
-    quadrant3 = matrix[mid_row:mid_row+mid_row//2, mid_col//2:mid_col]  # Bottom-left
-    quadrant4 = matrix[mid_row:mid_row+mid_row//2, mid_col:mid_col+mid_col//2]  # Bottom-right
+    quadrant1, quadrant2, quadrant3, quadrant4 = (matrix[row_slice, col_slice]
+                                                  for row_slice, col_slice in quadrant_slices(matrix.shape))
 
     return quadrant1, quadrant2, quadrant3, quadrant4, mid_row, mid_col
 
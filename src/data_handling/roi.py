@@ -0,0 +1,22 @@
+# * Library imports
+import cv2
+import numpy as np
+from typing import Sequence, Tuple
+
+
+def polygon_mask(points: Sequence[Tuple[int, int]], heatmap_scale: Tuple[int, int],
+                 shape: Tuple[int, int]) -> np.ndarray:
+    """Boolean mask of a polygon drawn on the heatmap (heatmap_scale = (width, height)) in data coordinates."""
+    rows, cols = shape
+
+    scale_x = cols / heatmap_scale[0]
+    scale_y = rows / heatmap_scale[1]
+
+    scaled_points = [(int(x * scale_x), int(y * scale_y))
+                     for x, y in points]
+
+    mask = np.zeros((rows, cols), dtype=np.uint8)
+    pts = np.array(scaled_points, np.int32)
+    cv2.fillPoly(mask, [pts], 1)
+
+    return mask.astype(bool)
@@ -0,0 +1,198 @@
+# * Library imports
+import time
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+# Fixed .npy header size so the frame count can be rewritten in place
+NPY_HEADER_SIZE = 128
+NPY_MAGIC = b'\x93NUMPY\x01\x00'
+INDEX_DTYPE = np.dtype('<f8')
+
+
+class AppendableNpy:
+    def __init__(self, path, dtype, item_shape: Tuple[int, ...]):
+        """
+        .npy file that grows along its first axis.
+
+        The header is padded to NPY_HEADER_SIZE bytes and rewritten with the
+        current length on every flush, so the file is always loadable with
+        np.load(path, mmap_mode='r') up to the last flush.
+
+        Args:
+            path: Output file
+            dtype: Element dtype
+            item_shape: Shape of one entry, the file shape is (n, *item_shape)
+        """
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.item_shape = tuple(item_shape)
+        self.item_bytes = int(np.prod(self.item_shape)) * self.dtype.itemsize
+        self.count = 0
+        self.handle = open(self.path, 'wb', buffering=1 << 20)
+        self._write_header()
+
+    def _write_header(self):
+        header = repr({'descr': np.lib.format.dtype_to_descr(self.dtype), 'fortran_order': False,
+                       'shape': (self.count, *self.item_shape)}).encode('latin1')
+        padding = NPY_HEADER_SIZE - len(NPY_MAGIC) - 2 - len(header) - 1
+        if padding < 0:
+            raise ValueError(f"Shape {self.item_shape} does not fit a {NPY_HEADER_SIZE} byte header")
+        self.handle.write(NPY_MAGIC + (NPY_HEADER_SIZE - len(NPY_MAGIC) - 2).to_bytes(2, 'little') +
+                          header + b' ' * padding + b'\n')
+
+    def append(self, data: np.ndarray):
+        data = np.asarray(data, dtype=self.dtype)
+        if data.shape != self.item_shape:
+            raise ValueError(f"Shape {data.shape} does not match {self.item_shape}")
+        self.handle.write(memoryview(np.ascontiguousarray(data.reshape(-1))).cast('B'))
+        self.count += 1
+
+    @property
+    def size_bytes(self) -> int:
+        return NPY_HEADER_SIZE + self.count * self.item_bytes
+
+    def flush(self):
+        self.handle.flush()
+        position = self.handle.tell()
+        self.handle.seek(0)
+        self._write_header()
+        self.handle.seek(position)
+        self.handle.flush()
+
+    def close(self):
+        if self.handle is None:
+            return
+        self.flush()
+        self.handle.close()
+        self.handle = None
+
+
+class SegmentWriter:
+    def __init__(self, output_dir, file_prefix: str, dtype=np.float32, max_segment_bytes: int = 512 << 20,
+                 max_segment_seconds: float = 3600.0, max_segments: Optional[int] = 48,
+                 max_total_bytes: Optional[int] = None):
+        """
+        Append frames to rotating .npy segments with a timestamp sidecar.
+
+        Each segment is <prefix>_<YYYYmmdd_HHMMSS>.npy with shape (n, rows, cols)
+        and <segment>.idx.npy holding one timestamp per frame. A new segment is
+        started when the current one reaches max_segment_bytes or
+        max_segment_seconds; the oldest segments are deleted to stay within
+        max_segments and max_total_bytes.
+
+        Args:
+            output_dir: Directory where segments will be saved
+            file_prefix: Prefix for segment filenames
+            dtype: Stored dtype, float32 keeps 4 decimals of a temperature at half the size
+            max_segment_bytes: Rotate once a segment would grow past this size
+            max_segment_seconds: Rotate after this many seconds of wall-clock time
+            max_segments: Segments kept on disk, None keeps all
+            max_total_bytes: Total size kept on disk, None for no limit
+        """
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.file_prefix = file_prefix
+        self.dtype = np.dtype(dtype)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_seconds = max_segment_seconds
+        self.max_segments = max_segments
+        self.max_total_bytes = max_total_bytes
+
+        self.data: Optional[AppendableNpy] = None
+        self.index: Optional[AppendableNpy] = None
+        self._segment_start = 0.0
+
+        self.frames_written = 0
+        self.segments_written = 0
+        self.segments_deleted = 0
+
+    @property
+    def current_file(self) -> Optional[Path]:
+        return self.data.path if self.data is not None else None
+
+    def _generate_filename(self) -> Path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = self.output_dir / f"{self.file_prefix}_{timestamp}.npy"
+        # Several rotations within one second
+        suffix = 1
+        while path.exists():
+            path = self.output_dir / f"{self.file_prefix}_{timestamp}_{suffix}.npy"
+            suffix += 1
+        return path
+
+    def _open_segment(self, shape: Tuple[int, ...]):
+        self._close_segment()
+        path = self._generate_filename()
+        self.data = AppendableNpy(path, self.dtype, shape)
+        self.index = AppendableNpy(index_path(path), INDEX_DTYPE, ())
+        self._segment_start = time.monotonic()
+        self._apply_retention()
+
+    def _close_segment(self):
+        if self.data is not None:
+            self.data.close()
+            self.index.close()
+            self.data = self.index = None
+            self.segments_written += 1
+
+    def segments(self) -> List[Path]:
+        """Segments of this prefix on disk, oldest first."""
+        return list_segments(self.output_dir, self.file_prefix)
+
+    def _apply_retention(self):
+        segments = [path for path in self.segments() if path != self.current_file]
+        keep_count = None if self.max_segments is None else max(self.max_segments - 1, 0)
+
+        total = sum(path.stat().st_size for path in segments)
+        while segments and ((keep_count is not None and len(segments) > keep_count) or
+                            (self.max_total_bytes is not None and total > self.max_total_bytes)):
+            oldest = segments.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink()
+            index_path(oldest).unlink(missing_ok=True)
+            self.segments_deleted += 1
+
+    def write(self, matrix: np.ndarray, timestamp: Optional[float] = None):
+        """Append one frame, rotating first if the current segment is full."""
+        if timestamp is None:
+            timestamp = time.time()
+
+        if (self.data is None or self.data.item_shape != matrix.shape or
+                self.data.size_bytes + self.data.item_bytes > self.max_segment_bytes or
+                time.monotonic() - self._segment_start >= self.max_segment_seconds):
+            self._open_segment(matrix.shape)
+
+        self.data.append(matrix)
+        self.index.append(np.float64(timestamp))
+        self.frames_written += 1
+
+    def flush(self):
+        if self.data is not None:
+            self.data.flush()
+            self.index.flush()
+
+    def close(self):
+        self._close_segment()
+
+
+def index_path(segment) -> Path:
+    segment = Path(segment)
+    return segment.with_name(segment.name[:-len(".npy")] + ".idx.npy")
+
+
+def list_segments(output_dir, file_prefix: str) -> List[Path]:
+    """Segment files for file_prefix in output_dir, oldest first."""
+    paths = [path for path in Path(output_dir).glob(f"{file_prefix}_[0-9]*.npy") if not path.name.endswith(".idx.npy")]
+    return sorted(paths, key=lambda path: (path.stat().st_mtime, path.name))
+
+
+def read_segment(path) -> Tuple[np.ndarray, np.ndarray]:
+    """(frames, timestamps) of a segment, frames memory-mapped."""
+    frames = np.load(path, mmap_mode='r')
+    sidecar = index_path(path)
+    timestamps = np.load(sidecar) if sidecar.exists() else np.full(len(frames), np.nan)
+    # The index is flushed after the data, a crash can leave one side longer
+    count = min(len(frames), len(timestamps))
+    return frames[:count], timestamps[:count]
@@ -0,0 +1,7 @@
+from .codecs import CODECS, encode_chunk, decode_chunk
+from .thrm_format import (ThrmWriter, read_file_header, read_index, read_frame, read_chunk, read_roi_table, read_roi,
+                          expand_roi, metadata_polygon_mask, metadata_conversions, iter_frames)
+from .recorder import ThermalRecorder
+from .thrm_reader import ThrmReader
+from .time_index import TimeIndex, parse_time
+from .summary import SUMMARY_DTYPE, SummaryBuilder, RecordingSummary, build_summary, summary_path
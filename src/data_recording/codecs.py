@@ -0,0 +1,82 @@
+# * Library imports
+import bz2
+import lzma
+import zlib
+import numpy as np
+from typing import Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# name -> (compress(data, level), decompress(data), default level)
+CODECS = {
+    "zlib": (lambda data, level: zlib.compress(data, level), zlib.decompress, 1),
+    "bz2": (lambda data, level: bz2.compress(data, level), bz2.decompress, 1),
+    "lzma": (lambda data, level: lzma.compress(data, preset=level), lzma.decompress, 0),
+}
+
+if zstandard is not None:
+    CODECS["zstd"] = (lambda data, level: zstandard.ZstdCompressor(level=level).compress(data),
+                      lambda data: zstandard.ZstdDecompressor().decompress(data), 3)
+
+if lz4 is not None:
+    CODECS["lz4"] = (lambda data, level: lz4.frame.compress(data, compression_level=level),
+                     lz4.frame.decompress, 0)
+
+
+def get_codec(name: str):
+    if name not in CODECS:
+        raise ValueError(f"Codec '{name}' is not available, choose one of {sorted(CODECS)}")
+    return CODECS[name]
+
+
+def encode_chunk(frames: np.ndarray, codec: str = "zlib", level=None, shuffle: bool = True) -> bytes:
+    """
+    Delta-encode and compress an (n, rows, cols) uint16 chunk.
+
+    The first frame is stored as is, every following frame as the wrapping
+    uint16 difference to its predecessor. With shuffle the low and high bytes
+    are grouped, which makes the near-zero deltas of static scenes compress
+    much better.
+    """
+    compress, _, default_level = get_codec(codec)
+
+    frames = np.ascontiguousarray(frames, dtype='<u2')
+    deltas = np.empty_like(frames)
+    deltas[0] = frames[0]
+    np.subtract(frames[1:], frames[:-1], out=deltas[1:])
+
+    data = deltas.view(np.uint8)
+    if shuffle:
+        pairs = data.reshape(-1, 2)
+        data = np.concatenate((pairs[:, 0], pairs[:, 1]))
+    return compress(data, default_level if level is None else level)
+
+
+def decode_chunk(payload: bytes, count: int, shape: Tuple[int, int], codec: str = "zlib",
+                 shuffle: bool = True) -> np.ndarray:
+    """Inverse of encode_chunk, returns an (count, rows, cols) uint16 array."""
+    _, decompress, _ = get_codec(codec)
+
+    data = np.frombuffer(decompress(payload), dtype=np.uint8)
+    frames = np.empty(data.size // 2, dtype='<u2')
+    if shuffle:
+        half = frames.size
+        frame_bytes = frames.view(np.uint8)
+        frame_bytes[0::2] = data[:half]
+        frame_bytes[1::2] = data[half:]
+    else:
+        frames.view(np.uint8)[:] = data
+    frames = frames.reshape(count, *shape)
+
+    # Undo the deltas in place, frame by frame (much faster than cumsum over axis 0)
+    for i in range(1, count):
+        np.add(frames[i - 1], frames[i], out=frames[i])
+    return frames
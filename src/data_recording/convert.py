@@ -0,0 +1,168 @@
+# * Library imports
+import os
+import time
+import argparse
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional
+
+# * File imports
+from .thrm_reader import ThrmReader
+
+FORMATS = ("txt", "csv", "npy", "stacked")
+
+
+def _frame_matrix(reader: ThrmReader, i: int) -> np.ndarray:
+    # Temperatures as the live pipeline exports them, NaN outside the ROI
+    return reader.temperature(i)
+
+
+def _convert_range(filename, start: int, stop: int, fmt: str, output_dir, stacked_path, stacked_first: int,
+                   dtype) -> list:
+    """Worker: convert frames [start, stop) and return (position, timestamp, frame number, min, max, mean) rows."""
+    output_dir = Path(output_dir)
+    stacked = np.load(stacked_path, mmap_mode='r+') if stacked_path else None
+    rows = []
+
+    with ThrmReader(filename, write_sidecar=False) as reader:
+        for i in range(start, stop):
+            matrix = _frame_matrix(reader, i)
+            frame_num = int(reader.index['frame_num'][i])
+
+            if fmt == "txt":
+                np.savetxt(output_dir / f"frame_{frame_num:04d}.txt", matrix, fmt='%.4f')
+            elif fmt == "csv":
+                np.savetxt(output_dir / f"frame_{frame_num:04d}.csv", matrix, fmt='%.4f', delimiter=",")
+            elif fmt == "npy":
+                np.save(output_dir / f"frame_{frame_num:04d}.npy", matrix.astype(dtype))
+            else:
+                stacked[i - stacked_first] = matrix
+
+            rows.append((i, float(reader.index['timestamp'][i]), frame_num, float(np.nanmin(matrix)),
+                         float(np.nanmax(matrix)), float(np.nanmean(matrix))))
+
+    if stacked is not None:
+        stacked.flush()
+    return rows
+
+
+def write_metadata(path, filename, version: int, rows: list):
+    """metadata.txt in the layout test3.read_thermal_recording used."""
+    with open(path, 'w') as meta:
+        meta.write(f"Binary File: {filename}\n")
+        meta.write(f"Total Frames: {len(rows)}\n")
+        meta.write(f"Version: {version}\n")
+        meta.write("=" * 70 + "\n\n")
+
+        for _, timestamp, frame_num, frame_min, frame_max, frame_mean, shape, extension in rows:
+            dt = datetime.fromtimestamp(timestamp)
+            meta.write(f"Frame {frame_num}:\n")
+            if extension:
+                meta.write(f"  File: frame_{frame_num:04d}.{extension}\n")
+            meta.write(f"  Timestamp: {timestamp} ({dt.strftime('%Y-%m-%d %H:%M:%S')})\n")
+            meta.write(f"  Shape: {shape}\n")
+            meta.write(f"  Min: {frame_min:.4f}\n")
+            meta.write(f"  Max: {frame_max:.4f}\n")
+            meta.write(f"  Mean: {frame_mean:.4f}\n\n")
+
+
+def convert_recording(filename, fmt: str = "txt", output_dir=None, workers: Optional[int] = None,
+                      chunk_size: int = 64, start: int = 0, stop: Optional[int] = None, dtype="float64",
+                      progress: bool = True) -> dict:
+    """
+    Convert a THRM recording (version 1 or 2) to per-frame text/CSV/NPY files or one stacked .npy.
+
+    Frames are split into chunks of chunk_size and converted by a process pool;
+    each worker memory-maps the recording itself, so only frame ranges and the
+    per-frame statistics cross process boundaries. A metadata.txt with the
+    timestamp, min, max and mean of every frame is written alongside.
+
+    Args:
+        filename: Recording to convert
+        fmt: "txt", "csv", "npy" (one file per frame) or "stacked" (frames.npy of shape (n, rows, cols))
+        output_dir: Output directory, defaults to <recording>_<fmt> next to the file
+        workers: Worker processes, defaults to the CPU count
+        chunk_size: Frames per task
+        start: First frame to convert
+        stop: Frame to stop before, None converts to the end
+        dtype: Element type for npy and stacked output
+        progress: Print progress and throughput while converting
+
+    Returns:
+        Summary with frame count, output location and throughput
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', choose one of {FORMATS}")
+
+    started = time.perf_counter()
+    filename = Path(filename)
+    output_dir = Path(output_dir) if output_dir else filename.parent / f"{filename.stem}_{fmt}"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Opening once here builds and saves the sidecar index for unindexed files before the workers start
+    with ThrmReader(filename) as reader:
+        version, shape = reader.version, tuple(reader.shape)
+        positions = range(len(reader))[start:stop]
+
+    stacked_path = None
+    if fmt == "stacked":
+        stacked_path = output_dir / "frames.npy"
+        stacked = np.lib.format.open_memmap(stacked_path, mode='w+', dtype=dtype, shape=(len(positions), *shape))
+        del stacked
+
+    chunks = [(positions[i], positions[min(i + chunk_size, len(positions)) - 1] + 1)
+              for i in range(0, len(positions), chunk_size)]
+    first = positions[0] if len(positions) else 0
+    rows = []
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_convert_range, str(filename), chunk_start, chunk_stop, fmt, str(output_dir),
+                               str(stacked_path) if stacked_path else None, first, dtype)
+                   for chunk_start, chunk_stop in chunks]
+
+        for done in as_completed(futures):
+            rows.extend(done.result())
+            if progress:
+                elapsed = time.perf_counter() - started
+                rate = len(rows) / elapsed if elapsed else 0.0
+                eta = (len(positions) - len(rows)) / rate if rate else 0.0
+                print(f"\r{len(rows)}/{len(positions)} frames, {rate:.1f} frames/s, ETA {eta:.0f} s",
+                      end="", flush=True)
+
+    if progress and rows:
+        print()
+
+    rows.sort()
+    extension = fmt if fmt in ("txt", "csv", "npy") else None
+    write_metadata(output_dir / "metadata.txt", filename, version,
+                   [(*row, shape, extension) for row in rows])
+
+    elapsed = time.perf_counter() - started
+    return {
+        "frames": len(rows),
+        "first_frame": first,
+        "output": str(stacked_path or output_dir),
+        "seconds": elapsed,
+        "frames_per_second": len(rows) / elapsed if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert THRM recordings to txt, csv, npy or a stacked npy")
+    parser.add_argument("files", nargs="+", help="Recordings to convert")
+    parser.add_argument("--format", choices=FORMATS, default="txt")
+    parser.add_argument("--output", default=None, help="Output directory, defaults to <recording>_<format>")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, defaults to the CPU count")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Frames per worker task")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--stop", type=int, default=None)
+    parser.add_argument("--dtype", default="float64", help="Element type for npy and stacked output")
+    args = parser.parse_args()
+
+    for recording in args.files:
+        result = convert_recording(recording, args.format, args.output, args.workers, args.chunk_size,
+                                   args.start, args.stop, args.dtype)
+        print(f"{recording}: {result['frames']} frames to {result['output']} in {result['seconds']:.1f} s "
+              f"({result['frames_per_second']:.1f} frames/s)")
@@ -0,0 +1,39 @@
+# * Library imports
+import time
+import argparse
+
+# * File imports
+from ..data_handling.quadrant_data import quadrant_slices
+from .summary import RecordingSummary, build_summary
+from .thrm_reader import ThrmReader
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query THRM recording summaries")
+    parser.add_argument("files", nargs="+", help="Recordings to summarize or query")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute the summary even if it is up to date")
+    parser.add_argument("--sample-step", type=int, default=8, help="Pixel stride for the percentiles")
+    parser.add_argument("--column", default="max", help="Column for --above, --below and --top")
+    parser.add_argument("--above", type=float, default=None)
+    parser.add_argument("--below", type=float, default=None)
+    parser.add_argument("--min-frames", type=int, default=1)
+    parser.add_argument("--top", type=float, default=None, help="Window length in seconds for the hottest windows")
+    parser.add_argument("--count", type=int, default=10)
+    args = parser.parse_args()
+
+    for recording in args.files:
+        started = time.perf_counter()
+        with ThrmReader(recording) as reader:
+            quadrants = quadrant_slices(reader.shape)
+        if args.rebuild:
+            build_summary(recording, quadrants, sample_step=args.sample_step)
+        summary = RecordingSummary(recording, quadrants=quadrants, sample_step=args.sample_step)
+        print(f"{recording}: {len(summary)} frames summarized in {summary.path} "
+              f"({time.perf_counter() - started:.2f} s)")
+
+        if args.above is not None or args.below is not None:
+            for start, stop in summary.find(args.column, args.above, args.below, args.min_frames):
+                print(f"  {summary.describe(start, stop)}")
+        if args.top:
+            for start, stop, average in summary.top_windows(args.top, args.column, args.count):
+                print(f"  {args.column} {average:.2f} °C: {summary.describe(start, stop)}")
@@ -0,0 +1,316 @@
+# * Library imports
+import time
+import queue
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Sequence
+
+# * File imports
+from .codecs import encode_chunk
+from .summary import SummaryBuilder, build_summary, summary_path
+from .thrm_format import ThrmWriter, metadata_conversions
+
+
+class ThermalRecorder(threading.Thread):
+    def __init__(self, path, shape, dtype=np.uint16, gain: float = 1.0, offset: float = 0.0,
+                 metadata: Optional[dict] = None, max_queue: int = 256, max_batch_frames: int = 32,
+                 flush_interval: float = 1.0, checkpoint_interval: float = 10.0, fsync: bool = False,
+                 codec: Optional[str] = None,
+                 chunk_frames: int = 64, compress_workers: int = 2, sparse: bool = False, summary: bool = False,
+                 summary_quadrants: Optional[Sequence] = None, summary_roi: Optional[np.ndarray] = None,
+                 summary_on_close: bool = False, header_row_bytes: int = 0, metrics=None, tracer=None):
+        """
+        Record every submitted frame to a THRM v2 file from a dedicated thread.
+
+        Frames arrive through a bounded queue and are written in batches, one
+        contiguous write per batch. submit() never blocks: when the queue is
+        full the frame is dropped and counted.
+
+        With a codec, frames are grouped into chunks that are delta-encoded and
+        compressed on a pool of compress_workers threads (zlib, lzma and numpy
+        release the GIL). Chunks are written in order as they complete, so this
+        thread only collects frames and does the file I/O.
+
+        In sparse mode only ROI pixels are stored. Each frame is submitted with
+        its flat ROI indices; a new ROI record is written whenever a different
+        index array object arrives, and the pixel gather runs on this thread.
+
+        With summary, per-frame statistics (min, max, mean, percentiles,
+        quadrant and ROI means in °C) are computed as frames are written and
+        saved to <file>.summary.npy on close, see summary.RecordingSummary.
+        That costs about 5 ms per 640x512 frame on this thread, more than a
+        125 Hz camera leaves, so sustained recordings use summary_on_close:
+        the same index is built with build_summary() after the file is closed.
+
+        Args:
+            path: Output file
+            shape: (rows, cols) of every frame
+            dtype: Frame dtype, uint16 for raw sensor counts
+            gain: Raw to temperature gain stored in the header
+            offset: Raw to temperature offset stored in the header
+            metadata: Extra JSON-serializable header information
+            max_queue: Frames buffered before new ones are dropped (256 is ~2 s at 125 Hz)
+            max_batch_frames: Upper bound on frames combined into one write
+            flush_interval: Seconds between flushes to the OS, 0 flushes after every batch
+            checkpoint_interval: Seconds between index checkpoints used for crash recovery, 0 disables them
+            fsync: Also fsync on every flush so data survives a power loss
+            codec: Compression codec name from codecs.CODECS, None records uncompressed
+            chunk_frames: Frames per compressed chunk
+            compress_workers: Threads compressing chunks in parallel
+            sparse: Store only the ROI pixels passed to submit()
+            summary: Build the summary index while recording (short or low-rate recordings only)
+            summary_quadrants: Four (row slice, col slice) pairs for the summary's quadrant columns
+            summary_roi: Boolean polygon mask for the summary's roi column
+            summary_on_close: Build the summary index from the file once it is closed, on this thread
+            header_row_bytes: Size of the raw camera header row stored with every frame, 0 stores none
+            metrics: Registry receiving record latency, lag, frames, bytes and drops (util_functions.metrics)
+            tracer: Frame tracer marking the "record" path when a traced frame reaches the file
+                    (util_functions.tracing), for compressed files when its chunk is written
+        """
+        super().__init__(name="thermal-recorder", daemon=True)
+        self.writer = ThrmWriter(path, shape, dtype=dtype, gain=gain, offset=offset, metadata=metadata,
+                                 codec=codec, chunk_frames=chunk_frames, sparse=sparse,
+                                 header_row_bytes=header_row_bytes)
+        self.path = self.writer.path
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.max_batch_frames = max_batch_frames
+        self.flush_interval = flush_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.fsync = fsync
+        self._stop_event = threading.Event()
+
+        self._pool = None
+        if codec is not None:
+            self._pool = ThreadPoolExecutor(max_workers=compress_workers, thread_name_prefix="thrm-compress")
+        self.max_pending_chunks = 2 * compress_workers
+        self._chunk = []
+        self._chunk_traces = []
+        self._pending = deque()
+        self._roi = None
+        self._full_roi = np.arange(int(np.prod(shape)), dtype=np.uint32) if sparse else None
+        self.summary = SummaryBuilder(shape, gain, offset, summary_quadrants, summary_roi) if summary else None
+        self.summary_on_close = summary_on_close and not summary
+        # Tag -> (gain, offset) of the profiles in the metadata, the live summary converts each tag with its own
+        self._conversions = metadata_conversions(metadata)
+        self.summary_quadrants = summary_quadrants
+        self.summary_roi = summary_roi
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.bytes_written = 0
+        self.batches_written = 0
+        self.max_queue_depth = 0
+        self.metrics = metrics
+        self.tracer = tracer
+
+    @property
+    def queue_depth(self) -> int:
+        return self.queue.qsize()
+
+    def submit(self, data: np.ndarray, timestamp: Optional[float] = None, tag: int = 0,
+               roi: Optional[np.ndarray] = None, header_row: Optional[np.ndarray] = None,
+               trace: Optional[float] = None) -> bool:
+        """
+        Queue a frame for writing, returns False if it was dropped.
+
+        roi is the flat pixel index array to keep in sparse mode (None keeps
+        every pixel). Pass the same array object while the ROI is unchanged.
+        header_row is the raw camera header row, stored when the recorder was
+        created with header_row_bytes (zeros if it is missing). trace is the
+        frame's tracing stamp.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        if self._full_roi is not None and roi is None:
+            roi = self._full_roi
+        try:
+            self.queue.put_nowait((timestamp, data, tag, roi, header_row, trace))
+        except queue.Full:
+            self.frames_dropped += 1
+            if self.metrics is not None:
+                self.metrics.count("record.dropped")
+            return False
+
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return True
+
+    def stop(self):
+        """Stop accepting frames, the thread drains the queue and closes the file."""
+        self._stop_event.set()
+
+    def run(self):
+        last_flush = last_checkpoint = time.monotonic()
+        try:
+            while not (self._stop_event.is_set() and self.queue.empty()):
+                try:
+                    batch = [self.queue.get(timeout=0.1)]
+                except queue.Empty:
+                    continue
+
+                while len(batch) < self.max_batch_frames:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                started = time.perf_counter()
+                self._write_batch(batch)
+                if self.metrics is not None:
+                    # Time on the recorder thread per batch, and how long the oldest frame waited in the queue
+                    self.metrics.observe("record", time.perf_counter() - started)
+                    self.metrics.observe("record.lag", time.time() - batch[0][0])
+
+                now = time.monotonic()
+                if self.checkpoint_interval and now - last_checkpoint >= self.checkpoint_interval:
+                    # Includes a flush
+                    self.writer.checkpoint(fsync=self.fsync)
+                    last_checkpoint = last_flush = now
+                elif now - last_flush >= self.flush_interval:
+                    self.writer.flush(fsync=self.fsync)
+                    last_flush = now
+
+        except Exception as e:
+            print(f"Error in recorder: {e}")
+            import traceback
+            traceback.print_exc()
+
+        finally:
+            if self._pool is not None:
+                try:
+                    bytes_written = self.bytes_written
+                    self._submit_chunk(self._chunk, self._chunk_traces)
+                    self._chunk, self._chunk_traces = [], []
+                    self._write_completed_chunks(wait=True)
+                    self._report_written(0, self.bytes_written - bytes_written)
+                except Exception as e:
+                    print(f"Error writing final chunks: {e}")
+                self._pool.shutdown()
+            self.writer.close()
+            if self.summary is not None:
+                try:
+                    self.summary.save(summary_path(self.path))
+                except Exception as e:
+                    print(f"Error saving recording summary: {e}")
+            elif self.summary_on_close and self.frames_written:
+                try:
+                    build_summary(self.path, self.summary_quadrants, self.summary_roi)
+                except Exception as e:
+                    print(f"Error building recording summary: {e}")
+
+    def _write_batch(self, batch):
+        # Split the batch wherever the ROI changes, the ROI record goes between the runs
+        start = 0
+        for i, (_, _, _, roi, _, _) in enumerate(batch):
+            if roi is not self._roi:
+                self._write_frames(batch[start:i])
+                self._set_roi(roi)
+                start = i
+        self._write_frames(batch[start:])
+
+    def _write_frames(self, items):
+        if not items:
+            return
+        bytes_written = self.bytes_written
+
+        frames = [(timestamp, data if roi is None else data.ravel()[roi], tag, header_row)
+                  for timestamp, data, tag, roi, header_row, _ in items]
+        traces = [item[5] for item in items]
+        if self.summary is not None:
+            self._add_to_summary(frames)
+        if self._pool is None:
+            self.bytes_written += self.writer.write_frames(frames)
+            self.frames_written += len(frames)
+            self.batches_written += 1
+            self._mark_traces(traces)
+        else:
+            self._add_to_chunk(frames, traces)
+        self._report_written(len(frames), self.bytes_written - bytes_written)
+
+    def _add_to_summary(self, frames):
+        # One add per run of frames with the same tag, each run converted with its profile
+        start = 0
+        for i in range(1, len(frames) + 1):
+            if i == len(frames) or frames[i][2] != frames[start][2]:
+                run = frames[start:i]
+                self.summary.add(np.stack([data.reshape(-1) for _, data, _, _ in run]),
+                                 [timestamp for timestamp, _, _, _ in run], self._roi,
+                                 self._conversions.get(frames[start][2]))
+                start = i
+
+    def _mark_traces(self, traces):
+        if self.tracer is not None:
+            for trace in traces:
+                self.tracer.mark("record", trace)
+
+    def _report_written(self, frames: int, bytes_written: int):
+        if self.metrics is not None:
+            self.metrics.count("record.frames", frames)
+            self.metrics.count("record.bytes", bytes_written)
+
+    def _set_roi(self, roi: Optional[np.ndarray]):
+        self._roi = roi
+        if roi is None:
+            return
+
+        # A chunk holds frames of a single ROI, close the open one first
+        if self._pool is not None:
+            self._submit_chunk(self._chunk, self._chunk_traces)
+            self._chunk, self._chunk_traces = [], []
+            self._write_completed_chunks(wait=True)
+        self.bytes_written += self.writer.write_roi(roi)
+
+    # * Compressed mode
+    def _add_to_chunk(self, batch, traces):
+        self._chunk.extend(batch)
+        self._chunk_traces.extend(traces)
+        chunk_frames = self.writer.chunk_frames
+        while len(self._chunk) >= chunk_frames:
+            self._submit_chunk(self._chunk[:chunk_frames], self._chunk_traces[:chunk_frames])
+            self._chunk = self._chunk[chunk_frames:]
+            self._chunk_traces = self._chunk_traces[chunk_frames:]
+
+        self._write_completed_chunks(wait=False)
+
+    def _submit_chunk(self, chunk, traces=()):
+        if not chunk:
+            return
+
+        # Backpressure lands here, on the recorder thread, and shows up as queue depth
+        while len(self._pending) >= self.max_pending_chunks:
+            self._write_next_chunk()
+
+        frames = [data for _, data, _, _ in chunk]
+        future = self._pool.submit(self._encode, frames)
+        self._pending.append((future, [timestamp for timestamp, _, _, _ in chunk], [tag for _, _, tag, _ in chunk],
+                              [header_row for _, _, _, header_row in chunk], traces))
+
+    def _encode(self, frames) -> bytes:
+        return encode_chunk(np.stack(frames), self.writer.codec, shuffle=self.writer.shuffle)
+
+    def _write_next_chunk(self):
+        future, timestamps, tags, header_rows, traces = self._pending.popleft()
+        self.bytes_written += self.writer.write_chunk(future.result(), timestamps, tags, header_rows)
+        self._mark_traces(traces)
+        self.frames_written += len(timestamps)
+        self.batches_written += 1
+
+    def _write_completed_chunks(self, wait: bool):
+        # Chunks are written in submission order, a slow head chunk holds back the ones behind it
+        while self._pending and (wait or self._pending[0][0].done()):
+            self._write_next_chunk()
+
+    def get_stats(self) -> dict:
+        return {
+            "frames_written": self.frames_written,
+            "frames_dropped": self.frames_dropped,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "bytes_written": self.bytes_written,
+            "batches_written": self.batches_written,
+            "compression_ratio": (self.frames_written * self.writer.frame_bytes / self.bytes_written
+                                  if self.bytes_written else 0.0),
+        }
@@ -0,0 +1,140 @@
+# * Library imports
+import time
+import struct
+import argparse
+import numpy as np
+from pathlib import Path
+
+# * File imports
+from .thrm_format import (CHUNK_MARKER, FLAG_SPARSE, FRAME_MARKER, FRAME_MARKER_V1, INDEX_DTYPE, ROI_MARKER,
+                          ROI_TABLE_DTYPE, read_file_header, read_trailer, walk_records, write_index)
+
+
+def _load_checkpoint(path: Path, file_size: int):
+    """(index, rois, end) from the checkpoint sidecar, None if missing or not usable."""
+    checkpoint = path.with_name(path.name + ".ckpt.npz")
+    if not checkpoint.exists():
+        return None
+
+    try:
+        with np.load(checkpoint) as data:
+            index, rois, end = data["index"], data["rois"], int(data["end"])
+    except Exception as e:
+        print(f"Ignoring unreadable checkpoint {checkpoint}: {e}")
+        return None
+
+    if end > file_size:
+        print(f"Ignoring checkpoint {checkpoint}: it ends past the end of the file")
+        return None
+    return index, rois, end
+
+
+def _recover_v1(f, header: dict, file_size: int, dry_run: bool) -> dict:
+    # Version 1 has no index, cut the partial FRAM record so every reader sees whole frames
+    position = header["data_offset"]
+    frames = 0
+    while position + 8 <= file_size:
+        f.seek(position)
+        if f.read(4) != FRAME_MARKER_V1:
+            break
+        num_dims = struct.unpack('<i', f.read(4))[0]
+        if not 0 < num_dims < 8:
+            break
+        shape = struct.unpack(f'<{num_dims}i', f.read(4 * num_dims))
+        record_end = position + 8 + 4 * num_dims + 12 + int(np.prod(shape)) * 8
+        if record_end > file_size:
+            break
+        frames += 1
+        position = record_end
+
+    if not dry_run and position < file_size:
+        f.truncate(position)
+    return {"version": 1, "frames": frames, "good_bytes": position, "dropped_bytes": file_size - position}
+
+
+def recover(filename, dry_run: bool = False, use_checkpoint: bool = True) -> dict:
+    """
+    Repair a THRM recording that was not closed cleanly.
+
+    Frames covered by the last checkpoint are trusted; only the tail after it
+    is walked, verifying the CRC of every record when the file has them. The
+    file is truncated after the last good record and the ROI table, index and
+    trailer are appended so it opens in O(1) again.
+
+    Args:
+        filename: Recording to repair in place
+        dry_run: Only report what would be done
+        use_checkpoint: False verifies the whole file instead of starting at the checkpoint
+
+    Returns:
+        Summary with the frame count, kept and dropped bytes and the elapsed time
+    """
+    started = time.perf_counter()
+    path = Path(filename)
+
+    with open(path, 'rb' if dry_run else 'r+b') as f:
+        header = read_file_header(f)
+        f.seek(0, 2)
+        file_size = f.tell()
+
+        if header["version"] == 1:
+            result = _recover_v1(f, header, file_size, dry_run)
+        elif read_trailer(f, header) is not None:
+            result = {"version": 2, "status": "clean", "frames": None, "good_bytes": file_size, "dropped_bytes": 0}
+        else:
+            checkpoint = _load_checkpoint(path, file_size) if use_checkpoint else None
+            if checkpoint is not None:
+                index, rois, position = checkpoint
+                offsets, timestamps = list(index['offset']), list(index['timestamp'])
+                roi_entries = [tuple(entry) for entry in rois]
+            else:
+                position = header["data_offset"]
+                offsets, timestamps, roi_entries = [], [], []
+            checkpoint_frames = len(offsets)
+
+            for marker, record_offset, record_size, fields in walk_records(f, header, start=position, verify=True):
+                if marker == FRAME_MARKER:
+                    offsets.append(record_offset)
+                    timestamps.append(fields[0])
+                elif marker == CHUNK_MARKER:
+                    offsets.extend([record_offset] * len(fields[1]))
+                    timestamps.extend(fields[1])
+                elif marker == ROI_MARKER:
+                    roi_entries.append((len(offsets), record_offset))
+                position = record_offset + record_size
+
+            index = np.empty(len(offsets), dtype=INDEX_DTYPE)
+            index['offset'] = offsets
+            index['timestamp'] = timestamps
+            rois = np.array(roi_entries, dtype=ROI_TABLE_DTYPE) if header["flags"] & FLAG_SPARSE else None
+
+            if not dry_run:
+                f.truncate(position)
+                write_index(f, position, index, rois)
+            result = {"version": 2, "status": "recovered", "frames": len(index),
+                      "frames_from_checkpoint": checkpoint_frames, "good_bytes": position,
+                      "dropped_bytes": file_size - position}
+
+    if not dry_run:
+        # Scanned indexes and checkpoints describe the damaged file
+        path.with_name(path.name + ".ckpt.npz").unlink(missing_ok=True)
+        if header["version"] == 2:
+            path.with_name(path.name + ".idx.npy").unlink(missing_ok=True)
+
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repair THRM recordings that were not closed cleanly")
+    parser.add_argument("files", nargs="+", help="Recordings to repair in place")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be done")
+    parser.add_argument("--full", action="store_true", help="Ignore checkpoints and verify the whole file")
+    args = parser.parse_args()
+
+    for filename in args.files:
+        try:
+            result = recover(filename, dry_run=args.dry_run, use_checkpoint=not args.full)
+            print(f"{filename}: {result}")
+        except Exception as e:
+            print(f"Error recovering {filename}: {e}")
@@ -0,0 +1,297 @@
+# * Library imports
+import os
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+# * File imports
+from .thrm_reader import ThrmReader
+from .time_index import TimeIndex, TimeLike
+
+# One row per frame, the row position is the frame index. Temperatures in °C.
+SUMMARY_DTYPE = np.dtype([('timestamp', '<f8'), ('min', '<f4'), ('max', '<f4'), ('mean', '<f4'),
+                          ('p05', '<f4'), ('p50', '<f4'), ('p95', '<f4'),
+                          ('q1', '<f4'), ('q2', '<f4'), ('q3', '<f4'), ('q4', '<f4'), ('roi', '<f4')])
+PERCENTILES = (5, 50, 95)
+REGION_COLUMNS = ("q1", "q2", "q3", "q4", "roi")
+
+
+def summary_path(filename) -> Path:
+    filename = Path(filename)
+    return filename.with_name(filename.name + ".summary.npy")
+
+
+class SummaryBuilder:
+    def __init__(self, shape, gain: float = 1.0, offset: float = 0.0, quadrants: Optional[Sequence] = None,
+                 roi_mask: Optional[np.ndarray] = None, sample_step: int = 8):
+        """
+        Accumulate per-frame statistics for a recording's summary index.
+
+        Frames are added in batches as stored payloads: whole frames flattened
+        to (n, rows * cols), or the ROI pixel values of sparse recordings with
+        their flat pixel indices. Statistics are taken on the raw values and
+        mapped to °C with gain and offset, which is exact for the linear
+        calibration; a batch of frames converted with another calibration
+        profile passes its own (gain, offset) to add(). Percentiles use every
+        sample_step-th stored pixel.
+
+        Args:
+            shape: (rows, cols) of the full frame
+            gain: Raw to temperature gain
+            offset: Raw to temperature offset
+            quadrants: Four (row slice, col slice) pairs for q1..q4 (data_handling.quadrant_slices),
+                       None leaves those columns NaN
+            roi_mask: Boolean polygon mask for the roi column, None leaves it NaN
+                      (sparse recordings default to the stored pixels)
+            sample_step: Pixel stride for the percentiles
+        """
+        self.shape = tuple(shape)
+        self.gain = gain
+        self.offset = offset
+        self.roi_mask = None if roi_mask is None else np.asarray(roi_mask, dtype=bool).ravel()
+        self.sample_step = max(int(sample_step), 1)
+
+        quadrant_mask = np.zeros(self.shape, dtype=np.uint8)
+        for number, (row_slice, col_slice) in enumerate(quadrants or (), start=1):
+            quadrant_mask[row_slice, col_slice] = number
+        self._quadrant_mask = quadrant_mask.ravel()
+
+        self._roi = None
+        self._selectors = self._build_selectors(None)
+        self._batches = []
+
+    def __len__(self) -> int:
+        return sum(len(batch) for batch in self._batches)
+
+    def _build_selectors(self, roi: Optional[np.ndarray]) -> List[Optional[np.ndarray]]:
+        # Payload positions of each region column, None when the region has no stored pixels
+        quadrants = self._quadrant_mask if roi is None else self._quadrant_mask[roi]
+        selectors = [np.flatnonzero(quadrants == number) for number in range(1, 5)]
+
+        if self.roi_mask is not None:
+            selectors.append(np.flatnonzero(self.roi_mask if roi is None else self.roi_mask[roi]))
+        elif roi is not None:
+            selectors.append(slice(None))
+        else:
+            selectors.append(None)
+        return [s if isinstance(s, slice) or (s is not None and len(s)) else None for s in selectors]
+
+    def add(self, values: np.ndarray, timestamps, roi: Optional[np.ndarray] = None,
+            conversion: Optional[Tuple[float, float]] = None):
+        """
+        Add (n, pixels) stored values, roi is the flat pixel index array of sparse payloads.
+
+        conversion is the (gain, offset) of these frames, None uses the builder's.
+        """
+        gain, offset = conversion if conversion is not None else (self.gain, self.offset)
+        values = np.asarray(values)
+        values = values.reshape(len(values), -1)
+        if roi is not self._roi:
+            self._roi = roi
+            self._selectors = self._build_selectors(roi)
+
+        rows = np.empty(len(values), dtype=SUMMARY_DTYPE)
+        rows['timestamp'] = timestamps
+        if not len(values):
+            return
+
+        # Float payloads (version 1 temperatures) may hold NaN outside the polygon
+        floating = values.dtype.kind == 'f'
+        low = (np.nanmin if floating else np.min)(values, axis=1)
+        high = (np.nanmax if floating else np.max)(values, axis=1)
+        percentiles = (np.nanpercentile if floating else np.percentile)(values[:, ::self.sample_step],
+                                                                         PERCENTILES, axis=1)
+        mean = np.nanmean if floating else np.mean
+
+        # A negative gain swaps the order, so pair up the bounds after the conversion
+        rows['min'], rows['max'] = self._bounds(low, high, gain, offset)
+        rows['p05'], rows['p95'] = self._bounds(percentiles[0], percentiles[2], gain, offset)
+        rows['p50'] = self._to_temperature(percentiles[1], gain, offset)
+        rows['mean'] = self._to_temperature(mean(values, axis=1, dtype=np.float64), gain, offset)
+
+        for column, selector in zip(REGION_COLUMNS, self._selectors):
+            if selector is None:
+                rows[column] = np.nan
+            else:
+                region = values[:, selector] if isinstance(selector, slice) else np.take(values, selector, axis=1)
+                rows[column] = self._to_temperature(mean(region, axis=1, dtype=np.float64), gain, offset)
+
+        self._batches.append(rows)
+
+    @staticmethod
+    def _to_temperature(data: np.ndarray, gain: float, offset: float) -> np.ndarray:
+        return gain * np.asarray(data, dtype=np.float64) + offset
+
+    def _bounds(self, low: np.ndarray, high: np.ndarray, gain: float, offset: float) -> Tuple[np.ndarray, np.ndarray]:
+        low, high = self._to_temperature(low, gain, offset), self._to_temperature(high, gain, offset)
+        return np.minimum(low, high), np.maximum(low, high)
+
+    def summary(self) -> np.ndarray:
+        return np.concatenate(self._batches) if self._batches else np.empty(0, dtype=SUMMARY_DTYPE)
+
+    def save(self, path) -> Path:
+        """Write the summary atomically, path is the .summary.npy file."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp.npy")
+        np.save(tmp, self.summary())
+        os.replace(tmp, path)
+        return path
+
+
+def build_summary(filename, quadrants: Optional[Sequence] = None, roi_mask: Optional[np.ndarray] = None,
+                  sample_step: int = 8, chunk_size: int = 256, save: bool = True) -> np.ndarray:
+    """
+    Compute the summary index of an existing recording in one pass.
+
+    Used for recordings made without a live summary, or after recover().
+    Sparse recordings are summarized from their stored ROI pixels without
+    expanding the frames. Frames tagged with a calibration profile listed in
+    the metadata are converted with that profile.
+
+    Args:
+        filename: THRM recording (version 1 or 2)
+        quadrants: Four (row slice, col slice) pairs for q1..q4
+        roi_mask: Boolean polygon mask for the roi column, None uses the polygon in the header metadata
+        sample_step: Pixel stride for the percentiles
+        chunk_size: Frames processed per batch
+        save: Write <file>.summary.npy next to the recording
+
+    Returns:
+        The summary array (SUMMARY_DTYPE)
+    """
+    with ThrmReader(filename) as reader:
+        if roi_mask is None:
+            roi_mask = reader.polygon_mask
+        builder = SummaryBuilder(reader.shape, reader.gain, reader.offset, quadrants, roi_mask, sample_step)
+
+        # Batches never cross a ROI change of sparse files or a profile switch
+        bounds = set(range(0, len(reader), chunk_size))
+        if reader.sparse:
+            bounds.update(int(first) for first in reader.rois['first_frame'] if first < len(reader))
+        tags = reader.tags() if reader.conversions else None
+        if tags is not None:
+            bounds.update((np.flatnonzero(tags[1:] != tags[:-1]) + 1).tolist())
+        bounds = sorted(bounds) + [len(reader)]
+
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            conversion = reader.conversion(int(tags[start])) if tags is not None else None
+            if reader.sparse:
+                values = np.stack([reader.values(i) for i in range(start, stop)])
+                builder.add(values, reader.timestamps[start:stop], reader.roi(start), conversion)
+            else:
+                builder.add(reader.frames(start, stop), reader.timestamps[start:stop], conversion=conversion)
+
+    if save:
+        builder.save(summary_path(filename))
+    return builder.summary()
+
+
+class RecordingSummary:
+    def __init__(self, filename, build: bool = True, **build_options):
+        """
+        Query a recording's summary index without touching the frame data.
+
+        Loads <file>.summary.npy (memory-mapped). When it is missing or older
+        than the recording and build is True it is computed first with
+        build_summary(**build_options).
+
+        Args:
+            filename: THRM recording or its .summary.npy file
+            build: Build a missing or stale summary
+        """
+        filename = Path(filename)
+        path = filename if filename.name.endswith(".summary.npy") else summary_path(filename)
+        stale = (not path.exists() or
+                 (path != filename and filename.exists() and path.stat().st_mtime < filename.stat().st_mtime))
+
+        if stale:
+            if not build or path == filename:
+                raise FileNotFoundError(f"No up-to-date summary for {filename}")
+            self.data = build_summary(filename, **build_options)
+        else:
+            self.data = np.load(path, mmap_mode='r')
+        self.path = path
+        self.time_index = TimeIndex(self.data['timestamp'])
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return self.data.dtype.names
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.data['timestamp']
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self.data[column]
+
+    def time_range(self, start: TimeLike = None, stop: TimeLike = None) -> Tuple[int, int]:
+        """[first, last) frames recorded in [start, stop), see TimeIndex."""
+        return self.time_index.range(start, stop)
+
+    @staticmethod
+    def ranges(mask: np.ndarray, min_frames: int = 1) -> List[Tuple[int, int]]:
+        """[start, stop) frame ranges where mask is True, runs shorter than min_frames are skipped."""
+        edges = np.diff(np.concatenate(([0], np.asarray(mask, dtype=np.int8), [0])))
+        starts, stops = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        return [(int(start), int(stop)) for start, stop in zip(starts, stops) if stop - start >= min_frames]
+
+    def find(self, column: str = "max", above: Optional[float] = None, below: Optional[float] = None,
+             min_frames: int = 1) -> List[Tuple[int, int]]:
+        """
+        Frame ranges where column is above and/or below the given values.
+
+        find("max", above=120) gives the frames where the hottest pixel exceeded 120 °C.
+        """
+        values = self.data[column]
+        mask = np.ones(len(values), dtype=bool)
+        if above is not None:
+            mask &= values > above
+        if below is not None:
+            mask &= values < below
+        return self.ranges(mask, min_frames)
+
+    def top_windows(self, seconds: float, column: str = "mean", count: int = 10,
+                    largest: bool = True) -> List[Tuple[int, int, float]]:
+        """
+        The count non-overlapping windows of the given duration with the highest
+        (or lowest) average of column, as (start, stop, average) sorted best first.
+
+        top_windows(60, "mean", 10) gives the 10 hottest minutes.
+        """
+        timestamps = np.asarray(self.timestamps)
+        values = np.nan_to_num(np.asarray(self.data[column], dtype=np.float64))
+        if not len(values):
+            return []
+
+        # Window i covers the frames recorded in [t_i, t_i + seconds)
+        starts = np.arange(len(values))
+        stops = np.searchsorted(timestamps, timestamps + seconds, side='left')
+        stops = np.maximum(stops, starts + 1)
+        sums = np.concatenate(([0.0], np.cumsum(values)))
+        averages = (sums[stops] - sums[starts]) / (stops - starts)
+
+        # Greedy, best window first, skipping any that overlap a window already taken
+        taken = np.zeros(len(values), dtype=bool)
+        result = []
+        for i in np.argsort(-averages if largest else averages, kind='stable'):
+            start, stop = int(starts[i]), int(stops[i])
+            if taken[start:stop].any():
+                continue
+            taken[start:stop] = True
+            result.append((start, stop, float(averages[i])))
+            if len(result) == count:
+                break
+        return result
+
+    def describe(self, start: int, stop: int) -> str:
+        """Human readable line for a frame range."""
+        begin = datetime.fromtimestamp(float(self.timestamps[start])).strftime('%Y-%m-%d %H:%M:%S')
+        end = datetime.fromtimestamp(float(self.timestamps[stop - 1])).strftime('%H:%M:%S')
+        window = self.data[start:stop]
+        return (f"frames {start}-{stop - 1} ({begin} - {end}): max {float(np.nanmax(window['max'])):.2f} °C, "
+                f"mean {float(np.nanmean(window['mean'])):.2f} °C")
+
@@ -0,0 +1,610 @@
+# * Library imports
+import os
+import json
+import zlib
+import struct
+import cv2
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# * File imports
+from .codecs import decode_chunk, get_codec
+
+MAGIC = b'THRM'
+FRAME_MARKER_V1 = b'FRAM'
+FRAME_MARKER = b'FRM2'
+INDEX_MARKER = b'TIDX'
+CHUNK_MARKER = b'CHNK'
+ROI_MARKER = b'ROIM'
+ROI_TABLE_MARKER = b'RTBL'
+VERSION = 2
+
+# Header flags
+FLAG_COMPRESSED = 0x1
+FLAG_SPARSE = 0x2
+FLAG_CHECKSUM = 0x4
+FLAG_HEADER_ROWS = 0x8
+
+# magic, version, rows, cols, numpy dtype string, gain, offset, flags, metadata length
+FILE_HEADER = struct.Struct('<4siII8sddII')
+# marker, frame number, timestamp, payload length, tag
+FRAME_HEADER = struct.Struct('<4sIdII')
+# marker, first frame number, frame count, compressed payload length
+CHUNK_HEADER = struct.Struct('<4sIII')
+# marker, ROI number, pixel count
+ROI_HEADER = struct.Struct('<4sII')
+# marker, ROI count, directly in front of the frame index
+ROI_TABLE_FOOTER = struct.Struct('<4sI')
+# marker, index offset, frame count
+INDEX_TRAILER = struct.Struct('<4sQQ')
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('timestamp', '<f8')])
+ROI_TABLE_DTYPE = np.dtype([('first_frame', '<u8'), ('offset', '<u8')])
+# CRC32 of the record bytes, appended to every record of a FLAG_CHECKSUM file
+CHECKSUM = struct.Struct('<I')
+
+
+class ThrmWriter:
+    def __init__(self, path, shape: Tuple[int, int], dtype=np.uint16, gain: float = 1.0, offset: float = 0.0,
+                 metadata: Optional[dict] = None, flags: int = 0, codec: Optional[str] = None,
+                 chunk_frames: int = 64, shuffle: bool = True, sparse: bool = False, checksum: bool = True,
+                 header_row_bytes: int = 0):
+        """
+        Write a version 2 THRM recording.
+
+        Layout: fixed file header and JSON metadata, then one FRM2 record per
+        frame (fixed header + raw payload), then the frame index (offset and
+        timestamp per frame) and a TIDX trailer pointing at it.
+
+        With a codec the file is compressed (FLAG_COMPRESSED): frames are stored
+        in CHNK records of up to chunk_frames delta-encoded frames, see
+        codecs.encode_chunk. Every chunk decodes on its own and the index points
+        each frame at its chunk record.
+
+        A sparse file (FLAG_SPARSE) stores only the pixels of a region of
+        interest. A ROIM record with the flat pixel indices is written with
+        write_roi() and applies to every following frame until the next one, so
+        frame payloads hold just len(roi) values. A table of all ROI records is
+        written in front of the index (RTBL footer) so readers find them
+        without a scan.
+
+        With checksum (FLAG_CHECKSUM) every record is followed by the CRC32 of
+        its bytes, so a torn or corrupted tail can be told apart from valid
+        data. checkpoint() atomically saves the index written so far to a
+        <file>.ckpt.npz sidecar; recover.py uses it to repair a file that was
+        never closed without rescanning the whole recording.
+
+        With header_row_bytes (FLAG_HEADER_ROWS) every frame also keeps the raw
+        telemetry row the camera sends in front of the image. FRM2 records
+        carry it after the pixel payload, CHNK records after the tags (one row
+        per frame, uncompressed); the size is in the metadata.
+
+        Args:
+            path: Output file
+            shape: (rows, cols) of every frame
+            dtype: Frame dtype, uint16 for raw sensor counts
+            gain: Raw to temperature gain used while recording
+            offset: Raw to temperature offset used while recording
+            metadata: Extra JSON-serializable information stored in the header
+            flags: Format flags, FLAG_COMPRESSED is set automatically when a codec is given
+            codec: Compression codec name from codecs.CODECS, None writes raw FRM2 records
+            chunk_frames: Frames per compressed chunk
+            shuffle: Byte-shuffle the deltas before compressing
+            sparse: Store only ROI pixels, call write_roi() before the first frame
+            checksum: Append a CRC32 to every record
+            header_row_bytes: Bytes of raw header row stored per frame, 0 stores none
+        """
+        self.path = Path(path)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        self.gain = gain
+        self.offset = offset
+        self.codec = codec
+        self.chunk_frames = chunk_frames
+        self.shuffle = shuffle
+        self.sparse = sparse
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.roi: Optional[np.ndarray] = None
+        self._rois = []
+
+        self.frame_count = 0
+        self._offsets = []
+        self._timestamps = []
+        # Reused staging buffer for batched writes
+        self._batch = bytearray()
+
+        metadata = dict(metadata or {})
+        if codec is not None:
+            get_codec(codec)
+            if self.dtype != np.dtype('<u2'):
+                raise ValueError(f"Compressed recordings store uint16 frames, got {self.dtype}")
+            flags |= FLAG_COMPRESSED
+            metadata["compression"] = {"codec": codec, "chunk_frames": chunk_frames, "shuffle": shuffle}
+        if sparse:
+            flags |= FLAG_SPARSE
+        if checksum:
+            flags |= FLAG_CHECKSUM
+        self.checksum = checksum
+        self.checksum_size = CHECKSUM.size if checksum else 0
+        self.header_row_bytes = header_row_bytes
+        if header_row_bytes:
+            flags |= FLAG_HEADER_ROWS
+            metadata["header_row_bytes"] = header_row_bytes
+        self.flags = flags
+
+        metadata_bytes = json.dumps(metadata).encode()
+        self.handle = open(self.path, 'wb')
+        self.handle.write(FILE_HEADER.pack(MAGIC, VERSION, self.shape[0], self.shape[1], self.dtype.str.encode(),
+                                           gain, offset, flags, len(metadata_bytes)))
+        self.handle.write(metadata_bytes)
+        self._position = FILE_HEADER.size + len(metadata_bytes)
+
+    @property
+    def payload_shape(self) -> Tuple[int, ...]:
+        """Shape of the data stored per frame, (len(roi),) in sparse files."""
+        if self.sparse:
+            if self.roi is None:
+                raise ValueError("Sparse recording has no ROI, call write_roi() first")
+            return (len(self.roi),)
+        return self.shape
+
+    def write_roi(self, indices: np.ndarray) -> int:
+        """
+        Set the ROI (flat pixel indices into a frame) for the following frames.
+
+        Returns the number of bytes written.
+        """
+        if not self.sparse:
+            raise ValueError("write_roi() needs a sparse recording")
+
+        indices = np.ascontiguousarray(indices, dtype='<u4')
+        record = ROI_HEADER.pack(ROI_MARKER, len(self._rois), len(indices)) + indices.tobytes()
+        if self.checksum:
+            record += CHECKSUM.pack(zlib.crc32(record))
+        self.handle.write(record)
+
+        self._rois.append((self.frame_count, self._position))
+        self.roi = indices
+        self._position += len(record)
+        return len(record)
+
+    def write_frame(self, data: np.ndarray, timestamp: Optional[float] = None, tag: int = 0,
+                    header_row: Optional[np.ndarray] = None) -> int:
+        """Append one frame, returns its frame number."""
+        self.write_frames([(timestamp, data, tag, header_row)])
+        return self.frame_count - 1
+
+    def _header_row_view(self, header_row) -> memoryview:
+        # Missing rows are stored as zeros so records keep a fixed size
+        if header_row is None:
+            return memoryview(bytes(self.header_row_bytes))
+        row = memoryview(np.ascontiguousarray(header_row)).cast('B')
+        if len(row) != self.header_row_bytes:
+            raise ValueError(f"Header row has {len(row)} bytes, recording stores {self.header_row_bytes}")
+        return row
+
+    def write_frames(self, frames) -> int:
+        """
+        Append (timestamp, data, tag) frames with a single contiguous write.
+
+        With header rows, items are (timestamp, data, tag, header_row).
+        Returns the number of bytes written.
+        """
+        payload_shape = self.payload_shape
+        payload_bytes = int(np.prod(payload_shape)) * self.dtype.itemsize
+        record_size = FRAME_HEADER.size + payload_bytes + self.header_row_bytes + self.checksum_size
+        batch_size = record_size * len(frames)
+        if len(self._batch) < batch_size:
+            self._batch = bytearray(batch_size)
+        batch = self._batch
+        view = memoryview(batch)
+
+        for i, (timestamp, data, tag, *header_row) in enumerate(frames):
+            if data.shape != payload_shape:
+                raise ValueError(f"Frame shape {data.shape} does not match recording shape {payload_shape}")
+            if timestamp is None:
+                timestamp = datetime.now().timestamp()
+
+            start = i * record_size
+            FRAME_HEADER.pack_into(batch, start, FRAME_MARKER, self.frame_count, timestamp, payload_bytes, tag)
+            payload = np.ascontiguousarray(data, dtype=self.dtype)
+            payload_end = start + FRAME_HEADER.size + payload_bytes
+            view[start + FRAME_HEADER.size:payload_end] = memoryview(payload).cast('B')
+            if self.header_row_bytes:
+                view[payload_end:payload_end + self.header_row_bytes] = \
+                    self._header_row_view(header_row[0] if header_row else None)
+                payload_end += self.header_row_bytes
+            if self.checksum:
+                CHECKSUM.pack_into(batch, payload_end, zlib.crc32(view[start:payload_end]))
+
+            self._offsets.append(self._position + start)
+            self._timestamps.append(timestamp)
+            self.frame_count += 1
+
+        self.handle.write(view[:batch_size])
+        self._position += batch_size
+        return batch_size
+
+    def write_chunk(self, payload: bytes, timestamps: List[float], tags: List[int],
+                    header_rows: Optional[list] = None) -> int:
+        """
+        Append one compressed chunk produced by codecs.encode_chunk.
+
+        Returns the number of bytes written.
+        """
+        count = len(timestamps)
+        record = bytearray(CHUNK_HEADER.pack(CHUNK_MARKER, self.frame_count, count, len(payload)))
+        record += np.asarray(timestamps, dtype='<f8').tobytes()
+        record += np.asarray(tags, dtype='<u4').tobytes()
+        if self.header_row_bytes:
+            for header_row in header_rows or [None] * count:
+                record += self._header_row_view(header_row)
+        record += payload
+        if self.checksum:
+            record += CHECKSUM.pack(zlib.crc32(record))
+        self.handle.write(record)
+
+        self._offsets.extend([self._position] * count)
+        self._timestamps.extend(timestamps)
+        self.frame_count += count
+        self._position += len(record)
+        return len(record)
+
+    def flush(self, fsync: bool = False):
+        self.handle.flush()
+        if fsync:
+            os.fsync(self.handle.fileno())
+
+    @property
+    def checkpoint_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".ckpt.npz")
+
+    def _index_array(self) -> np.ndarray:
+        index = np.empty(self.frame_count, dtype=INDEX_DTYPE)
+        index['offset'] = self._offsets
+        index['timestamp'] = self._timestamps
+        return index
+
+    def checkpoint(self, fsync: bool = False):
+        """Flush, then atomically replace the checkpoint with the index of everything written so far."""
+        self.flush(fsync=fsync)
+        temporary = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+        with open(temporary, 'wb') as f:
+            np.savez(f, index=self._index_array(), rois=np.array(self._rois, dtype=ROI_TABLE_DTYPE),
+                     end=np.int64(self._position))
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temporary, self.checkpoint_path)
+
+    def close(self):
+        if self.handle is None:
+            return
+
+        write_index(self.handle, self._position, self._index_array(),
+                    np.array(self._rois, dtype=ROI_TABLE_DTYPE) if self.sparse else None)
+        self.handle.close()
+        self.handle = None
+        # The file is complete, the checkpoint is no longer needed
+        self.checkpoint_path.unlink(missing_ok=True)
+
+
+def write_index(f, position: int, index: np.ndarray, rois: Optional[np.ndarray] = None):
+    """Write the ROI table (sparse files), the frame index and the TIDX trailer at position."""
+    f.seek(position)
+    if rois is not None:
+        f.write(rois.astype(ROI_TABLE_DTYPE).tobytes())
+        f.write(ROI_TABLE_FOOTER.pack(ROI_TABLE_MARKER, len(rois)))
+        position += len(rois) * ROI_TABLE_DTYPE.itemsize + ROI_TABLE_FOOTER.size
+
+    f.write(index.astype(INDEX_DTYPE).tobytes())
+    f.write(INDEX_TRAILER.pack(INDEX_MARKER, position, len(index)))
+
+
+def read_file_header(f) -> dict:
+    """Parse the file header, leaves f at the first frame record."""
+    magic = f.read(4)
+    if magic != MAGIC:
+        raise ValueError("Invalid file format - missing THRM magic number")
+
+    version = struct.unpack('<i', f.read(4))[0]
+    if version == 1:
+        return {"version": 1, "data_offset": 8}
+    if version != VERSION:
+        raise ValueError(f"Unsupported THRM version {version}")
+
+    f.seek(0)
+    _, version, rows, cols, dtype, gain, offset, flags, metadata_len = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+    metadata = json.loads(f.read(metadata_len) or b'{}')
+    return {
+        "version": version,
+        "shape": (rows, cols),
+        "dtype": np.dtype(dtype.rstrip(b'\0').decode()),
+        "gain": gain,
+        "offset": offset,
+        "flags": flags,
+        "metadata": metadata,
+        "data_offset": FILE_HEADER.size + metadata_len,
+    }
+
+
+def header_row_size(header: dict) -> int:
+    """Bytes of raw header row stored per frame, 0 for files without FLAG_HEADER_ROWS."""
+    if header.get("flags", 0) & FLAG_HEADER_ROWS:
+        return int(header["metadata"]["header_row_bytes"])
+    return 0
+
+
+def read_trailer(f, header: dict) -> Optional[Tuple[int, int]]:
+    """(index offset, frame count) from a valid TIDX trailer, None if the file was not closed."""
+    f.seek(0, 2)
+    file_size = f.tell()
+    if file_size < header["data_offset"] + INDEX_TRAILER.size:
+        return None
+
+    f.seek(file_size - INDEX_TRAILER.size)
+    marker, index_offset, frame_count = INDEX_TRAILER.unpack(f.read(INDEX_TRAILER.size))
+    if marker == INDEX_MARKER and index_offset + frame_count * INDEX_DTYPE.itemsize + INDEX_TRAILER.size == file_size:
+        return index_offset, frame_count
+    return None
+
+
+def walk_records(f, header: dict, start: Optional[int] = None, verify: bool = False) \
+        -> Iterator[Tuple[bytes, int, int, tuple]]:
+    """
+    Yield (marker, offset, size, fields) for every complete record of a version 2 file.
+
+    fields is (timestamp,) for FRM2, (first frame, timestamps) for CHNK and
+    (ROI number, pixel count) for ROIM. Stops at the first partial or unknown
+    record, which is where the index or a truncated tail begins. With verify,
+    records of a FLAG_CHECKSUM file are read in full and the walk also stops
+    at the first CRC mismatch.
+
+    Args:
+        f: File opened in binary mode
+        header: Result of read_file_header
+        start: Offset of the first record to visit, defaults to the first record
+        verify: Check record checksums
+    """
+    f.seek(0, 2)
+    file_size = f.tell()
+    position = header["data_offset"] if start is None else start
+    checksum_size = CHECKSUM.size if header["flags"] & FLAG_CHECKSUM else 0
+    row_bytes = header_row_size(header)
+    verify = verify and checksum_size > 0
+
+    while position + 4 <= file_size:
+        f.seek(position)
+        marker = f.read(4)
+        f.seek(position)
+
+        if marker == FRAME_MARKER and position + FRAME_HEADER.size <= file_size:
+            _, _, timestamp, payload_len, _ = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+            record_size = FRAME_HEADER.size + payload_len + row_bytes
+            fields = (timestamp,)
+        elif marker == CHUNK_MARKER and position + CHUNK_HEADER.size <= file_size:
+            _, first_frame, count, payload_len = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+            record_size = CHUNK_HEADER.size + count * (12 + row_bytes) + payload_len
+            fields = (first_frame, np.frombuffer(f.read(count * 8), dtype='<f8'))
+        elif marker == ROI_MARKER and position + ROI_HEADER.size <= file_size:
+            _, roi_num, count = ROI_HEADER.unpack(f.read(ROI_HEADER.size))
+            record_size = ROI_HEADER.size + count * 4
+            fields = (roi_num, count)
+        else:
+            break
+
+        record_size += checksum_size
+        if position + record_size > file_size:
+            break
+        if verify:
+            f.seek(position)
+            record = f.read(record_size)
+            if zlib.crc32(record[:-checksum_size]) != CHECKSUM.unpack(record[-checksum_size:])[0]:
+                break
+        yield marker, position, record_size, fields
+        position += record_size
+
+
+def read_index(f, header: dict) -> np.ndarray:
+    """Frame index of a version 2 file, rebuilt from the records if the trailer is missing."""
+    trailer = read_trailer(f, header)
+    if trailer is not None:
+        index_offset, frame_count = trailer
+        f.seek(index_offset)
+        return np.frombuffer(f.read(frame_count * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+
+    # No trailer (recording was not closed), walk the record headers
+    offsets, timestamps = [], []
+    for marker, position, _, fields in walk_records(f, header):
+        if marker == FRAME_MARKER:
+            offsets.append(position)
+            timestamps.append(fields[0])
+        elif marker == CHUNK_MARKER:
+            offsets.extend([position] * len(fields[1]))
+            timestamps.extend(fields[1])
+
+    index = np.empty(len(offsets), dtype=INDEX_DTYPE)
+    index['offset'] = offsets
+    index['timestamp'] = timestamps
+    return index
+
+
+def read_roi_table(f, header: dict) -> np.ndarray:
+    """(first frame, ROIM record offset) of every ROI in a sparse file."""
+    trailer = read_trailer(f, header)
+    if trailer is not None and trailer[0] >= ROI_TABLE_FOOTER.size:
+        f.seek(trailer[0] - ROI_TABLE_FOOTER.size)
+        marker, count = ROI_TABLE_FOOTER.unpack(f.read(ROI_TABLE_FOOTER.size))
+        if marker == ROI_TABLE_MARKER:
+            f.seek(trailer[0] - ROI_TABLE_FOOTER.size - count * ROI_TABLE_DTYPE.itemsize)
+            return np.frombuffer(f.read(count * ROI_TABLE_DTYPE.itemsize), dtype=ROI_TABLE_DTYPE)
+
+    rois = []
+    frame_count = 0
+    for marker, position, _, fields in walk_records(f, header):
+        if marker == ROI_MARKER:
+            rois.append((frame_count, position))
+        elif marker == FRAME_MARKER:
+            frame_count += 1
+        else:
+            frame_count += len(fields[1])
+    return np.array(rois, dtype=ROI_TABLE_DTYPE)
+
+
+def read_roi(f, offset: int) -> np.ndarray:
+    """Flat pixel indices of the ROIM record at offset."""
+    f.seek(offset)
+    marker, _, count = ROI_HEADER.unpack(f.read(ROI_HEADER.size))
+    if marker != ROI_MARKER:
+        raise ValueError(f"Expected {ROI_MARKER} marker at offset {offset}, got {marker}")
+    return np.frombuffer(f.read(count * 4), dtype='<u4')
+
+
+def expand_roi(values: np.ndarray, indices: np.ndarray, shape: Tuple[int, int], fill_value=0) -> np.ndarray:
+    """Full frame with values at the ROI pixel indices and fill_value elsewhere."""
+    frame = np.full(int(np.prod(shape)), fill_value, dtype=np.result_type(values, fill_value))
+    frame[indices] = values
+    return frame.reshape(shape)
+
+
+def metadata_polygon_mask(metadata: Optional[dict], shape: Tuple[int, int]) -> Optional[np.ndarray]:
+    """
+    Boolean mask of the ROI polygon saved in the header metadata, None when none was drawn.
+
+    The polygon is stored in heatmap coordinates (heatmap_scale = (width, height))
+    and scaled to the frame the same way the live pipeline masks it.
+    """
+    points = (metadata or {}).get("polygon_points")
+    scale = (metadata or {}).get("heatmap_scale")
+    if not points or not scale:
+        return None
+
+    rows, cols = shape
+    scaled_points = np.array([(int(x * cols / scale[0]), int(y * rows / scale[1])) for x, y in points], np.int32)
+    mask = np.zeros((rows, cols), dtype=np.uint8)
+    cv2.fillPoly(mask, [scaled_points], 1)
+    return mask.astype(bool)
+
+
+def metadata_conversions(metadata: Optional[dict]) -> Dict[int, Tuple[float, float]]:
+    """Frame tag -> (gain, offset) of the calibration profiles listed in the header metadata."""
+    profiles = (metadata or {}).get("profiles") or {}
+    return {int(tag): (profile["gain"], profile["offset"]) for tag, profile in profiles.items()}
+
+
+def read_frame(f, header: dict, offset: int) -> Tuple[float, int, np.ndarray]:
+    """Read the version 2 record at offset, returns (timestamp, frame number, data)."""
+    f.seek(offset)
+    marker, frame_num, timestamp, payload_len, _ = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+    if marker != FRAME_MARKER:
+        raise ValueError(f"Expected {FRAME_MARKER} marker at offset {offset}, got {marker}")
+    data = np.frombuffer(f.read(payload_len), dtype=header["dtype"])
+    if not header["flags"] & FLAG_SPARSE:
+        data = data.reshape(header["shape"])
+    return timestamp, frame_num, data
+
+
+def read_chunk(f, header: dict, offset: int, shape: Optional[Tuple[int, ...]] = None) \
+        -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Decode the CHNK record at offset, returns (first frame number, timestamps, tags, frames).
+
+    shape is the per-frame payload shape, (len(roi),) for sparse files.
+    """
+    f.seek(offset)
+    marker, first_frame, count, payload_len = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+    if marker != CHUNK_MARKER:
+        raise ValueError(f"Expected {CHUNK_MARKER} marker at offset {offset}, got {marker}")
+    timestamps = np.frombuffer(f.read(count * 8), dtype='<f8')
+    tags = np.frombuffer(f.read(count * 4), dtype='<u4')
+    f.seek(count * header_row_size(header), 1)
+    compression = header["metadata"]["compression"]
+    frames = decode_chunk(f.read(payload_len), count, shape or header["shape"], compression["codec"],
+                          compression["shuffle"])
+    return first_frame, timestamps, tags, frames
+
+
+def iter_frames(filename) -> Iterator[Tuple[float, int, np.ndarray]]:
+    """
+    Yield (timestamp, frame number, matrix) for version 1 and 2 recordings.
+
+    Version 1 frames are returned as stored (float64, NaN outside the
+    polygon), version 2 raw counts are converted to temperature with the
+    calibration saved in the header. Like version 1, version 2 matrices are
+    NaN outside the ROI: the stored one for sparse files, the polygon in the
+    header metadata (drawn when recording started) for full-frame files.
+    Frames tagged with a calibration profile listed in the metadata are
+    converted with that profile's gain and offset.
+    """
+    with open(filename, 'rb') as f:
+        header = read_file_header(f)
+
+        if header["version"] == 1:
+            while True:
+                marker = f.read(4)
+                if not marker or len(marker) < 4:
+                    break  # End of file
+
+                if marker != FRAME_MARKER_V1:
+                    print(f"Warning: Expected FRAM marker, got {marker}")
+                    break
+
+                num_dims = struct.unpack('i', f.read(4))[0]
+                shape = struct.unpack(f'{num_dims}i', f.read(4 * num_dims))
+                timestamp = struct.unpack('d', f.read(8))[0]
+                frame_num = struct.unpack('i', f.read(4))[0]
+
+                count = int(np.prod(shape))
+                payload = f.read(count * 8)
+                if len(payload) < count * 8:
+                    print("Warning: Truncated final frame")
+                    break
+                yield timestamp, frame_num, np.frombuffer(payload, dtype=np.float64).reshape(shape)
+            return
+
+        gain, offset = header["gain"], header["offset"]
+        rois = read_roi_table(f, header) if header["flags"] & FLAG_SPARSE else None
+        polygon = None if rois is not None else metadata_polygon_mask(header.get("metadata"), header["shape"])
+        conversions = metadata_conversions(header.get("metadata"))
+        roi_cache = {}
+
+        def roi_for(frame_num: int) -> Optional[np.ndarray]:
+            if rois is None:
+                return None
+            position = int(np.searchsorted(rois['first_frame'], frame_num, side='right')) - 1
+            if position not in roi_cache:
+                roi_cache.clear()
+                roi_cache[position] = read_roi(f, int(rois['offset'][position]))
+            return roi_cache[position]
+
+        def to_matrix(data: np.ndarray, roi: Optional[np.ndarray], tag: int = 0) -> np.ndarray:
+            # Sparse frames come back full size with NaN outside the ROI
+            frame_gain, frame_offset = conversions.get(tag, (gain, offset))
+            matrix = frame_gain * data + frame_offset
+            if roi is not None:
+                return expand_roi(matrix, roi, header["shape"], np.nan)
+            if polygon is not None:
+                matrix[~polygon] = np.nan
+            return matrix
+
+        if header["flags"] & FLAG_COMPRESSED:
+            chunk_offsets = read_index(f, header)['offset']
+            if len(chunk_offsets) == 0:
+                return
+            for chunk_offset in chunk_offsets[np.r_[True, chunk_offsets[1:] != chunk_offsets[:-1]]]:
+                f.seek(int(chunk_offset) + 4)
+                roi = roi_for(struct.unpack('<I', f.read(4))[0])
+                shape = None if roi is None else (len(roi),)
+                first_frame, timestamps, tags, frames = read_chunk(f, header, int(chunk_offset), shape)
+                for i, data in enumerate(frames):
+                    yield float(timestamps[i]), first_frame + i, to_matrix(data, roi, int(tags[i]))
+            return
+
+        for record_offset in read_index(f, header)['offset']:
+            tag = 0
+            if conversions:
+                f.seek(int(record_offset))
+                tag = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))[4]
+            timestamp, frame_num, data = read_frame(f, header, int(record_offset))
+            yield timestamp, frame_num, to_matrix(data, roi_for(frame_num), tag)
@@ -0,0 +1,362 @@
+# * Library imports
+import mmap
+import struct
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+# * File imports
+from .codecs import decode_chunk
+from .time_index import TimeIndex, TimeLike
+from .thrm_format import (CHUNK_HEADER, CHUNK_MARKER, FLAG_COMPRESSED, FLAG_SPARSE, FRAME_HEADER, FRAME_MARKER_V1,
+                          INDEX_DTYPE, ROI_HEADER, expand_roi, header_row_size, metadata_conversions,
+                          metadata_polygon_mask, read_file_header, read_index, read_roi_table)
+
+# Sidecar index for files without an in-file index (version 1, or v2 that was never closed)
+SIDECAR_INDEX_DTYPE = np.dtype([('offset', '<u8'), ('timestamp', '<f8'), ('frame_num', '<i8')])
+
+
+class ThrmReader:
+    def __init__(self, filename, write_sidecar: bool = True, chunk_cache: int = 4):
+        """
+        Memory-mapped random access to a THRM recording.
+
+        Frames are returned as read-only ndarray views into the mapping, nothing
+        is read from disk until a frame is touched. Opening is O(1) for closed
+        version 2 files. Version 1 files and unclosed version 2 files are scanned
+        once and the result is cached in a <file>.idx.npy sidecar.
+
+        Compressed files decode one chunk per access, the last chunk_cache
+        decoded chunks are kept so sequential reads decode each chunk once.
+
+        Sparse files (ROI pixels only) are expanded to full frames on access,
+        values() and roi_mask() give the stored pixels without expanding.
+        Full-frame files keep every pixel, polygon_mask is the ROI polygon
+        from the header metadata and temperature(i) applies it.
+
+        Args:
+            filename: Recording to open
+            write_sidecar: Save a scanned index next to the recording for the next open
+            chunk_cache: Decoded chunks kept in memory for compressed files
+        """
+        self.path = Path(filename)
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.header = read_file_header(self._file)
+        self.version = self.header["version"]
+        self._v1_shape = None
+        self.compressed = bool(self.header.get("flags", 0) & FLAG_COMPRESSED)
+        self.sparse = bool(self.header.get("flags", 0) & FLAG_SPARSE)
+        self.header_row_bytes = header_row_size(self.header) if self.version == 2 else 0
+        self.chunk_cache = chunk_cache
+        self._chunks = OrderedDict()
+        self._time_index = None
+
+        if self.version == 1:
+            self.index = self._load_or_scan(self._scan_v1, write_sidecar)
+            self.dtype = np.dtype('<f8')
+            self.gain, self.offset = 1.0, 0.0
+        else:
+            self.index = self._load_v2_index(write_sidecar)
+            self.dtype = self.header["dtype"]
+            self.gain, self.offset = self.header["gain"], self.header["offset"]
+
+        self.shape = self.header.get("shape") or self._v1_shape or (0, 0)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.rois = read_roi_table(self._file, self.header) if self.sparse else None
+        # Tag -> (gain, offset) for recordings that switched calibration profiles
+        self.conversions = metadata_conversions(self.header.get("metadata"))
+        # Polygon drawn when recording started (None without one), sparse files store their ROI instead
+        self.polygon_mask = None if self.version == 1 or self.sparse else \
+            metadata_polygon_mask(self.header.get("metadata"), self.shape)
+
+    # * Index handling
+    @property
+    def sidecar_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".idx.npy")
+
+    def _load_or_scan(self, scan, write_sidecar: bool) -> np.ndarray:
+        sidecar = self.sidecar_path
+        if sidecar.exists() and sidecar.stat().st_mtime >= self.path.stat().st_mtime:
+            index = np.load(sidecar, mmap_mode='r')
+            if self.version == 1 and len(index):
+                self._v1_shape = self._read_v1_shape(int(index['offset'][0]))
+            return index
+
+        index = scan()
+        if write_sidecar and len(index):
+            np.save(sidecar, index)
+        return index
+
+    def _load_v2_index(self, write_sidecar: bool) -> np.ndarray:
+        size = len(self._mmap)
+        if size >= 20:
+            marker, index_offset, frame_count = struct.unpack_from('<4sQQ', self._mmap, size - 20)
+            if marker == b'TIDX' and index_offset + frame_count * INDEX_DTYPE.itemsize + 20 == size:
+                # Read straight from the mapping, only the trailer and index pages are touched
+                index = np.frombuffer(self._mmap, dtype=INDEX_DTYPE, count=frame_count, offset=index_offset)
+                return self._with_data_offsets(index)
+
+        return self._load_or_scan(lambda: self._with_data_offsets(read_index(self._file, self.header)),
+                                  write_sidecar)
+
+    def _with_data_offsets(self, index: np.ndarray) -> np.ndarray:
+        # The frame number is implicit in v2, the record position is its index.
+        # Compressed files keep the chunk record offset, the payload is not addressable.
+        out = np.empty(len(index), dtype=SIDECAR_INDEX_DTYPE)
+        out['offset'] = index['offset'] + (0 if self.compressed else FRAME_HEADER.size)
+        out['timestamp'] = index['timestamp']
+        out['frame_num'] = np.arange(len(index))
+        return out
+
+    def _read_v1_shape(self, data_offset: int) -> Tuple[int, ...]:
+        record = self._find_v1_record(data_offset)
+        num_dims = struct.unpack_from('<i', self._mmap, record + 4)[0]
+        return struct.unpack_from(f'<{num_dims}i', self._mmap, record + 8)
+
+    def _find_v1_record(self, data_offset: int) -> int:
+        # Walk back from the payload to the FRAM marker (ndims is small)
+        for num_dims in range(1, 8):
+            record = data_offset - (4 + 4 + 4 * num_dims + 8 + 4)
+            if record >= 0 and self._mmap[record:record + 4] == FRAME_MARKER_V1:
+                return record
+        raise ValueError(f"No FRAM record found before offset {data_offset}")
+
+    def _scan_v1(self) -> np.ndarray:
+        mm = self._mmap
+        size = len(mm)
+        position = self.header["data_offset"]
+        offsets, timestamps, frame_nums = [], [], []
+
+        while position + 8 <= size and mm[position:position + 4] == FRAME_MARKER_V1:
+            num_dims = struct.unpack_from('<i', mm, position + 4)[0]
+            shape = struct.unpack_from(f'<{num_dims}i', mm, position + 8)
+            header_end = position + 8 + 4 * num_dims
+            timestamp, frame_num = struct.unpack_from('<di', mm, header_end)
+            data_offset = header_end + 12
+            data_end = data_offset + int(np.prod(shape)) * 8
+            if data_end > size:
+                break  # Truncated final frame
+
+            if self._v1_shape is None:
+                self._v1_shape = shape
+            elif shape != self._v1_shape:
+                raise ValueError(f"Frame {frame_num} has shape {shape}, expected {self._v1_shape}")
+
+            offsets.append(data_offset)
+            timestamps.append(timestamp)
+            frame_nums.append(frame_num)
+            position = data_end
+
+        index = np.empty(len(offsets), dtype=SIDECAR_INDEX_DTYPE)
+        index['offset'] = offsets
+        index['timestamp'] = timestamps
+        index['frame_num'] = frame_nums
+        return index
+
+    # * Frame access
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.index['timestamp']
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _decode_chunk(self, offset: int) -> Tuple[int, np.ndarray]:
+        """(first frame number, frames) of the CHNK record at offset, cached."""
+        if offset in self._chunks:
+            self._chunks.move_to_end(offset)
+            return self._chunks[offset]
+
+        marker, first_frame, count, payload_len = CHUNK_HEADER.unpack_from(self._mmap, offset)
+        if marker != CHUNK_MARKER:
+            raise ValueError(f"Expected {CHUNK_MARKER} marker at offset {offset}, got {marker}")
+        payload_offset = offset + CHUNK_HEADER.size + count * (12 + self.header_row_bytes)
+        compression = self.header["metadata"]["compression"]
+        shape = (len(self.roi(first_frame)),) if self.sparse else self.shape
+        frames = decode_chunk(self._mmap[payload_offset:payload_offset + payload_len], count, shape,
+                              compression["codec"], compression["shuffle"])
+        frames.flags.writeable = False
+
+        self._chunks[offset] = (first_frame, frames)
+        while len(self._chunks) > self.chunk_cache:
+            self._chunks.popitem(last=False)
+        return first_frame, frames
+
+    def _check_index(self, i: int) -> int:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"Frame {i} out of range for {len(self)} frames")
+        return i
+
+    def roi(self, i: int) -> Optional[np.ndarray]:
+        """Flat pixel indices stored for frame i of a sparse file, None for full-frame files."""
+        if not self.sparse:
+            return None
+        position = int(np.searchsorted(self.rois['first_frame'], i, side='right')) - 1
+        if position < 0:
+            raise ValueError(f"No ROI recorded before frame {i}")
+        offset = int(self.rois['offset'][position])
+        count = struct.unpack_from('<I', self._mmap, offset + 8)[0]
+        return np.frombuffer(self._mmap, dtype='<u4', count=count, offset=offset + ROI_HEADER.size)
+
+    def roi_mask(self, i: int) -> np.ndarray:
+        """Boolean mask of the pixels stored for frame i (all True for full-frame files)."""
+        mask = np.zeros(int(np.prod(self.shape)), dtype=bool)
+        roi = self.roi(self._check_index(i))
+        mask[slice(None) if roi is None else roi] = True
+        return mask.reshape(self.shape)
+
+    def values(self, i: int) -> np.ndarray:
+        """Stored payload of frame i: the ROI pixel values of sparse files, the frame otherwise."""
+        i = self._check_index(i)
+        if self.compressed:
+            first_frame, frames = self._decode_chunk(int(self.index['offset'][i]))
+            return frames[int(self.index['frame_num'][i]) - first_frame]
+
+        count = len(self.roi(i)) if self.sparse else self.frame_bytes // self.dtype.itemsize
+        data = np.frombuffer(self._mmap, dtype=self.dtype, count=count, offset=int(self.index['offset'][i]))
+        return data if self.sparse else data.reshape(self.shape)
+
+    def frame(self, i: int, fill_value=0) -> np.ndarray:
+        """
+        Read-only view of frame i, zero-copy for uncompressed full-frame files.
+
+        Sparse frames are rebuilt at full size with fill_value outside the ROI.
+        """
+        if not self.sparse:
+            return self.values(i)
+        i = self._check_index(i)
+        return expand_roi(self.values(i), self.roi(i), self.shape, fill_value)
+
+    def frames(self, start: int, stop: int, step: int = 1) -> np.ndarray:
+        """Frames [start:stop:step] as one (n, rows, cols) array, a strided view when records are evenly spaced."""
+        positions = np.arange(len(self))[start:stop:step]
+        if len(positions) == 0:
+            return np.empty((0, *self.shape), dtype=self.dtype)
+
+        offsets = self.index['offset'][positions].astype(np.int64)
+        if self.compressed or self.sparse:
+            return np.stack([self.frame(int(i)) for i in positions])
+        if len(offsets) == 1 or np.all(np.diff(offsets) == offsets[1] - offsets[0]):
+            stride = int(offsets[1] - offsets[0]) if len(offsets) > 1 else self.frame_bytes
+            if stride > 0:
+                item_strides = tuple(int(s) for s in np.empty(self.shape, dtype=self.dtype).strides)
+                return np.ndarray(shape=(len(offsets), *self.shape), dtype=self.dtype, buffer=self._mmap,
+                                  offset=int(offsets[0]), strides=(stride, *item_strides))
+
+        return np.stack([self.frame(int(i)) for i in positions])
+
+    def __getitem__(self, key: Union[int, slice]) -> np.ndarray:
+        if isinstance(key, slice):
+            return self.frames(key.start, key.stop, key.step or 1)
+        return self.frame(int(key))
+
+    # * Time-based access
+    @property
+    def time_index(self) -> TimeIndex:
+        """Binary search over the index timestamps, see TimeIndex for the accepted time formats."""
+        if self._time_index is None:
+            self._time_index = TimeIndex(self.timestamps)
+        return self._time_index
+
+    def frame_at(self, timestamp: TimeLike) -> int:
+        """Index of the last frame recorded at or before timestamp (0 if before the first)."""
+        return self.time_index.frame_at(timestamp)
+
+    def nearest_frame(self, timestamp: TimeLike) -> int:
+        """Index of the frame recorded closest to timestamp."""
+        return self.time_index.nearest(timestamp)
+
+    def time_range(self, start: TimeLike = None, stop: TimeLike = None) -> Tuple[int, int]:
+        """[first, last) frame indices recorded in [start, stop)."""
+        return self.time_index.range(start, stop)
+
+    def slice_time(self, start: TimeLike = None, stop: TimeLike = None, step: int = 1) -> np.ndarray:
+        """
+        Frames recorded in [start, stop), e.g. slice_time("14:02", "14:05").
+
+        Same result as frames(), a strided view into the file for uncompressed
+        full-frame recordings. Only the index is searched, O(log n).
+        """
+        first, last = self.time_range(start, stop)
+        return self.frames(first, last, step)
+
+    def iter_chunks(self, chunk_size: int = 256) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (first frame index, frames view) in chunks of chunk_size frames."""
+        for start in range(0, len(self), chunk_size):
+            yield start, self.frames(start, start + chunk_size)
+
+    def tag(self, i: int) -> int:
+        """Tag stored with frame i (the calibration profile id for live recordings), 0 for version 1."""
+        i = self._check_index(i)
+        if self.version == 1:
+            return 0
+        offset = int(self.index['offset'][i])
+        if not self.compressed:
+            return FRAME_HEADER.unpack_from(self._mmap, offset - FRAME_HEADER.size)[4]
+
+        _, first_frame, count, _ = CHUNK_HEADER.unpack_from(self._mmap, offset)
+        position = int(self.index['frame_num'][i]) - first_frame
+        return struct.unpack_from('<I', self._mmap, offset + CHUNK_HEADER.size + count * 8 + position * 4)[0]
+
+    def tags(self) -> np.ndarray:
+        """Tag of every frame (uint32), all 0 for version 1."""
+        return np.fromiter((self.tag(i) for i in range(len(self))), dtype=np.uint32, count=len(self))
+
+    def header_row(self, i: int) -> Optional[np.ndarray]:
+        """Raw camera header row stored with frame i (uint8 view), None if the file has none."""
+        i = self._check_index(i)
+        if not self.header_row_bytes:
+            return None
+        offset = int(self.index['offset'][i])
+        if self.compressed:
+            _, first_frame, count, _ = CHUNK_HEADER.unpack_from(self._mmap, offset)
+            position = int(self.index['frame_num'][i]) - first_frame
+            offset += CHUNK_HEADER.size + count * 12 + position * self.header_row_bytes
+        else:
+            payload_len = FRAME_HEADER.unpack_from(self._mmap, offset - FRAME_HEADER.size)[3]
+            offset += payload_len
+        return np.frombuffer(self._mmap, dtype=np.uint8, count=self.header_row_bytes, offset=offset)
+
+    def conversion(self, tag: Optional[int] = None) -> Tuple[float, float]:
+        """
+        (gain, offset) for frames stored with tag.
+
+        That is the conversion of the tag's calibration profile when the
+        recording lists profiles in its metadata (the profile was switched while
+        recording), the calibration stored in the header otherwise.
+        """
+        return self.conversions.get(tag, (self.gain, self.offset)) if tag is not None else (self.gain, self.offset)
+
+    def to_temperature(self, data: np.ndarray, tag: Optional[int] = None) -> np.ndarray:
+        """Convert frames from this file to °C, with a tag using that frame's profile (see conversion)."""
+        gain, offset = self.conversion(tag)
+        return gain * data + offset
+
+    def temperature(self, i: int) -> np.ndarray:
+        """Frame i in °C with NaN outside the ROI, converted with its profile, as iter_frames yields it."""
+        matrix = self.to_temperature(self.frame(i, fill_value=np.nan), self.tag(i) if self.conversions else None)
+        if self.polygon_mask is not None:
+            matrix[~self.polygon_mask] = np.nan
+        return matrix
+
+    def close(self):
+        self.index = None
+        self._time_index = None
+        self._chunks.clear()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Frame views are still alive, the mapping is released with them
+            pass
+        self._file.close()
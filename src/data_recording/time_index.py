@@ -0,0 +1,105 @@
+# * Library imports
+import math
+import numpy as np
+from datetime import datetime, time as dt_time, timedelta
+from typing import Tuple, Union
+
+TimeLike = Union[float, int, str, datetime, dt_time, np.floating]
+
+
+def parse_time(value: str) -> Union[float, datetime, dt_time]:
+    """
+    Parse a time string: epoch seconds ("1700000000.5"), an ISO date and time
+    ("2025-11-27 14:02") or a time of day ("14:02", "14:02:30.5").
+
+    Raises ValueError for anything else, so it also serves as an argparse type.
+    """
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        if math.isfinite(seconds):
+            return seconds
+    for parse in (datetime.fromisoformat, dt_time.fromisoformat):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+    raise ValueError(f"Unsupported time '{value}', use epoch seconds, HH:MM[:SS] or an ISO date and time")
+
+
+class TimeIndex:
+    def __init__(self, timestamps: np.ndarray):
+        """
+        Binary search over a recording's per-frame timestamps.
+
+        Every lookup is a searchsorted on the timestamp column, O(log n) and
+        without touching frame data. Timestamps come from the wall clock, so a
+        clock step backwards makes them non-monotonic; the search key is then
+        the running maximum, which treats the step as no time passing and
+        keeps every range contiguous.
+
+        Times are epoch seconds, datetime/time objects or strings: "14:02",
+        "14:02:30.5" (on the recording's date, local time), ISO dates like
+        "2025-11-27 14:02" or epoch seconds ("1700000000"), see parse_time.
+        Bare times before the recording start fall on the next day if the
+        recording runs past midnight.
+
+        Args:
+            timestamps: Per-frame epoch timestamps in recording order
+        """
+        self.timestamps = timestamps
+        self.monotonic = bool(len(timestamps) < 2 or np.all(np.diff(timestamps) >= 0))
+        self._keys = timestamps if self.monotonic else np.maximum.accumulate(timestamps)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def start(self) -> float:
+        return float(self.timestamps[0]) if len(self) else 0.0
+
+    @property
+    def end(self) -> float:
+        return float(self._keys[-1]) if len(self) else 0.0
+
+    def to_timestamp(self, value: TimeLike) -> float:
+        """Epoch seconds for any supported time format."""
+        if isinstance(value, str):
+            value = parse_time(value)
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return float(value)
+        if isinstance(value, datetime):
+            return value.timestamp()
+        if isinstance(value, dt_time):
+            first = datetime.fromtimestamp(self.start)
+            candidate = datetime.combine(first.date(), value)
+            if candidate.timestamp() < self.start and (candidate + timedelta(days=1)).timestamp() <= self.end:
+                candidate += timedelta(days=1)
+            return candidate.timestamp()
+        raise TypeError(f"Unsupported time value {value!r}")
+
+    def seek(self, value: TimeLike, side: str = 'left') -> int:
+        """First frame at or after value ('left') or after it ('right'), len() if there is none."""
+        return int(np.searchsorted(self._keys, self.to_timestamp(value), side=side))
+
+    def frame_at(self, value: TimeLike) -> int:
+        """Last frame recorded at or before value (0 if before the first)."""
+        return max(self.seek(value, side='right') - 1, 0)
+
+    def nearest(self, value: TimeLike) -> int:
+        """Frame whose timestamp is closest to value."""
+        if not len(self):
+            raise IndexError("No frames recorded")
+        timestamp = self.to_timestamp(value)
+        after = min(int(np.searchsorted(self._keys, timestamp, side='left')), len(self) - 1)
+        before = max(after - 1, 0)
+        return before if abs(self._keys[before] - timestamp) <= abs(self._keys[after] - timestamp) else after
+
+    def range(self, start: TimeLike = None, stop: TimeLike = None) -> Tuple[int, int]:
+        """[first, last) frame positions recorded in [start, stop), None leaves that side open."""
+        first = 0 if start is None else self.seek(start, side='left')
+        last = len(self) if stop is None else self.seek(stop, side='left')
+        return first, max(first, last)
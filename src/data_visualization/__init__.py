@@ -1,2 +1,9 @@
 from .data_to_image import DataToImage
-from .data_average import DataAverage
\ No newline at end of file
+
+
+def __getattr__(name):
+    # The chart pulls in matplotlib, loaded only when it is used
+    if name == "DataAverage":
+        from .data_average import DataAverage
+        return DataAverage
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
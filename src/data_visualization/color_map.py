@@ -1,4 +1,16 @@
+import cv2
 import numpy as np
+from functools import lru_cache
+
+OPENCV_COLORMAPS = {
+    "jet": cv2.COLORMAP_JET,
+    "inferno": cv2.COLORMAP_INFERNO,
+    "hot": cv2.COLORMAP_HOT,
+    "turbo": cv2.COLORMAP_TURBO,
+    "bone": cv2.COLORMAP_BONE,
+}
+
+COLORMAP_NAMES = ("jet", "thermal", "inferno", "hot", "turbo", "bone")
 
 def create_thermal_colormap():
     # Create a colormap with the right shape from the beginning
@@ -21,16 +33,44 @@ def create_thermal_colormap():
     ]
 
     for start, end, color_start, color_end in ranges:
-        for i in range(start, end):
-            # Calculate the interpolated color
-            ratio = (i - start) / (end - start)
-            for channel in range(3):
-                value = int(color_start[channel] * (1 - ratio) + color_end[channel] * ratio)
-                colormap[i, 0, channel] = value
+        # Interpolate the whole segment at once instead of pixel by pixel
+        ratio = (np.arange(start, end) - start) / (end - start)
+        color_start = np.asarray(color_start, dtype=np.float64)
+        color_end = np.asarray(color_end, dtype=np.float64)
+        segment = color_start * (1 - ratio[:, None]) + color_end * ratio[:, None]
+        colormap[start:end, 0, :] = segment.astype(np.uint8)
 
     # Verify the shape and properties
     assert colormap.flags['C_CONTIGUOUS'], "Colormap must be C_CONTIGUOUS"
     assert colormap.shape == (256, 1, 3), f"Expected shape (256, 1, 3), got {colormap.shape}"
     assert colormap.dtype == np.uint8, f"Expected dtype np.uint8, got {colormap.dtype}"
 
-    return colormap
\ No newline at end of file
+    return colormap
+
+@lru_cache(maxsize=None)
+def get_palette(name: str = "jet", size: int = 256) -> np.ndarray:
+    """
+    Return a read-only (size, 3) BGR palette for the given colormap name.
+
+    Palettes are built once and cached. Sizes other than 256 are linearly
+    interpolated from the 256-entry base map, which lets 16-bit raw counts
+    index the palette directly.
+    """
+    if name == "thermal":
+        base = create_thermal_colormap().reshape(256, 3)
+    elif name in OPENCV_COLORMAPS:
+        ramp = np.arange(256, dtype=np.uint8).reshape(256, 1)
+        base = cv2.applyColorMap(ramp, OPENCV_COLORMAPS[name]).reshape(256, 3)
+    else:
+        raise ValueError(f"Unknown colormap '{name}', expected one of {COLORMAP_NAMES}")
+
+    if size == 256:
+        palette = base.copy()
+    else:
+        positions = np.linspace(0, 255, size)
+        palette = np.empty((size, 3), dtype=np.uint8)
+        for channel in range(3):
+            palette[:, channel] = np.interp(positions, np.arange(256), base[:, channel])
+
+    palette.flags.writeable = False
+    return palette
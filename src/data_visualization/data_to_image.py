@@ -1,19 +1,54 @@
 # * Library imports
+import time
 import asyncio
+import queue
 import cv2
 import numpy as np
-from typing import List, Tuple, Optional
+from typing import List, NamedTuple, Tuple, Optional
 from pathlib import Path
 from datetime import datetime
-import struct
 
 # * File imports
-from ..data_buffer import get_processed_buffered_temp_data, polygon_data_buffer
-from ..data_handling import divide_into_quadrants, get_quadrant_statistics
+from ..data_buffer import get_processed_buffered_temp_data, processed_data_buffer, raw_data_buffer, polygon_data_buffer
+from ..data_handling import (divide_into_quadrants, get_quadrant_statistics, polygon_mask, quadrant_slices,
+                             RAW_TO_TEMP_GAIN, RAW_TO_TEMP_OFFSET)
+from ..data_recording import ThermalRecorder
+from ..util_functions import metrics, runtime_profiler, tracer
+from .render_engine import RenderEngine, RANGE_MODES
+from .color_map import COLORMAP_NAMES
+from .overlay_layer import OverlayLayer
+from .display_thread import DisplayThread
+from .video_writer import VideoSegmentWriter
+from .mjpeg_server import MJPEGServer
+
+
+class ViewState(NamedTuple):
+    """
+    What the overlay and HUD show for one frame, taken on the event loop.
+
+    handle_key and the mouse callback change the view on the loop while the
+    display thread renders, so the display thread only reads this snapshot,
+    submitted with the frame: the overlay cache key and the layer built for
+    it always come from the same state.
+    """
+    polygon_points: Tuple[Tuple[int, int], ...]
+    polygon_mode: bool
+    show_quadrants: bool
+    show_stats: bool
+    colormap: str
+    range_mode: str
+    # None when not recording
+    recording_label: Optional[str]
+    frame_count: int
+    # (queue depth, dropped frames) of the open recorder
+    recorder_status: Optional[Tuple[int, int]]
 
 
 class DataToImage:
-    def __init__(self):
+    def __init__(self, display_hz: float = 30.0, headless: bool = False, video_segment_seconds: float = 300.0,
+                 stream_port: Optional[int] = None, stream_fps: float = 15.0, record_codec: Optional[str] = None,
+                 record_sparse: bool = False, record_summary: bool = True, profile_manager=None,
+                 record_header_rows: bool = True, video: Optional[bool] = None):
         self.show_quadrants = False
         self.show_stats = True
         self.polygon_points: List[Tuple[int, int]] = []
@@ -22,8 +57,29 @@ class DataToImage:
         self.max_points = 10
         self.current_matrix = None
         self.current_processed_data = None
+        # Calibration profile the current frame was converted with
+        self.current_profile = 0
         self.heatmap_scale = (640, 512)
         self.point_radius = 10
+        # Used by the display thread only, the loop changes colormap and range_mode and they reach
+        # the engine through the ViewState
+        self.render_engine = RenderEngine(colormap="jet", range_mode="smoothed",
+                                          output_size=self.heatmap_scale)
+        self.colormap = self.render_engine.colormap
+        self.range_mode = self.render_engine.range_mode
+        self.overlay_layer = OverlayLayer()
+        self.display_hz = display_hz
+        self.display: Optional[DisplayThread] = None
+        self.headless = headless
+        # Rolling heatmap video, by default instead of the window in headless mode
+        self.video = headless if video is None else video
+        self.video_segment_seconds = video_segment_seconds
+        self.video_writer: Optional[VideoSegmentWriter] = None
+        self.stream_port = stream_port
+        self.stream_fps = stream_fps
+        self.stream_server: Optional[MJPEGServer] = None
+        self._polygon_mask_key = None
+        self._polygon_mask = None
         self.output_dir = Path("./data/exports")
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
@@ -31,8 +87,18 @@ class DataToImage:
         self.is_recording = False
         self.recording_file = None
         self.recording_handle = None
+        # Stopped recorders still draining and closing their file on a worker thread
+        self.closing_recordings = set()
+        self.record_codec = record_codec
+        self.record_sparse = record_sparse
+        self.record_summary = record_summary
+        # Calibration profiles switched with 'n', the active id tags recorded frames
+        self.profile_manager = profile_manager
+        # Keep the camera's telemetry row with every recorded frame when the source provides it
+        self.record_header_rows = record_header_rows
+        self._polygon_indices_mask = None
+        self._polygon_indices = None
         self.frame_count = 0
-        self.recording_task = None
 
     def find_nearest_point(self, x, y) -> Optional[int]:
         min_dist = float('inf')
@@ -64,43 +130,79 @@ class DataToImage:
                 else:
                     print("No point nearby to remove")
 
-    def draw_polygon(self, overlay):
-        if len(self.polygon_points) > 0:
-            for i, point in enumerate(self.polygon_points):
-                temp_overlay = overlay.copy()
-                cv2.circle(temp_overlay, point, self.point_radius, (100, 100, 100), 1)
-                cv2.addWeighted(temp_overlay, 0.3, overlay, 0.7, 0, overlay)
+    def draw_polygon(self, layer: OverlayLayer, points: Tuple[Tuple[int, int], ...]):
+        if len(points) > 0:
+            # Translucent handles first so labels and dots stay opaque on top
+            for point in points:
+                layer.circle(point, self.point_radius, (100, 100, 100), 1, opacity=0.3)
 
-                cv2.circle(overlay, point, 5, (0, 255, 0), -1)
-                cv2.putText(overlay, str(i + 1), (point[0] + 10, point[1] - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+            for i, point in enumerate(points):
+                layer.circle(point, 5, (0, 255, 0), -1)
+                layer.put_text(str(i + 1), (point[0] + 10, point[1] - 10),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 
-            if len(self.polygon_points) > 1:
-                pts = np.array(self.polygon_points, np.int32)
+            if len(points) > 1:
+                pts = np.array(points, np.int32)
                 pts = pts.reshape((-1, 1, 2))
-                cv2.polylines(overlay, [pts], isClosed=True, color=(0, 255, 0), thickness=2)
+                layer.polylines([pts], True, (0, 255, 0), thickness=2)
 
-    def get_polygon_matrix(self, processed_data: np.ndarray) -> np.ndarray:
-        # If no polygon defined, return entire matrix
+    def get_polygon_mask(self, shape: Tuple[int, int]) -> Optional[np.ndarray]:
+        """Boolean ROI mask in data coordinates, None without a complete polygon."""
         if len(self.polygon_points) < self.min_points:
-            return processed_data
+            return None
 
-        rows, cols = processed_data.shape
+        points = tuple(self.polygon_points)
+        if self._polygon_mask_key == (points, shape):
+            return self._polygon_mask
 
-        scale_x = cols / self.heatmap_scale[0]
-        scale_y = rows / self.heatmap_scale[1]
+        self._polygon_mask = polygon_mask(points, self.heatmap_scale, shape)
+        self._polygon_mask_key = (points, shape)
+        return self._polygon_mask
 
-        scaled_points = [(int(x * scale_x), int(y * scale_y))
-                         for x, y in self.polygon_points]
+    def get_polygon_indices(self, shape: Tuple[int, int]) -> Optional[np.ndarray]:
+        """Flat uint32 pixel indices inside the ROI, the same array object until the ROI changes."""
+        mask = self.get_polygon_mask(shape)
+        if mask is None:
+            return None
 
-        mask = np.zeros((rows, cols), dtype=np.uint8)
-        pts = np.array(scaled_points, np.int32)
-        cv2.fillPoly(mask, [pts], 1)
+        if self._polygon_indices_mask is not mask:
+            self._polygon_indices = np.flatnonzero(mask).astype(np.uint32)
+            self._polygon_indices_mask = mask
+        return self._polygon_indices
+
+    def get_polygon_matrix(self, processed_data: np.ndarray) -> np.ndarray:
+        # If no polygon defined, return entire matrix
+        mask = self.get_polygon_mask(processed_data.shape)
+        if mask is None:
+            return processed_data
 
-        output_matrix = np.where(mask == 1, processed_data, np.nan)
+        output_matrix = np.where(mask, processed_data, np.nan)
 
         return output_matrix
 
+    def get_roi_statistics(self) -> dict:
+        """Current ROI and quadrant zone statistics as plain Python types."""
+        matrix = self.current_processed_data
+        stats = {"polygon_points": [list(point) for point in self.polygon_points], "roi": None, "quadrants": None,
+                 "recording": self.is_recording, "frame_count": self.frame_count, "profile": self.current_profile,
+                 "render": self.render_engine.get_stats()}
+        if matrix is None:
+            return stats
+
+        mask = self.get_polygon_mask(matrix.shape)
+        roi = matrix[mask] if mask is not None else matrix
+        # NaN pixels have no value (outside the stored ROI of a sparse replay)
+        roi = roi[~np.isnan(roi)]
+        if roi.size > 0:
+            stats["roi"] = {"pixels": int(roi.size), "min": float(roi.min()), "max": float(roi.max()),
+                            "mean": float(roi.mean())}
+
+        # A quadrant with no ROI pixel has no mean, None keeps the /stats JSON valid (json.dumps writes NaN)
+        q1, q2, q3, q4, _, _ = divide_into_quadrants(matrix)
+        stats["quadrants"] = {name: float(np.nanmean(q)) if not np.isnan(q).all() else None
+                              for name, q in zip(("Q1", "Q2", "Q3", "Q4"), (q1, q2, q3, q4))}
+        return stats
+
     def start_recording(self):
         if self.is_recording:
             print("Already recording!")
@@ -108,13 +210,13 @@ class DataToImage:
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.recording_file = self.output_dir / f"thermal_recording_{timestamp}.bin"
-        self.recording_handle = open(self.recording_file, 'wb')
+        # The recorder is opened on the first frame, once the raw frame shape is known
+        self.recording_handle = None
         self.is_recording = True
         self.frame_count = 0
 
-        # Write file header with magic number for validation
-        self.recording_handle.write(b'THRM')  # Magic number
-        self.recording_handle.write(struct.pack('i', 1))  # Version number
+        # Every captured frame is handed to the recorder thread, independent of the display rate
+        raw_data_buffer.subscribe(self.write_frame)
 
         if len(self.polygon_points) < self.min_points:
             print(f"Started recording FULL FRAME to: {self.recording_file}")
@@ -122,91 +224,336 @@ class DataToImage:
             print(f"Started recording POLYGON REGION to: {self.recording_file}")
 
     def stop_recording(self):
-        """Stop recording polygon data"""
+        """
+        Stop recording polygon data.
+
+        The recorder drains its queue, closes the file and builds the summary
+        on its own thread, which can take seconds. On the event loop that
+        thread is joined from an executor, so frames keep flowing; await
+        wait_recordings_closed() before exiting.
+        """
         if not self.is_recording:
             print("Not recording!")
             return
 
         self.is_recording = False
-        if self.recording_handle:
-            self.recording_handle.close()
-            self.recording_handle = None
-
-        print(f"Recording stopped. {self.frame_count} frames saved to: {self.recording_file}")
-
-    def write_frame(self, matrix_data):
-        if not self.is_recording or not self.recording_handle:
+        raw_data_buffer.unsubscribe(self.write_frame)
+        metrics.remove("record.queue_depth")
+        recorder, self.recording_handle = self.recording_handle, None
+        if recorder is None:
+            print(f"Recording stopped. {self.frame_count} frames saved to: {self.recording_file}")
             return
 
+        recorder.stop()
         try:
-            # Frame divider: magic bytes
-            self.recording_handle.write(b'FRAM')  # Frame marker
-
-            # Write frame metadata
-            self.recording_handle.write(struct.pack('i', len(matrix_data.shape)))  # num dimensions
-            for dim in matrix_data.shape:
-                self.recording_handle.write(struct.pack('i', dim))  # shape
-
-            # Write timestamp
-            timestamp_val = datetime.now().timestamp()
-            self.recording_handle.write(struct.pack('d', timestamp_val))
-
-            # Write frame number
-            self.recording_handle.write(struct.pack('i', self.frame_count))
-
-            # Write data as binary
-            matrix_data.astype(np.float64).tofile(self.recording_handle)
-            self.recording_handle.flush()
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.finish_recording(recorder, self.recording_file)
+            return
+        closing = loop.run_in_executor(None, self.finish_recording, recorder, self.recording_file)
+        self.closing_recordings.add(closing)
+        closing.add_done_callback(self.closing_recordings.discard)
+
+    def finish_recording(self, recorder: ThermalRecorder, path: Path):
+        """Wait for a stopped recorder to close its file and report it, blocks until then."""
+        recorder.join()
+        stats = recorder.get_stats()
+        print(f"Recorder: {stats['frames_dropped']} frames dropped, "
+              f"max queue depth {stats['max_queue_depth']}, {stats['bytes_written'] / 1e6:.1f} MB written")
+        print(f"Recording stopped. {stats['frames_written']} frames saved to: {path}")
+
+    async def wait_recordings_closed(self):
+        """Wait until every stopped recording is closed on disk."""
+        if self.closing_recordings:
+            await asyncio.gather(*self.closing_recordings, return_exceptions=True)
+
+    def open_recording(self, raw_data: np.ndarray, header_row: Optional[np.ndarray] = None):
+        """Start the recorder thread with the frame shape, calibration and ROI in the file header."""
+        metadata = {
+            "created": datetime.now().isoformat(),
+            "polygon_points": [list(point) for point in self.polygon_points]
+            if len(self.polygon_points) >= self.min_points else None,
+            "heatmap_scale": list(self.heatmap_scale),
+            # Frame tag -> conversion, for recordings that switch profiles
+            "profiles": self.profile_manager.describe() if self.profile_manager is not None else None,
+        }
+        gain, offset = RAW_TO_TEMP_GAIN, RAW_TO_TEMP_OFFSET
+        if self.profile_manager is not None:
+            gain, offset = self.profile_manager.active.gain, self.profile_manager.active.offset
+        # Sparse files only pay off with a ROI, without one at the start record full frames
+        sparse = self.record_sparse and metadata["polygon_points"] is not None
+        self.recording_handle = ThermalRecorder(self.recording_file, raw_data.shape, dtype=np.uint16,
+                                                gain=gain, offset=offset,
+                                                metadata=metadata, codec=self.record_codec, sparse=sparse,
+                                                summary_on_close=self.record_summary,
+                                                summary_quadrants=quadrant_slices(raw_data.shape),
+                                                summary_roi=self.get_polygon_mask(raw_data.shape),
+                                                header_row_bytes=header_row.nbytes if header_row is not None else 0,
+                                                metrics=metrics, tracer=tracer)
+        metrics.add_gauge("record.queue_depth", lambda recorder=self.recording_handle: recorder.queue_depth)
+        self.recording_handle.start()
+
+    def write_frame(self, raw_data: np.ndarray, meta: Optional[dict] = None):
+        """Raw buffer subscriber, queues the frame without blocking capture."""
+        if not self.is_recording:
+            return
 
-            self.frame_count += 1
-            print(f"Frame {self.frame_count} written")
+        try:
+            header_row = meta.get("header_row") if meta and self.record_header_rows else None
+            trace = meta.get("trace") if meta else None
+            if self.recording_handle is None:
+                self.open_recording(raw_data, header_row)
+
+            # Raw sensor counts. Sparse files keep only the ROI pixels and store the ROI
+            # again whenever the polygon changes, otherwise the ROI is only in the header metadata
+            roi = self.get_polygon_indices(raw_data.shape) if self.recording_handle.writer.sparse else None
+            tag = self.profile_manager.active_id if self.profile_manager is not None else 0
+            self.recording_handle.submit(raw_data, tag=tag, roi=roi, header_row=header_row, trace=trace)
+            self.frame_count = self.recording_handle.frames_written
 
         except Exception as e:
             print(f"Error writing frame: {e}")
 
-    async def recording_loop(self):
-        """Background task that records frames every 1 second"""
-        while self.is_recording:
-            if self.current_processed_data is not None:
-                matrix_to_record = self.get_polygon_matrix(self.current_processed_data)
-                if matrix_to_record.size > 0:
-                    self.write_frame(matrix_to_record)
-
-            await asyncio.sleep(1.0)  # Record every 1 second
-
-    def draw_quadrant_lines(self, overlay, mid_row=255, mid_col=320):
-        height, width = overlay.shape[:2]
+    def draw_quadrant_lines(self, layer: OverlayLayer, mid_row=255, mid_col=320):
+        height, width = layer.shape
 
-        cv2.line(overlay, (0, mid_row), (width, mid_row), (255, 255, 255), 2)
-        cv2.line(overlay, (mid_col, 0), (mid_col, height), (255, 255, 255), 2)
+        layer.line((0, mid_row), (width, mid_row), (255, 255, 255), 2)
+        layer.line((mid_col, 0), (mid_col, height), (255, 255, 255), 2)
 
         font = cv2.FONT_ITALIC
         font_scale = 0.6
         color = (255, 255, 255)
         thickness = 2
 
-        cv2.putText(overlay, "Q1", (10, 25), font, font_scale, color, thickness)
-        cv2.putText(overlay, "Q2", (mid_col + 10, 25), font, font_scale, color, thickness)
-        cv2.putText(overlay, "Q3", (10, mid_row + 25), font, font_scale, color, thickness)
-        cv2.putText(overlay, "Q4", (mid_col + 10, mid_row + 25), font, font_scale, color, thickness)
+        layer.put_text("Q1", (10, 25), font, font_scale, color, thickness)
+        layer.put_text("Q2", (mid_col + 10, 25), font, font_scale, color, thickness)
+        layer.put_text("Q3", (10, mid_row + 25), font, font_scale, color, thickness)
+        layer.put_text("Q4", (mid_col + 10, mid_row + 25), font, font_scale, color, thickness)
+
+    def draw_mode_indicator(self, layer: OverlayLayer, points: Tuple[Tuple[int, int], ...]):
+        height = layer.shape[0]
+        mode_text = f"POLYGON MODE - Points: {len(points)}/{self.max_points}"
+        layer.put_text(mode_text, (10, height - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+        instructions = "L-Click: Add | R-Click: Remove"
+        layer.put_text(instructions, (10, height - 35), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+
+    def recording_label(self) -> str:
+        if len(self.polygon_points) < self.min_points:
+            return "REC FULL - Frame "
+        return "REC POLYGON - Frame "
+
+    def draw_recording_indicator(self, layer: OverlayLayer, label: str):
+        width = layer.shape[1]
+        layer.circle((width - 30, 30), 10, (0, 0, 255), -1)
+        layer.put_text(label, (width - 280, 35), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+
+    def view_state(self) -> ViewState:
+        """Snapshot of the view settings for the display thread, taken on the event loop."""
+        recorder = self.recording_handle
+        return ViewState(
+            polygon_points=tuple(self.polygon_points),
+            polygon_mode=self.polygon_mode,
+            show_quadrants=self.show_quadrants,
+            show_stats=self.show_stats,
+            colormap=self.colormap,
+            range_mode=self.range_mode,
+            recording_label=self.recording_label() if self.is_recording else None,
+            frame_count=self.frame_count,
+            recorder_status=(recorder.queue_depth, recorder.frames_dropped) if recorder is not None else None,
+        )
+
+    def draw_overlay(self, frame: np.ndarray, matrix: np.ndarray, state: ViewState):
+        """Composite the cached static overlay, rebuilding it only when its inputs change."""
+        display_mid = None
+
+        # Draw quadrants if enabled
+        if state.show_quadrants:
+            quadrants = divide_into_quadrants(matrix)
+            q1, q2, q3, q4, mid_row, mid_col = quadrants
+            get_quadrant_statistics(q1, q2, q3, q4)
+
+            scale_x = self.heatmap_scale[0] / matrix.shape[1]
+            scale_y = self.heatmap_scale[1] / matrix.shape[0]
+            display_mid = (int(mid_row * scale_y), int(mid_col * scale_x))
+
+        key = (state.polygon_points, state.polygon_mode, display_mid, state.recording_label)
+
+        def build(layer: OverlayLayer):
+            if display_mid is not None:
+                self.draw_quadrant_lines(layer, *display_mid)
+            if len(state.polygon_points) > 0:
+                self.draw_polygon(layer, state.polygon_points)
+            if state.polygon_mode:
+                self.draw_mode_indicator(layer, state.polygon_points)
+            if state.recording_label is not None:
+                self.draw_recording_indicator(layer, state.recording_label)
+
+        self.overlay_layer.update(key, frame.shape[:2], build)
+        self.overlay_layer.composite(frame)
+
+        # The frame counter is the only per-frame part of the recording indicator
+        if state.recording_label is not None:
+            (label_width, _), _ = cv2.getTextSize(state.recording_label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+            cv2.putText(frame, str(state.frame_count), (frame.shape[1] - 280 + label_width, 35),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+
+            if state.recorder_status is not None:
+                queue_depth, dropped = state.recorder_status
+                cv2.putText(frame, f"queue {queue_depth} | dropped {dropped}",
+                            (frame.shape[1] - 280, 58), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 255), 1)
+
+    def draw_render_stats(self, overlay):
+        stats = self.render_engine.get_stats()
+        low, high = stats["display_range"]
+        text = (f"{stats['colormap']} {stats['range_mode']} {low:.1f}-{high:.1f} | "
+                f"render {stats['last_render_ms']:.2f} ms (avg {stats['avg_render_ms']:.2f})")
+        cv2.putText(overlay, text, (10, overlay.shape[0] - 60), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+        # Pipeline metrics, refreshed once per second by the metrics reporter
+        cv2.putText(overlay, metrics.hud_line(), (10, overlay.shape[0] - 40), cv2.FONT_HERSHEY_SIMPLEX, 0.4,
+                    (255, 255, 255), 1)
+
+    def render_frame(self, matrix: np.ndarray, state: Optional[ViewState] = None) -> np.ndarray:
+        """
+        Render heatmap and overlays for one frame, called from the display thread.
+
+        state is the ViewState submitted with the frame; None takes one now,
+        for callers on the event loop thread.
+        """
+        started = time.perf_counter()
+        if state is None:
+            state = self.view_state()
+        if state.colormap != self.render_engine.colormap:
+            self.render_engine.set_colormap(state.colormap)
+        if state.range_mode != self.render_engine.range_mode:
+            self.render_engine.set_range_mode(state.range_mode)
+        overlay = self.render_engine.render(matrix)
+
+        # Polygon, quadrant grid and labels from the cached layer
+        self.draw_overlay(overlay, matrix, state)
+
+        # Show render cost and display range
+        if state.show_stats:
+            self.draw_render_stats(overlay)
+
+        metrics.count("render.frames")
+        metrics.observe("render", time.perf_counter() - started)
+        return overlay
+
+    def handle_key(self, key: int) -> bool:
+        """Apply a key press, returns False when the view should close."""
+        if key == 27:  # ESC
+            if self.is_recording:
+                self.stop_recording()
+            return False
+        elif key == ord('p'):
+            self.polygon_mode = not self.polygon_mode
+            print(f"Polygon mode: {'ON' if self.polygon_mode else 'OFF'}")
+        elif key == ord('c'):
+            self.polygon_points.clear()
+            print("All polygon points cleared")
+        elif key == ord('u'):
+            if len(self.polygon_points) > 0:
+                removed = self.polygon_points.pop()
+                print(f"Last point removed: {removed}")
+            else:
+                print("No points to undo")
+        elif key == ord('r'):
+            if not self.is_recording:
+                self.start_recording()
+            else:
+                self.stop_recording()
+        elif key == ord('q'):
+            self.show_quadrants = not self.show_quadrants
+            print(f"Quadrants: {'ON' if self.show_quadrants else 'OFF'}")
+        elif key == ord('m'):
+            self.colormap = COLORMAP_NAMES[(COLORMAP_NAMES.index(self.colormap) + 1) % len(COLORMAP_NAMES)] \
+                if self.colormap in COLORMAP_NAMES else COLORMAP_NAMES[0]
+            print(f"Colormap: {self.colormap}")
+        elif key == ord('a'):
+            self.range_mode = RANGE_MODES[(RANGE_MODES.index(self.range_mode) + 1) % len(RANGE_MODES)]
+            print(f"Auto-range: {self.range_mode}")
+        elif key == ord('s'):
+            self.show_stats = not self.show_stats
+        elif key == ord('f'):
+            # Profile the running pipeline for a few seconds, a second press ends the run early
+            runtime_profiler.toggle()
+        elif key == ord('n'):
+            if self.profile_manager is not None:
+                self.profile_manager.next()
+            else:
+                print("No calibration profiles loaded")
+        return True
+
+    def handle_events(self) -> bool:
+        """Drain GUI events forwarded by the display thread, returns False on exit."""
+        if self.display is None:
+            return True
+        while True:
+            try:
+                kind, payload = self.display.events.get_nowait()
+            except queue.Empty:
+                return True
+
+            if kind == "key":
+                if not self.handle_key(payload):
+                    return False
+            elif kind == "mouse":
+                self.mouse_callback(*payload, None)
+            elif kind == "close":
+                if self.is_recording:
+                    self.stop_recording()
+                return False
 
     async def data_to_image(self) -> None:
         try:
-            cv2.namedWindow("Thermal Image")
-            cv2.setMouseCallback("Thermal Image", self.mouse_callback)
-
-            print("\nControls:")
-            print("  'p' - Toggle polygon mode")
-            print("  LEFT CLICK - Add point (in polygon mode)")
-            print("  RIGHT CLICK - Remove nearest point (in polygon mode)")
-            print("  'c' - Clear all points")
-            print("  'u' - Undo last point")
-            print("  'r' - Start/Stop recording (1 second intervals)")
-            print("  'q' - Toggle quadrant view")
-            print("  ESC - Exit")
-            print("\nNote: Recording without polygon will capture FULL FRAME\n")
+            sinks = []
+            if self.video:
+                # The rendered heatmap and overlays go to rolling video files
+                self.video_writer = VideoSegmentWriter(output_dir=self.output_dir / "video", fps=self.display_hz,
+                                                       segment_seconds=self.video_segment_seconds)
+                self.video_writer.start()
+                sinks.append(self.video_writer.submit)
+
+            if self.stream_port is not None:
+                self.stream_server = MJPEGServer(port=self.stream_port, max_fps=self.stream_fps,
+                                                 stats_provider=self.get_roi_statistics, profiler=runtime_profiler)
+                await self.stream_server.start()
+                sinks.append(self.stream_server.submit)
+
+            # Without a window or a sink nothing is rendered, the loop only feeds the polygon buffer
+            if not self.headless or sinks:
+                self.display = DisplayThread(render=self.render_frame, window_name="Thermal Image",
+                                             target_hz=self.display_hz, show_window=not self.headless, sinks=sinks)
+                self.display.start()
+                metrics.add_gauge("render.skipped", lambda display=self.display: display.frames_skipped)
+
+            if self.headless:
+                if self.video_writer is not None:
+                    print(f"Headless mode: writing heatmap video to {self.video_writer.output_dir}")
+            else:
+                print("\nControls:")
+                print("  'p' - Toggle polygon mode")
+                print("  LEFT CLICK - Add point (in polygon mode)")
+                print("  RIGHT CLICK - Remove nearest point (in polygon mode)")
+                print("  'c' - Clear all points")
+                print("  'u' - Undo last point")
+                print("  'r' - Start/Stop recording (every frame)")
+                print("  'q' - Toggle quadrant view")
+                print("  'm' - Cycle colormap")
+                print("  'a' - Cycle display range mode (smoothed/percentile/fixed/minmax)")
+                print("  's' - Toggle render stats")
+                print("  'n' - Next calibration profile")
+                print("  'f' - Start/Stop a runtime profile (written to data/exports/profiles)")
+                print("  ESC - Exit")
+                print("\nNote: Recording without polygon will capture FULL FRAME\n")
+
+            last_matrix = None
 
             while True:
+                if not self.handle_events():
+                    break
+
                 processed_buffer = get_processed_buffered_temp_data()
 
                 if not processed_buffer:
@@ -216,95 +563,23 @@ class DataToImage:
 
                 matrix = processed_buffer[-1]
 
-                self.current_processed_data = matrix
-                self.current_matrix = matrix
-
-                # Update polygon buffer
-                matrix_to_buffer = self.get_polygon_matrix(self.current_processed_data)
-                if matrix_to_buffer.size > 0:
-                    polygon_data_buffer.add(matrix_to_buffer)
-
-                matrix_norm = cv2.normalize(matrix, None, 0, 255, cv2.NORM_MINMAX)
-
-                if matrix_norm is None or matrix_norm.size == 0:
-                    print("Warning: Normalized matrix is empty.")
-                    await asyncio.sleep(1)
-                    continue
-
-                matrix_norm = np.uint8(matrix_norm)
-                heatmap = cv2.applyColorMap(matrix_norm, cv2.COLORMAP_JET)
-
-                heatmap = cv2.resize(heatmap, self.heatmap_scale)
-                overlay = heatmap.copy()
-
-                # Draw quadrants if enabled
-                if self.show_quadrants:
-                    quadrants = divide_into_quadrants(matrix)
-                    q1, q2, q3, q4, mid_row, mid_col = quadrants
-                    get_quadrant_statistics(q1, q2, q3, q4)
-
-                    scale_x = self.heatmap_scale[0] / matrix.shape[1]
-                    scale_y = self.heatmap_scale[1] / matrix.shape[0]
-                    display_mid_row = int(mid_row * scale_y)
-                    display_mid_col = int(mid_col * scale_x)
-
-                    self.draw_quadrant_lines(overlay, display_mid_row, display_mid_col)
-
-                # Draw polygon if points exist
-                if len(self.polygon_points) > 0:
-                    self.draw_polygon(overlay)
+                # Only new frames go to the polygon buffer and the display
+                if matrix is not last_matrix:
+                    last_matrix = matrix
+                    trace = processed_data_buffer.latest_trace()
+                    tracer.mark("image", trace)
+                    self.current_processed_data = matrix
+                    self.current_matrix = matrix
+                    self.current_profile = processed_data_buffer.latest_tag()
 
-                # Show mode indicator
-                if self.polygon_mode:
-                    mode_text = f"POLYGON MODE - Points: {len(self.polygon_points)}/{self.max_points}"
-                    cv2.putText(overlay, mode_text, (10, overlay.shape[0] - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                    # Update polygon buffer
+                    matrix_to_buffer = self.get_polygon_matrix(self.current_processed_data)
+                    if matrix_to_buffer.size > 0:
+                        polygon_data_buffer.add(matrix_to_buffer, trace=trace)
+                        tracer.mark("polygon", trace)
 
-                    instructions = "L-Click: Add | R-Click: Remove"
-                    cv2.putText(overlay, instructions, (10, overlay.shape[0] - 35),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
-
-                # Show recording indicator
-                if self.is_recording:
-                    if len(self.polygon_points) < self.min_points:
-                        rec_text = f"REC FULL - Frame {self.frame_count}"
-                    else:
-                        rec_text = f"REC POLYGON - Frame {self.frame_count}"
-                    cv2.circle(overlay, (overlay.shape[1] - 30, 30), 10, (0, 0, 255), -1)
-                    cv2.putText(overlay, rec_text, (overlay.shape[1] - 280, 35),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-
-                cv2.imshow("Thermal Image", overlay)
-
-                key = cv2.waitKey(1) & 0xFF
-
-                if key == 27:  # ESC
-                    if self.is_recording:
-                        self.stop_recording()
-                    break
-                elif key == ord('p'):
-                    self.polygon_mode = not self.polygon_mode
-                    print(f"Polygon mode: {'ON' if self.polygon_mode else 'OFF'}")
-                elif key == ord('c'):
-                    self.polygon_points.clear()
-                    print("All polygon points cleared")
-                elif key == ord('u'):
-                    if len(self.polygon_points) > 0:
-                        removed = self.polygon_points.pop()
-                        print(f"Last point removed: {removed}")
-                    else:
-                        print("No points to undo")
-                elif key == ord('r'):
-                    if not self.is_recording:
-                        self.start_recording()
-                        self.recording_task = asyncio.create_task(self.recording_loop())
-                    else:
-                        self.stop_recording()
-                        if self.recording_task:
-                            self.recording_task.cancel()
-                elif key == ord('q'):
-                    self.show_quadrants = not self.show_quadrants
-                    print(f"Quadrants: {'ON' if self.show_quadrants else 'OFF'}")
+                    if self.display is not None:
+                        self.display.submit(matrix, trace=trace, state=self.view_state())
 
                 await asyncio.sleep(0)
 
@@ -316,5 +591,13 @@ class DataToImage:
         finally:
             if self.is_recording:
                 self.stop_recording()
-            cv2.destroyAllWindows()
-            print("Thermal analysis stopped.")
\ No newline at end of file
+            await self.wait_recordings_closed()
+            if self.display is not None:
+                self.display.stop()
+                self.display.join(timeout=1.0)
+            if self.video_writer is not None:
+                self.video_writer.stop()
+                self.video_writer.join(timeout=5.0)
+            if self.stream_server is not None:
+                await self.stream_server.close()
+            print("Thermal analysis stopped.")
@@ -0,0 +1,124 @@
+# * Library imports
+import time
+import queue
+import threading
+import cv2
+import numpy as np
+from typing import Callable, List, Optional
+
+# * File imports
+from ..util_functions import tracer
+
+
+class DisplayThread(threading.Thread):
+    def __init__(self, render: Callable[[np.ndarray, object], np.ndarray], window_name: str = "Thermal Image",
+                 target_hz: float = 30.0, events: Optional[queue.Queue] = None, show_window: bool = True,
+                 sinks: Optional[List[Callable[[np.ndarray], object]]] = None):
+        """
+        Owns the OpenCV window and shows the latest submitted frame at a fixed rate.
+
+        Frames submitted faster than target_hz are skipped, only the newest one is
+        rendered. Key presses and mouse events are forwarded through the events
+        queue as ("key", code), ("mouse", (event, x, y, flags)) or ("close", None).
+
+        Args:
+            render: Callable turning a submitted matrix and its state into a BGR image, runs on this thread
+            window_name: OpenCV window title
+            target_hz: Display refresh rate, independent of the camera rate
+            events: Queue receiving GUI events, created if not given
+            show_window: False runs headless, frames only go to the sinks
+            sinks: Callables receiving every rendered image, must not block
+        """
+        super().__init__(name="display", daemon=True)
+        self.render = render
+        self.window_name = window_name
+        self.frame_interval = 1.0 / target_hz
+        self.events = events if events is not None else queue.Queue()
+        self.show_window = show_window
+        self.sinks = sinks if sinks is not None else []
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._latest = None
+        self._latest_trace = None
+        self._latest_state = None
+        self._latest_seq = 0
+        self._shown_seq = 0
+
+        self.frames_shown = 0
+        self.frames_skipped = 0
+
+    def submit(self, matrix: np.ndarray, trace: Optional[float] = None, state=None):
+        """
+        Offer a new frame, replacing any frame that was not shown yet.
+
+        trace is its tracing stamp, state an immutable snapshot of whatever
+        the render callable draws besides the matrix (DataToImage.ViewState),
+        so rendering never reads settings the submitter is changing.
+        """
+        with self._lock:
+            self._latest = matrix
+            self._latest_trace = trace
+            self._latest_state = state
+            self._latest_seq += 1
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _mouse_callback(self, event, x, y, flags, param):
+        self.events.put(("mouse", (event, x, y, flags)))
+
+    def run(self):
+        try:
+            if self.show_window:
+                cv2.namedWindow(self.window_name)
+                cv2.setMouseCallback(self.window_name, self._mouse_callback)
+
+            next_frame_time = time.perf_counter()
+
+            while not self._stop_event.is_set():
+                with self._lock:
+                    matrix, trace, state, seq = self._latest, self._latest_trace, self._latest_state, self._latest_seq
+
+                if matrix is not None and seq != self._shown_seq:
+                    if self._shown_seq:
+                        self.frames_skipped += seq - self._shown_seq - 1
+                    self._shown_seq = seq
+
+                    image = self.render(matrix, state)
+                    for sink in self.sinks:
+                        sink(image)
+                    if self.show_window:
+                        cv2.imshow(self.window_name, image)
+                    self.frames_shown += 1
+                    # Age of the frame on screen (or handed to the video and stream sinks)
+                    tracer.mark("display", trace)
+
+                next_frame_time += self.frame_interval
+                now = time.perf_counter()
+                if next_frame_time < now:
+                    next_frame_time = now
+
+                if not self.show_window:
+                    time.sleep(next_frame_time - now)
+                    continue
+
+                # waitKey pumps GUI events and paces the loop at the target rate
+                key = cv2.waitKey(max(1, int((next_frame_time - now) * 1000))) & 0xFF
+
+                if key != 0xFF:
+                    self.events.put(("key", key))
+
+                if cv2.getWindowProperty(self.window_name, cv2.WND_PROP_VISIBLE) < 1:
+                    self.events.put(("close", None))
+                    break
+
+        except Exception as e:
+            print(f"Error in display thread: {e}")
+            import traceback
+            traceback.print_exc()
+            self.events.put(("close", None))
+
+        finally:
+            if self.show_window:
+                cv2.destroyAllWindows()
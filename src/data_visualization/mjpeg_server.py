@@ -0,0 +1,201 @@
+# * Library imports
+import json
+import time
+import asyncio
+import threading
+import urllib.parse
+import cv2
+import numpy as np
+from typing import Callable, Optional
+
+BOUNDARY = b"thermalframe"
+
+
+class MJPEGServer:
+    def __init__(self, host: str = "0.0.0.0", port: int = 8080, max_fps: float = 15.0, jpeg_quality: int = 80,
+                 stats_provider: Optional[Callable[[], dict]] = None, max_client_buffer: int = 1 << 20,
+                 profiler=None):
+        """
+        Serve the rendered heatmap as an MJPEG stream from the running asyncio loop.
+
+        Routes:
+            /            MJPEG stream (multipart/x-mixed-replace)
+            /snapshot    Latest frame as a single JPEG
+            /stats       JSON from stats_provider
+            /profile     Start a runtime profile (?seconds=10&mode=sampling|cprofile), ?stop=1 ends it,
+                         localhost only
+
+        Each frame is JPEG-encoded once, at most max_fps times per second, and
+        shared by all clients. A client whose socket buffer is still above
+        max_client_buffer bytes skips frames instead of queueing them.
+
+        Args:
+            host: Interface to bind
+            port: TCP port to listen on
+            max_fps: Upper bound on the encode rate, independent of the render rate
+            jpeg_quality: cv2.IMWRITE_JPEG_QUALITY value
+            stats_provider: Callable returning a JSON-serializable dict for /stats
+            max_client_buffer: Pending bytes per client before frames are dropped
+            profiler: RuntimeProfiler behind /profile, None disables the route
+        """
+        self.host = host
+        self.port = port
+        self.frame_interval = 1.0 / max_fps
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+        self.stats_provider = stats_provider
+        self.max_client_buffer = max_client_buffer
+        self.profiler = profiler
+
+        self._lock = threading.Lock()
+        self._latest = None
+        self._latest_seq = 0
+        self._encoded_seq = 0
+
+        self.jpeg: Optional[bytes] = None
+        self._frame_event = asyncio.Event()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._encode_task: Optional[asyncio.Task] = None
+
+        self.clients = 0
+        self.frames_encoded = 0
+        self.frames_dropped = 0
+        self.last_encode_ms = 0.0
+
+    def submit(self, frame: np.ndarray):
+        """Offer a rendered frame, safe to call from any thread."""
+        with self._lock:
+            self._latest = frame.copy()
+            self._latest_seq += 1
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self._encode_task = asyncio.create_task(self._encode_loop())
+        print(f"MJPEG stream available at http://{self.host}:{self.port}/")
+
+    async def close(self):
+        if self._encode_task is not None:
+            self._encode_task.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _encode_loop(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                started = time.perf_counter()
+
+                with self._lock:
+                    frame, seq = self._latest, self._latest_seq
+
+                # Nobody is watching, don't spend time encoding
+                if self.clients > 0 and frame is not None and seq != self._encoded_seq:
+                    self._encoded_seq = seq
+                    if await self._encode(loop, frame):
+                        # Wake every waiting client, then arm a fresh event for the next frame
+                        event, self._frame_event = self._frame_event, asyncio.Event()
+                        event.set()
+
+                await asyncio.sleep(max(0.0, self.frame_interval - (time.perf_counter() - started)))
+        except asyncio.CancelledError:
+            pass
+
+    async def _encode(self, loop: asyncio.AbstractEventLoop, frame: np.ndarray) -> bool:
+        started = time.perf_counter()
+        ok, buffer = await loop.run_in_executor(None, cv2.imencode, ".jpg", frame, self.encode_params)
+        if ok:
+            self.jpeg = buffer.tobytes()
+            self.frames_encoded += 1
+            self.last_encode_ms = (time.perf_counter() - started) * 1000
+        return ok
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+
+            parts = request_line.decode("latin-1").split()
+            path, _, query = (parts[1] if len(parts) >= 2 else "/").partition("?")
+
+            if path in ("/", "/stream"):
+                await self._stream(writer)
+            elif path == "/snapshot":
+                # Without stream clients the cached JPEG is stale, encode on demand
+                with self._lock:
+                    frame, seq = self._latest, self._latest_seq
+                if frame is not None and seq != self._encoded_seq:
+                    self._encoded_seq = seq
+                    await self._encode(asyncio.get_running_loop(), frame)
+
+                if self.jpeg is None:
+                    self._respond(writer, b"503 Service Unavailable", b"text/plain", b"No frame yet")
+                else:
+                    self._respond(writer, b"200 OK", b"image/jpeg", self.jpeg)
+            elif path == "/stats":
+                stats = self.stats_provider() if self.stats_provider else {}
+                stats["stream"] = self.get_stats()
+                self._respond(writer, b"200 OK", b"application/json", json.dumps(stats).encode())
+            elif path == "/profile" and self.profiler is not None:
+                self._handle_profile(writer, query)
+            else:
+                self._respond(writer, b"404 Not Found", b"text/plain", b"Not found")
+
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _handle_profile(self, writer: asyncio.StreamWriter, query: str):
+        # The stream may be served on all interfaces, profiling stays a local control
+        peer = writer.get_extra_info("peername")
+        if not peer or peer[0] not in ("127.0.0.1", "::1", "::ffff:127.0.0.1"):
+            self._respond(writer, b"403 Forbidden", b"text/plain", b"Profiling is only available from localhost")
+            return
+
+        params = dict(urllib.parse.parse_qsl(query))
+        try:
+            if params.get("stop"):
+                output = self.profiler.stop()
+                result = {"stopped": output is not None, "output": str(output) if output else None}
+            else:
+                seconds = float(params["seconds"]) if "seconds" in params else None
+                result = {"started": self.profiler.start(seconds, params.get("mode"))}
+        except (ValueError, RuntimeError) as e:
+            self._respond(writer, b"400 Bad Request", b"text/plain", str(e).encode())
+            return
+        result.update(self.profiler.status())
+        self._respond(writer, b"200 OK", b"application/json", json.dumps(result).encode())
+
+    def _respond(self, writer: asyncio.StreamWriter, status: bytes, content_type: bytes, body: bytes):
+        writer.write(b"HTTP/1.0 " + status + b"\r\nContent-Type: " + content_type +
+                     b"\r\nContent-Length: " + str(len(body)).encode() +
+                     b"\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n" + body)
+
+    async def _stream(self, writer: asyncio.StreamWriter):
+        writer.write(b"HTTP/1.0 200 OK\r\nCache-Control: no-cache\r\nConnection: close\r\n"
+                     b"Content-Type: multipart/x-mixed-replace; boundary=" + BOUNDARY + b"\r\n\r\n")
+        self.clients += 1
+        try:
+            while not writer.is_closing():
+                await self._frame_event.wait()
+
+                # Slow client: skip this frame rather than buffering it
+                if writer.transport.get_write_buffer_size() > self.max_client_buffer:
+                    self.frames_dropped += 1
+                    continue
+
+                jpeg = self.jpeg
+                writer.write(b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\nContent-Length: " +
+                             str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+        finally:
+            self.clients -= 1
+
+    def get_stats(self) -> dict:
+        return {
+            "clients": self.clients,
+            "frames_encoded": self.frames_encoded,
+            "frames_dropped": self.frames_dropped,
+            "last_encode_ms": self.last_encode_ms,
+        }
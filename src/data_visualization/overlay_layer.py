@@ -0,0 +1,76 @@
+# * Library imports
+import cv2
+import numpy as np
+from typing import Callable, Hashable, Optional, Tuple
+
+
+class OverlayLayer:
+    def __init__(self):
+        """
+        Prerendered overlay (polygon, handles, grid, labels) with an alpha mask.
+
+        The layer is only redrawn when its key changes. Compositing touches just
+        the pixels the layer covers, blended in a single vectorized pass.
+        """
+        self.key: Optional[Hashable] = None
+        self.shape: Optional[Tuple[int, int]] = None
+        self.color: Optional[np.ndarray] = None
+        self.alpha: Optional[np.ndarray] = None
+        self.rebuild_count = 0
+
+        # Sparse blend data, derived from color/alpha after each rebuild
+        self._pixels = None
+        self._inv_alpha = None
+        self._premultiplied = None
+
+    def _reset(self, shape: Tuple[int, int]):
+        self.shape = shape
+        self.color = np.zeros((*shape, 3), dtype=np.uint8)
+        self.alpha = np.zeros(shape, dtype=np.uint8)
+
+    def update(self, key: Hashable, shape: Tuple[int, int], draw: Callable[["OverlayLayer"], None]) -> bool:
+        """Redraw the layer with draw(self) if key or shape changed, returns True on rebuild."""
+        if key == self.key and shape == self.shape:
+            return False
+
+        self._reset(shape)
+        draw(self)
+        self.key = key
+        self.rebuild_count += 1
+
+        pixels = np.flatnonzero(self.alpha)
+        alpha = self.alpha.reshape(-1)[pixels].astype(np.uint16)[:, None]
+        self._pixels = pixels
+        self._inv_alpha = 255 - alpha
+        self._premultiplied = self.color.reshape(-1, 3)[pixels].astype(np.uint16) * alpha + 127
+        return True
+
+    def invalidate(self):
+        self.key = None
+
+    def composite(self, frame: np.ndarray) -> np.ndarray:
+        """Blend the layer onto frame in place."""
+        if self._pixels is None or self._pixels.size == 0:
+            return frame
+
+        flat = frame.reshape(-1, 3)
+        under = flat[self._pixels]
+        flat[self._pixels] = (under * self._inv_alpha + self._premultiplied) // 255
+        return frame
+
+    # Drawing helpers, each primitive goes into the color layer and the alpha mask
+    def line(self, pt1, pt2, color, thickness=1, opacity=1.0):
+        cv2.line(self.color, pt1, pt2, color, thickness)
+        cv2.line(self.alpha, pt1, pt2, int(255 * opacity), thickness)
+
+    def circle(self, center, radius, color, thickness=1, opacity=1.0):
+        cv2.circle(self.color, center, radius, color, thickness)
+        cv2.circle(self.alpha, center, radius, int(255 * opacity), thickness)
+
+    def polylines(self, pts, is_closed, color, thickness=1, opacity=1.0):
+        cv2.polylines(self.color, pts, isClosed=is_closed, color=color, thickness=thickness)
+        cv2.polylines(self.alpha, pts, isClosed=is_closed, color=int(255 * opacity), thickness=thickness)
+
+    def put_text(self, text, org, font, font_scale, color, thickness=1, opacity=1.0):
+        cv2.putText(self.color, text, org, font, font_scale, color, thickness)
+        cv2.putText(self.alpha, text, org, font, font_scale, int(255 * opacity), thickness)
@@ -0,0 +1,199 @@
+# * Library imports
+import time
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+# * File imports
+from .color_map import get_palette, COLORMAP_NAMES
+
+RANGE_MODES = ("smoothed", "percentile", "fixed", "minmax")
+
+
+class RenderEngine:
+    def __init__(self, colormap: str = "jet", range_mode: str = "smoothed",
+                 fixed_range: Optional[Tuple[float, float]] = None, smoothing: float = 0.1,
+                 percentiles: Tuple[float, float] = (1.0, 99.0), lut_size: int = 256,
+                 output_size: Tuple[int, int] = (640, 512), sample_step: int = 4):
+        """
+        Colorize thermal frames with a precomputed palette.
+
+        Args:
+            colormap: Palette name, one of COLORMAP_NAMES
+            range_mode: 'smoothed' (EMA of min/max), 'percentile' (EMA of percentiles),
+                'fixed' (fixed_range) or 'minmax' (per-frame, like cv2.NORM_MINMAX)
+            fixed_range: (low, high) display range used in 'fixed' mode
+            smoothing: EMA factor for auto-range, 1.0 disables smoothing
+            percentiles: (low, high) percentiles used in 'percentile' mode
+            lut_size: 256, or 65536 to index raw uint16 counts directly
+            output_size: (width, height) of the rendered image
+            sample_step: Pixel stride used when estimating the auto-range
+        """
+        if range_mode not in RANGE_MODES:
+            raise ValueError(f"Unknown range mode '{range_mode}', expected one of {RANGE_MODES}")
+        if lut_size not in (256, 65536):
+            raise ValueError("lut_size must be 256 or 65536")
+
+        self.colormap = colormap
+        self.range_mode = range_mode
+        self.fixed_range = fixed_range
+        self.smoothing = smoothing
+        self.percentiles = percentiles
+        self.lut_size = lut_size
+        self.output_size = output_size
+        self.sample_step = sample_step
+
+        self.palette = get_palette(colormap, 256)
+        self._user_colormap = np.ascontiguousarray(self.palette.reshape(256, 1, 3))
+        self.display_range: Optional[Tuple[float, float]] = None
+
+        # Raw-count palette, rebuilt only when the display range moves
+        self._raw_palette = None
+        self._raw_palette_key = None
+
+        # Preallocated per-frame buffers, (re)created when the input shape changes
+        self._shape = None
+        self._index = None
+        self._packed = None
+        self._color = None
+        self._output = None
+
+        # Timing
+        self.frames_rendered = 0
+        self.last_render_ms = 0.0
+        self.avg_render_ms = 0.0
+
+    def set_colormap(self, name: str):
+        self.palette = get_palette(name, 256)
+        self._user_colormap = np.ascontiguousarray(self.palette.reshape(256, 1, 3))
+        self.colormap = name
+        self._raw_palette_key = None
+
+    def next_colormap(self) -> str:
+        index = COLORMAP_NAMES.index(self.colormap) if self.colormap in COLORMAP_NAMES else -1
+        self.set_colormap(COLORMAP_NAMES[(index + 1) % len(COLORMAP_NAMES)])
+        return self.colormap
+
+    def set_range_mode(self, mode: str, fixed_range: Optional[Tuple[float, float]] = None):
+        if mode not in RANGE_MODES:
+            raise ValueError(f"Unknown range mode '{mode}', expected one of {RANGE_MODES}")
+        self.range_mode = mode
+        if fixed_range is not None:
+            self.fixed_range = fixed_range
+        elif mode == "fixed" and self.fixed_range is None:
+            # Freeze whatever is currently on screen
+            self.fixed_range = self.display_range
+
+    def next_range_mode(self) -> str:
+        self.set_range_mode(RANGE_MODES[(RANGE_MODES.index(self.range_mode) + 1) % len(RANGE_MODES)])
+        return self.range_mode
+
+    def _allocate(self, shape):
+        width, height = self.output_size
+        self._shape = shape
+        self._index = np.empty(shape, dtype=np.uint8)
+        self._packed = np.empty(shape, dtype=np.uint32)
+        self._color = np.empty((*shape, 3), dtype=np.uint8)
+
+        if (shape[1], shape[0]) == (width, height):
+            self._output = self._color
+        else:
+            self._output = np.empty((height, width, 3), dtype=np.uint8)
+
+    def update_range(self, data: np.ndarray) -> Tuple[float, float]:
+        """Update and return the (low, high) display range for this frame."""
+        if self.range_mode == "fixed" and self.fixed_range is not None:
+            self.display_range = self.fixed_range
+            return self.display_range
+
+        if self.range_mode == "minmax":
+            low, high = self._finite_range(data, float(data.min()), float(data.max()))
+            self.display_range = (low, high)
+            return self.display_range
+
+        sample = data[::self.sample_step, ::self.sample_step]
+        if self.range_mode == "percentile":
+            low, high = np.percentile(sample, self.percentiles)
+            if np.isnan(low) or np.isnan(high):
+                low, high = np.nanpercentile(sample, self.percentiles) if not np.isnan(sample).all() else (0.0, 1.0)
+        else:
+            low, high = self._finite_range(sample, sample.min(), sample.max())
+        low, high = float(low), float(high)
+
+        if self.display_range is None or self.smoothing >= 1.0:
+            self.display_range = (low, high)
+        else:
+            prev_low, prev_high = self.display_range
+            self.display_range = (prev_low + self.smoothing * (low - prev_low),
+                                  prev_high + self.smoothing * (high - prev_high))
+
+        return self.display_range
+
+    @staticmethod
+    def _finite_range(data: np.ndarray, low, high) -> Tuple[float, float]:
+        # min/max return NaN when any pixel is NaN (no value, e.g. outside a sparse ROI), only then
+        # pay for the NaN-aware pass
+        if not (np.isnan(low) or np.isnan(high)):
+            return low, high
+        if np.isnan(data).all():
+            return 0.0, 1.0
+        return float(np.nanmin(data)), float(np.nanmax(data))
+
+    def _get_raw_palette(self, low: float, high: float) -> np.ndarray:
+        # Quantize the key so sub-count range drift doesn't rebuild the 65536 entries
+        key = (self.colormap, round(low), round(high))
+        if key != self._raw_palette_key:
+            counts = np.arange(65536, dtype=np.float32)
+            index = np.clip((counts - low) * (255.0 / max(high - low, 1e-6)), 0, 255).astype(np.uint8)
+            # BGRX entries packed into uint32 so the lookup is a single 1-D gather
+            packed = np.zeros((65536, 4), dtype=np.uint8)
+            packed[:, :3] = self.palette[index]
+            self._raw_palette = packed.view(np.uint32).reshape(65536)
+            self._raw_palette_key = key
+        return self._raw_palette
+
+    def render(self, data: np.ndarray) -> np.ndarray:
+        """
+        Render a raw-count or temperature frame to a BGR image.
+
+        The returned array is an internal buffer that is overwritten by the
+        next call, copy it if it has to outlive the frame.
+        """
+        start = time.perf_counter()
+
+        if data.shape != self._shape:
+            self._allocate(data.shape)
+
+        low, high = self.update_range(data)
+
+        if self.lut_size == 65536 and data.dtype == np.uint16:
+            # Raw counts index the palette directly, no scaling pass
+            np.take(self._get_raw_palette(low, high), data, out=self._packed)
+            bgrx = self._packed.view(np.uint8).reshape(*self._shape, 4)
+            cv2.cvtColor(bgrx, cv2.COLOR_BGRA2BGR, dst=self._color)
+        else:
+            # Scale, offset and saturate to 8 bit in one pass, then apply the palette
+            scale = 255.0 / max(high - low, 1e-6)
+            cv2.addWeighted(data, scale, data, 0, -low * scale, dst=self._index, dtype=cv2.CV_8U)
+            cv2.applyColorMap(self._index, self._user_colormap, dst=self._color)
+
+        if self._output is not self._color:
+            cv2.resize(self._color, self.output_size, dst=self._output)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.last_render_ms = elapsed_ms
+        self.avg_render_ms = elapsed_ms if self.frames_rendered == 0 else \
+            0.95 * self.avg_render_ms + 0.05 * elapsed_ms
+        self.frames_rendered += 1
+
+        return self._output
+
+    def get_stats(self) -> dict:
+        return {
+            "colormap": self.colormap,
+            "range_mode": self.range_mode,
+            "display_range": self.display_range,
+            "frames_rendered": self.frames_rendered,
+            "last_render_ms": self.last_render_ms,
+            "avg_render_ms": self.avg_render_ms,
+        }
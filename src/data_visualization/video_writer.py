@@ -0,0 +1,121 @@
+# * Library imports
+import time
+import queue
+import threading
+import cv2
+import numpy as np
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+
+
+class VideoSegmentWriter(threading.Thread):
+    def __init__(self, output_dir="./data/exports/video", file_prefix="thermal_video", fps: float = 30.0,
+                 segment_seconds: float = 300.0, fourcc: str = "MJPG", max_queue: int = 8):
+        """
+        Encode rendered frames to a rolling set of video files on a worker thread.
+
+        Frames are handed over through a bounded queue. When the encoder falls
+        behind, new frames are dropped instead of blocking the caller.
+
+        The container has a fixed frame rate, while frames arrive only when
+        something new was rendered (a replay or a camera slower than the
+        render rate). Each frame is placed on the fps cadence by its submit
+        time and the last image is repeated over the slots in between, so the
+        video plays back in real time.
+
+        Args:
+            output_dir: Directory where video segments will be saved
+            file_prefix: Prefix for generated filenames
+            fps: Frame rate written to the container, at least the render rate
+            segment_seconds: Wall-clock length of each segment before rotating
+            fourcc: Four character codec code understood by cv2.VideoWriter
+            max_queue: Frames buffered for the encoder before dropping
+        """
+        super().__init__(name="video-writer", daemon=True)
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.file_prefix = file_prefix
+        self.fps = fps
+        self.segment_seconds = segment_seconds
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.extension = ".avi" if fourcc in ("MJPG", "XVID") else ".mp4"
+
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._writer: Optional[cv2.VideoWriter] = None
+        self._segment_start = 0.0
+        self._slots = 0
+        self._last_frame: Optional[np.ndarray] = None
+        self.current_file: Optional[Path] = None
+
+        self.frames_written = 0
+        self.frames_repeated = 0
+        self.frames_dropped = 0
+        self.segments_written = 0
+
+    def submit(self, frame: np.ndarray) -> bool:
+        """Queue a copy of frame for encoding, returns False if it was dropped."""
+        try:
+            self.queue.put_nowait((time.time(), frame.copy()))
+            return True
+        except queue.Full:
+            self.frames_dropped += 1
+            return False
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _generate_filename(self) -> Path:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return self.output_dir / f"{self.file_prefix}_{timestamp}{self.extension}"
+
+    def _open_segment(self, frame: np.ndarray, start_time: float):
+        self._close_segment()
+        height, width = frame.shape[:2]
+        self.current_file = self._generate_filename()
+        self._writer = cv2.VideoWriter(str(self.current_file), self.fourcc, self.fps, (width, height))
+        if not self._writer.isOpened():
+            raise RuntimeError(f"Could not open video writer for {self.current_file}")
+        self._segment_start = start_time
+        self._slots = 0
+        self._last_frame = None
+        print(f"Started video segment: {self.current_file}")
+
+    def _close_segment(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+            self.segments_written += 1
+
+    def run(self):
+        try:
+            while not (self._stop_event.is_set() and self.queue.empty()):
+                try:
+                    timestamp, frame = self.queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+                if self._writer is None or timestamp - self._segment_start >= self.segment_seconds:
+                    self._open_segment(frame, timestamp)
+
+                # Slot of the frame on the container cadence, a frame early for its slot takes the next free one
+                slot = max(round((timestamp - self._segment_start) * self.fps), self._slots)
+                while self._slots < slot and self._last_frame is not None:
+                    self._writer.write(self._last_frame)
+                    self.frames_repeated += 1
+                    self._slots += 1
+                self._writer.write(frame)
+                self._slots = slot + 1
+                self._last_frame = frame
+                self.frames_written += 1
+
+        except Exception as e:
+            print(f"Error in video writer: {e}")
+            import traceback
+            traceback.print_exc()
+
+        finally:
+            self._close_segment()
+            print(f"Video writer stopped. {self.frames_written} frames written, {self.frames_repeated} repeated, "
+                  f"{self.frames_dropped} dropped, {self.segments_written} segments")
@@ -1,47 +1,20 @@
 import numpy as np
 from pathlib import Path
 from datetime import datetime
-import struct
+
+from data_recording import read_file_header, iter_frames
+from data_recording.convert import convert_recording
 
 def read_thermal_recording(filename, export_txt=True):
     frames = []
 
+    # Version 1 (float64 FRAM records) and version 2 (raw uint16 with index) are both supported
     with open(filename, 'rb') as f:
-        # Read and verify header
-        magic = f.read(4)
-        if magic != b'THRM':
-            raise ValueError("Invalid file format - missing THRM magic number")
-
-        version = struct.unpack('i', f.read(4))[0]
+        version = read_file_header(f)["version"]
         print(f"File version: {version}")
 
-        # Read frames
-        while True:
-            # Try to read frame marker
-            marker = f.read(4)
-            if not marker or len(marker) < 4:
-                break  # End of file
-
-            if marker != b'FRAM':
-                print(f"Warning: Expected FRAM marker, got {marker}")
-                break
-
-            # Read frame metadata
-            num_dims = struct.unpack('i', f.read(4))[0]
-            shape = []
-            for _ in range(num_dims):
-                shape.append(struct.unpack('i', f.read(4))[0])
-
-            # Read timestamp
-            timestamp = struct.unpack('d', f.read(8))[0]
-
-            # Read frame number
-            frame_num = struct.unpack('i', f.read(4))[0]
-
-            # Read matrix data
-            matrix_data = np.fromfile(f, dtype=np.float64, count=np.prod(shape)).reshape(shape)
-
-            frames.append((timestamp, frame_num, matrix_data))
+    for timestamp, frame_num, matrix_data in iter_frames(filename):
+        frames.append((timestamp, frame_num, matrix_data))
 
     # Export to text files if requested
     if export_txt:
@@ -76,7 +49,13 @@ def read_thermal_recording(filename, export_txt=True):
         print(f"Text export complete. Metadata saved to: {metadata_file}")
     return frames
 
+def export_binary_to_txt(binary_filename):
+    # Streams frames through a process pool instead of loading the whole recording, returns the stats
+    result = convert_recording(binary_filename, "txt")
+    print(f"\nConversion complete. {result['frames']} frames exported.")
+    return result
+
 def convert_binary_to_txt(binary_filename):
-    frames = read_thermal_recording(binary_filename, export_txt=True)
-    print(f"\nConversion complete. {len(frames)} frames exported.")
-    return frames
\ No newline at end of file
+    # Same export, the frames come back as a lazy iterator, one frame in memory at a time
+    export_binary_to_txt(binary_filename)
+    return iter_frames(binary_filename)
\ No newline at end of file
@@ -1 +1,5 @@
 from .util_functions import timer, repeat
+from .metrics import MetricsRegistry, MetricsReporter, Histogram, metrics
+from .tracing import FrameTracer, tracer
+from .profiler import RuntimeProfiler, runtime_profiler, PROFILE_MODES
+from .pipeline_config import PipelineConfig, load_pipeline_config, STAGES
@@ -0,0 +1,305 @@
+# * Library imports
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Bucket upper bounds in seconds, 4 per octave from 10 µs to ~170 s. A quantile
+# is reported as its bucket's upper bound, at most 19% above the true value.
+BUCKET_BOUNDS = [1e-5 * 2 ** (i / 4) for i in range(97)]
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    __slots__ = ("counts", "total_counts", "count", "total", "max", "window_count", "window_total", "window_max")
+
+    def __init__(self):
+        """Latency distribution in fixed log-spaced buckets, observe() is one bisect and a few adds."""
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.total_counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.window_count = 0
+        self.window_total = 0.0
+        self.window_max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.window_count += 1
+        self.window_total += seconds
+        if seconds > self.window_max:
+            self.window_max = seconds
+
+    def take_window(self) -> dict:
+        """
+        Statistics in ms of the observations since the last call, which start a
+        new window. The total_ keys cover every observation so far.
+        """
+        counts, self.counts = self.counts, [0] * len(self.counts)
+        self.total_counts = [a + b for a, b in zip(self.total_counts, counts)]
+        count, total, peak = self.window_count, self.window_total, self.window_max
+        self.window_count, self.window_total, self.window_max = 0, 0.0, 0.0
+        self.count += count
+        self.total += total
+        self.max = max(self.max, peak)
+
+        stats = {"count": count, "total_count": self.count,
+                 "mean_ms": total / count * 1000 if count else 0.0, "max_ms": peak * 1000}
+        for q in QUANTILES:
+            stats[f"p{int(q * 100)}_ms"] = self._quantile(counts, count, q) * 1000
+        stats["total_mean_ms"] = self.total / self.count * 1000 if self.count else 0.0
+        stats["total_max_ms"] = self.max * 1000
+        for q in QUANTILES:
+            stats[f"total_p{int(q * 100)}_ms"] = self._quantile(self.total_counts, self.count, q) * 1000
+        return stats
+
+    @staticmethod
+    def _quantile(counts: List[int], count: int, q: float) -> float:
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                return BUCKET_BOUNDS[min(i, len(BUCKET_BOUNDS) - 1)]
+        return BUCKET_BOUNDS[-1]
+
+
+class _StageTimer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """
+        Counters, gauges and latency histograms reported by the pipeline stages.
+
+        The hot path only adds to counters and histogram buckets; rates,
+        quantiles and polled values are computed by snapshot(), which the
+        MetricsReporter thread calls about once per second. Stages report
+        from different threads without a lock: each metric is written by one
+        stage, and a snapshot taken mid-update is off by at most one frame.
+
+        Names are "<stage>.<metric>", e.g. "capture.frames" or "process" for
+        the process stage latency.
+        """
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        # Polled by snapshot() only, for values the owner already tracks (queue depths, recorder stats)
+        self.gauge_callbacks: Dict[str, Callable[[], float]] = {}
+        self.sources: Dict[str, Callable[[], dict]] = {}
+
+        self.operations = 0
+        self.operation_cost = None
+        self.started = time.monotonic()
+        self.last_snapshot: Optional[dict] = None
+        self._last_time = self.started
+        self._last_counters: Dict[str, int] = {}
+        self._last_operations = 0
+
+    # * Hot path
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+        self.operations += 1
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+        self.operations += 1
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        return histogram
+
+    def observe(self, name: str, seconds: float):
+        """Add one latency observation in seconds."""
+        self.histogram(name).observe(seconds)
+        self.operations += 1
+
+    def timer(self, name: str) -> _StageTimer:
+        """Context manager observing the time spent in its block."""
+        self.operations += 1
+        return _StageTimer(self.histogram(name))
+
+    # * Polled values
+    def add_gauge(self, name: str, callback: Callable[[], float]):
+        self.gauge_callbacks[name] = callback
+
+    def add_source(self, name: str, callback: Callable[[], dict]):
+        """Numeric values of callback() (a get_stats method) are included as "<name>.<key>"."""
+        self.sources[name] = callback
+
+    def remove(self, name: str):
+        self.gauge_callbacks.pop(name, None)
+        self.sources.pop(name, None)
+
+    # * Reporting
+    def measure_overhead(self, iterations: int = 20000) -> float:
+        """Seconds per hot path call, measured once on a scratch registry."""
+        if self.operation_cost is None:
+            scratch = MetricsRegistry()
+            started = time.perf_counter()
+            for i in range(iterations):
+                scratch.count("frames")
+                scratch.observe("stage", i * 1e-7)
+            self.operation_cost = (time.perf_counter() - started) / (2 * iterations)
+        return self.operation_cost
+
+    def snapshot(self) -> dict:
+        """
+        Current values, rates and the histogram windows since the previous snapshot.
+
+        overhead_pct is the share of one core spent in the registry since the
+        previous snapshot: hot path calls times their measured cost, plus the
+        CPU time of the snapshot itself (thread time, so waiting for the GIL
+        does not count).
+        """
+        operation_cost = self.measure_overhead()
+        started = time.thread_time()
+        now = time.monotonic()
+        elapsed = max(now - self._last_time, 1e-9)
+
+        counters = dict(self.counters)
+        rates = {name: (value - self._last_counters.get(name, 0)) / elapsed for name, value in counters.items()}
+        gauges = dict(self.gauges)
+        for name, callback in list(self.gauge_callbacks.items()):
+            try:
+                gauges[name] = callback()
+            except Exception as e:
+                gauges[name] = None
+                print(f"Metrics gauge {name} failed: {e}")
+        for source, callback in list(self.sources.items()):
+            try:
+                for key, value in callback().items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        gauges[f"{source}.{key}"] = value
+            except Exception as e:
+                print(f"Metrics source {source} failed: {e}")
+        histograms = {name: histogram.take_window() for name, histogram in list(self.histograms.items())}
+
+        operations = self.operations
+        hot_path = (operations - self._last_operations) * operation_cost
+        self._last_time, self._last_counters, self._last_operations = now, counters, operations
+
+        snapshot = {
+            "time": time.time(),
+            "uptime": now - self.started,
+            "interval": elapsed,
+            "counters": counters,
+            "rates": rates,
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+        snapshot["overhead_pct"] = (hot_path + time.thread_time() - started) / elapsed * 100
+        self.last_snapshot = snapshot
+        return snapshot
+
+    def hud_line(self) -> str:
+        """One-line summary of the last snapshot for the on-screen HUD."""
+        snapshot = self.last_snapshot
+        if snapshot is None:
+            return "metrics: waiting for first snapshot"
+
+        rates, gauges, histograms = snapshot["rates"], snapshot["gauges"], snapshot["histograms"]
+        parts = [f"{rates.get('capture.frames', 0.0):.0f} fps"]
+        for stage in ("capture", "process", "render", "export", "record"):
+            if stage in histograms and histograms[stage]["count"]:
+                parts.append(f"{stage} {histograms[stage]['p50_ms']:.1f}/{histograms[stage]['p99_ms']:.1f} ms")
+        if "record.queue_depth" in gauges:
+            parts.append(f"rec q {gauges['record.queue_depth']:.0f}")
+        if "latency.display" in histograms and histograms["latency.display"]["count"]:
+            # Capture to screen age of the sampled frames (util_functions.tracing)
+            age = histograms["latency.display"]
+            parts.append(f"age {age['p50_ms']:.0f}/{age['p99_ms']:.0f} ms")
+        if "record.lag" in histograms and histograms["record.lag"]["count"]:
+            parts.append(f"lag {histograms['record.lag']['p95_ms']:.0f} ms")
+        dropped = sum(value for name, value in snapshot["counters"].items() if name.endswith(".dropped"))
+        parts.append(f"drop {dropped}")
+        written = sum(value for name, value in snapshot["counters"].items() if name.endswith(".bytes"))
+        parts.append(f"{written / 1e6:.1f} MB")
+        parts.append(f"ovh {snapshot['overhead_pct']:.2f}%")
+        return " | ".join(parts)
+
+
+class MetricsReporter(threading.Thread):
+    def __init__(self, registry: MetricsRegistry, path="./data/exports/metrics.json", interval: float = 1.0,
+                 file_interval: float = 5.0, budget_pct: float = 1.0):
+        """
+        Take a registry snapshot every interval and write it as JSON every file_interval.
+
+        The file is replaced atomically, so readers never see a partial
+        snapshot. A warning is printed once if the measured registry overhead
+        exceeds budget_pct.
+
+        Args:
+            registry: Registry to snapshot
+            path: JSON snapshot file, None keeps snapshots in memory only
+            interval: Seconds between snapshots (the HUD refresh rate)
+            file_interval: Seconds between snapshot file writes
+            budget_pct: Overhead in percent of one core that triggers the warning
+        """
+        super().__init__(name="metrics-reporter", daemon=True)
+        self.registry = registry
+        self.path = Path(path) if path is not None else None
+        self.interval = interval
+        self.file_interval = file_interval
+        self.budget_pct = budget_pct
+        self.over_budget = False
+        self._stop_event = threading.Event()
+
+    def write(self, snapshot: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        self.registry.measure_overhead()
+        last_write = time.monotonic()
+        snapshot = None
+        try:
+            while not self._stop_event.wait(self.interval):
+                snapshot = self.registry.snapshot()
+                if snapshot["overhead_pct"] > self.budget_pct and not self.over_budget:
+                    self.over_budget = True
+                    print(f"Warning: metrics overhead {snapshot['overhead_pct']:.2f}% exceeds {self.budget_pct}%")
+
+                if self.path is not None and time.monotonic() - last_write >= self.file_interval:
+                    self.write(snapshot)
+                    last_write = time.monotonic()
+
+        except Exception as e:
+            print(f"Error in metrics reporter: {e}")
+            import traceback
+            traceback.print_exc()
+
+        finally:
+            if self.path is not None:
+                try:
+                    self.write(self.registry.snapshot())
+                except Exception as e:
+                    print(f"Error writing metrics snapshot: {e}")
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,101 @@
+# * Library imports
+import json
+from typing import Dict, Optional
+
+PIPELINE_VERSION = 1
+
+# Stage name -> enabled by default (the interactive setup)
+STAGES: Dict[str, bool] = {
+    "process": True,     # raw counts to °C (ProcessData)
+    "display": True,     # OpenCV view window, keys and polygon editing
+    "video": False,      # rendered heatmap to rolling video files
+    "stream": False,     # MJPEG stream and JSON endpoints (stream_port)
+    "record": False,     # record every raw frame from startup
+    "export": True,      # polygon data files (DataExport)
+    "average": False,    # average temperature chart (matplotlib)
+    "cumulated": False,  # 3D cumulated heat chart (matplotlib, scipy)
+}
+# These read temperatures, so they need the process stage
+NEEDS_PROCESS = ("display", "video", "stream", "export", "average", "cumulated")
+# These feed on the polygon buffer or rendered frames, produced by the DataToImage loop
+NEEDS_VIEW_LOOP = ("display", "video", "stream", "export")
+
+
+class PipelineConfig:
+    def __init__(self, stages: Optional[Dict[str, bool]] = None, stream_port: Optional[int] = None):
+        """
+        Which pipeline stages run.
+
+        Capture always runs. Stages that are off are not constructed, and
+        their modules and heavy imports (matplotlib, scipy) are never loaded,
+        so a headless capture-and-record box only pays for capture, the
+        recorder and what it enables.
+
+        Args:
+            stages: Stage name -> enabled, missing stages keep their STAGES default
+            stream_port: Port of the stream stage
+        """
+        self.stages = dict(STAGES)
+        for name, enabled in (stages or {}).items():
+            self.set(name, enabled)
+        self.stream_port = stream_port
+
+    def set(self, name: str, enabled: bool):
+        if name not in STAGES:
+            raise ValueError(f"Unknown pipeline stage '{name}', choose from {list(STAGES)}")
+        self.stages[name] = bool(enabled)
+
+    def enabled(self, name: str) -> bool:
+        return self.stages[name]
+
+    @property
+    def runs_view_loop(self) -> bool:
+        return any(self.stages[name] for name in NEEDS_VIEW_LOOP)
+
+    @property
+    def needs_charts(self) -> bool:
+        return self.stages["average"] or self.stages["cumulated"]
+
+    def apply_spec(self, spec: str):
+        """
+        Apply a command line stage list.
+
+        "process,record" enables exactly these stages. Entries with a sign
+        change single stages and keep the rest, e.g. "+stream,-export".
+        """
+        entries = [entry.strip() for entry in spec.split(",") if entry.strip()]
+        if any(entry[0] not in "+-" for entry in entries):
+            for name in self.stages:
+                self.stages[name] = False
+        for entry in entries:
+            if entry[0] in "+-":
+                self.set(entry[1:], entry[0] == "+")
+            else:
+                self.set(entry, True)
+
+    def validate(self):
+        """Raise ValueError for stage combinations that cannot work."""
+        if not self.stages["process"]:
+            missing = [name for name in NEEDS_PROCESS if self.stages[name]]
+            if missing:
+                raise ValueError(f"Stages {missing} need the 'process' stage")
+        if self.stages["stream"] and self.stream_port is None:
+            raise ValueError("The 'stream' stage needs a stream_port")
+
+    def describe(self) -> str:
+        return ", ".join(name for name, enabled in self.stages.items() if enabled) or "capture only"
+
+    def to_dict(self) -> dict:
+        return {"version": PIPELINE_VERSION, "stages": dict(self.stages), "stream_port": self.stream_port}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PipelineConfig":
+        return cls(stages=data.get("stages"), stream_port=data.get("stream_port"))
+
+
+def load_pipeline_config(path) -> PipelineConfig:
+    with open(path, "r") as f:
+        data = json.load(f)
+    if data.get("version") != PIPELINE_VERSION:
+        raise ValueError(f"Unsupported pipeline config version {data.get('version')} in {path}")
+    return PipelineConfig.from_dict(data)
@@ -0,0 +1,280 @@
+# * Library imports
+import os
+import sys
+import json
+import time
+import pstats
+import asyncio
+import cProfile
+import threading
+import traceback
+from collections import Counter
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+
+# * File imports
+from .metrics import metrics
+
+PROFILE_MODES = ("sampling", "cprofile")
+
+
+class RuntimeProfiler:
+    def __init__(self, output_dir="./data/exports/profiles", seconds: float = 10.0, mode: str = "sampling",
+                 sample_hz: float = 100.0, top: int = 60):
+        """
+        Profile the running pipeline for a few seconds, without a restart.
+
+        "sampling" records the Python stack of every thread sample_hz times a
+        second (capture loop, display, recorder, encoders) at a cost of well
+        under a millisecond per sample. "cprofile" traces every call on the
+        asyncio loop thread, exact counts but a noticeable slowdown while it
+        runs; it must be started from the loop thread (key, signal or
+        endpoint handlers all are).
+
+        Each run writes profile_<time>/ in output_dir with profile.txt (top
+        functions), samples.folded (sampling, flame graph input) or
+        profile.pstats (cprofile), tasks.txt (asyncio tasks and their
+        stacks), threads.txt (thread stacks at the end) and metrics.json
+        (the latest pipeline metrics snapshot with the stage timings).
+        Started from the loop, a run is stopped on the loop and its files
+        are written in an executor thread, await wait_written() for them.
+
+        Args:
+            output_dir: Directory receiving one folder per run
+            seconds: Default run length
+            mode: Default mode, one of PROFILE_MODES
+            sample_hz: Stack samples per second in sampling mode
+            top: Functions listed in profile.txt
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}")
+        self.output_dir = Path(output_dir)
+        self.seconds = seconds
+        self.mode = mode
+        self.sample_hz = sample_hz
+        self.top = top
+
+        self._lock = threading.Lock()
+        self._active_mode = None
+        self._started = 0.0
+        self._loop = None
+        self._timer = None
+        self._profile = None
+        self._sampler = None
+        self._stop_sampling = threading.Event()
+        self._samples = Counter()
+        self._sample_count = 0
+        self._writing = set()
+        self.last_output: Optional[Path] = None
+
+    @property
+    def active(self) -> bool:
+        return self._active_mode is not None
+
+    def status(self) -> dict:
+        return {
+            "active": self.active,
+            "mode": self._active_mode,
+            "elapsed": time.perf_counter() - self._started if self.active else 0.0,
+            "writing": bool(self._writing),
+            "last_output": str(self.last_output) if self.last_output else None,
+        }
+
+    def start(self, seconds: Optional[float] = None, mode: Optional[str] = None) -> bool:
+        """Start a run that stops itself after seconds, returns False if one is already running."""
+        seconds = seconds or self.seconds
+        mode = mode or self.mode
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}")
+
+        with self._lock:
+            if self.active:
+                return False
+            try:
+                self._loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._loop = None
+            if mode == "cprofile" and self._loop is None:
+                raise RuntimeError("cprofile mode profiles the asyncio loop thread, start it from there")
+
+            self._active_mode = mode
+            self._started = time.perf_counter()
+            if mode == "cprofile":
+                self._profile = cProfile.Profile()
+                self._profile.enable()
+            else:
+                self._samples = Counter()
+                self._sample_count = 0
+                self._stop_sampling.clear()
+                self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+                self._sampler.start()
+
+            if self._loop is not None:
+                self._timer = self._loop.call_later(seconds, self.stop)
+            else:
+                self._timer = threading.Timer(seconds, self.stop)
+                self._timer.daemon = True
+                self._timer.start()
+
+        print(f"Profiling ({mode}) for {seconds:g} s")
+        return True
+
+    def toggle(self, seconds: Optional[float] = None, mode: Optional[str] = None):
+        """Start a run, or end the running one early (key 'f', SIGUSR1)."""
+        if self.active:
+            self.stop()
+        else:
+            self.start(seconds, mode)
+
+    def stop(self) -> Optional[Path]:
+        """
+        End the run and write the results, returns the output folder (None if nothing was running).
+
+        On the asyncio loop only the profiler is stopped and the task stacks
+        are taken, the pstats report and the files are written in an executor
+        thread, so the folder may still be filling when this returns.
+        """
+        with self._lock:
+            mode = self._active_mode
+            if mode is None:
+                return None
+            self._timer.cancel()
+            duration = time.perf_counter() - self._started
+
+            if mode == "cprofile":
+                self._profile.disable()
+            else:
+                self._stop_sampling.set()
+                if self._sampler is not threading.current_thread():
+                    self._sampler.join(timeout=1.0)
+            self._active_mode = None
+            # The next run resets these, the writer keeps its own references
+            run = (mode, duration, self._profile, self._samples, self._sample_count)
+            self._profile = None
+            self._sampler = None
+
+        output = self._output_folder()
+        self.last_output = output
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        # asyncio.all_tasks() belongs on the loop thread, the rest of the report does not
+        tasks = self._tasks_report()
+        if loop is None:
+            self._write_report(output, run, tasks)
+            return output
+        writing = loop.run_in_executor(None, self._write_report, output, run, tasks)
+        self._writing.add(writing)
+        writing.add_done_callback(self._writing.discard)
+        return output
+
+    async def wait_written(self):
+        """Wait until the reports of stopped runs are on disk."""
+        if self._writing:
+            await asyncio.gather(*self._writing, return_exceptions=True)
+
+    # * Sampling
+    def _sample_loop(self):
+        interval = 1.0 / self.sample_hz
+        own = threading.get_ident()
+        while not self._stop_sampling.wait(interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                self._samples[(names.get(ident, str(ident)), tuple(reversed(stack)))] += 1
+            self._sample_count += 1
+
+    def _sampling_report(self, samples: Counter, sample_count: int) -> str:
+        # Self time is the innermost function of a sample, total counts each function once per sample
+        own, total, threads = Counter(), Counter(), Counter()
+        for (thread, stack), count in samples.items():
+            threads[thread] += count
+            if stack:
+                own[(thread, stack[-1])] += count
+            for function in set(stack):
+                total[(thread, function)] += count
+
+        lines = [f"{sample_count} samples at {self.sample_hz:.0f} Hz", "", "Samples per thread:"]
+        lines += [f"  {count:>7}  {thread}" for thread, count in threads.most_common()]
+        for title, counter in (("Self samples", own), ("Total samples (self and callees)", total)):
+            lines += ["", f"{title}:", f"  {'samples':>7}  {'%':>6}  thread / function"]
+            for (thread, function), count in counter.most_common(self.top):
+                share = count / sample_count * 100 if sample_count else 0.0
+                lines.append(f"  {count:>7}  {share:>5.1f}%  {thread} / {function}")
+        return "\n".join(lines) + "\n"
+
+    # * Output
+    def _tasks_report(self) -> str:
+        if self._loop is None:
+            return "No asyncio loop\n"
+        lines = []
+        for task in sorted(asyncio.all_tasks(self._loop), key=lambda task: task.get_name()):
+            coroutine = task.get_coro()
+            lines.append(f"{task.get_name()}: {getattr(coroutine, '__qualname__', coroutine)}"
+                         f"{' (done)' if task.done() else ''}")
+            for frame in task.get_stack(limit=8):
+                lines.append(f"    {frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})")
+        return "\n".join(lines) + "\n"
+
+    def _threads_report(self) -> str:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        lines = []
+        for ident, frame in sys._current_frames().items():
+            lines.append(f"Thread {names.get(ident, ident)}:")
+            lines += [line.rstrip() for line in traceback.format_stack(frame)]
+            lines.append("")
+        return "\n".join(lines) + "\n"
+
+    def _output_folder(self) -> Path:
+        output = self.output_dir / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        suffix = 1
+        # A run still being written has not created its folder yet
+        while output.exists() or output == self.last_output:
+            output = output.with_name(f"{output.name.split('.')[0]}.{suffix}")
+            suffix += 1
+        return output
+
+    def _write_report(self, output: Path, run: tuple, tasks: str):
+        try:
+            self._write(output, *run, tasks)
+            print(f"Profile written to {output}")
+        except Exception as e:
+            print(f"Error writing profile: {e}")
+            traceback.print_exc()
+
+    def _write(self, output: Path, mode: str, duration: float, profile: Optional[cProfile.Profile],
+               samples: Counter, sample_count: int, tasks: str):
+        output.mkdir(parents=True)
+
+        header = f"Runtime profile, {mode}, {duration:.2f} s, {datetime.now().isoformat(timespec='seconds')}\n\n"
+        if mode == "cprofile":
+            profile.dump_stats(output / "profile.pstats")
+            with open(output / "profile.txt", "w") as f:
+                f.write(header)
+                stats = pstats.Stats(profile, stream=f)
+                stats.sort_stats("cumulative").print_stats(self.top)
+                stats.sort_stats("tottime").print_stats(self.top)
+        else:
+            with open(output / "samples.folded", "w") as f:
+                for (thread, stack), count in samples.most_common():
+                    f.write(";".join((thread,) + stack) + f" {count}\n")
+            with open(output / "profile.txt", "w") as f:
+                f.write(header + self._sampling_report(samples, sample_count))
+
+        with open(output / "tasks.txt", "w") as f:
+            f.write(tasks)
+        with open(output / "threads.txt", "w") as f:
+            f.write(self._threads_report())
+        with open(output / "metrics.json", "w") as f:
+            json.dump(metrics.last_snapshot or {}, f, indent=1)
+
+
+runtime_profiler = RuntimeProfiler()
@@ -0,0 +1,48 @@
+# * Library imports
+import time
+from typing import Optional
+
+# * File imports
+from .metrics import MetricsRegistry, metrics
+
+
+class FrameTracer:
+    def __init__(self, registry: MetricsRegistry = metrics, sample_every: int = 8):
+        """
+        Sampled end-to-end frame age, from capture to screen and disk.
+
+        start() stamps every sample_every-th frame with its capture time
+        (perf_counter, one clock for all threads), unsampled frames carry
+        None. The stamp travels with the frame through the buffers; mark()
+        at each boundary records the frame's age into the registry histogram
+        "latency.<path>", which reports p50/p95/p99 per snapshot. Unsampled
+        frames cost one comparison per boundary, so tracing stays on.
+
+        Paths: raw (published to the raw buffer), process, image (picked up by
+        DataToImage), polygon, display (shown or encoded), export and record
+        (handed to the file).
+
+        Args:
+            registry: Registry receiving the latency histograms
+            sample_every: Trace one frame in this many, 0 disables tracing
+        """
+        self.registry = registry
+        self.sample_every = sample_every
+        self._frames = 0
+
+    def start(self) -> Optional[float]:
+        """Capture time stamp for a new frame, None if it is not sampled."""
+        if not self.sample_every:
+            return None
+        self._frames += 1
+        if self._frames % self.sample_every:
+            return None
+        return time.perf_counter()
+
+    def mark(self, path: str, trace: Optional[float]):
+        """Record the age of a traced frame at a boundary, no-op for unsampled frames."""
+        if trace is not None:
+            self.registry.observe(f"latency.{path}", time.perf_counter() - trace)
+
+
+tracer = FrameTracer()
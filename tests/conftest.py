@@ -0,0 +1,14 @@
+# * Library imports
+import sys
+from pathlib import Path
+
+# * File imports
+from fake_pyspin import PySpin
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# The tests run without the Spinnaker SDK; with it installed they still patch the fake in where it matters
+try:
+    import PySpin as _real_pyspin  # noqa: F401
+except ImportError:
+    sys.modules["PySpin"] = PySpin
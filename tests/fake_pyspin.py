@@ -0,0 +1,92 @@
+"""
+Stand-in for the PySpin module, enough of it to import the package and
+drive the calibration code against an in-memory nodemap.
+"""
+# * Library imports
+import types
+
+PySpin = types.ModuleType("PySpin")
+
+
+class SpinnakerException(Exception):
+    pass
+
+
+class FakeNode:
+    def __init__(self, value, writable: bool = True, entries=None):
+        """
+        One camera node, counting reads and writes.
+
+        Args:
+            value: Current value, the entry symbol for enumerations
+            writable: False behaves like a read-only (or currently locked) node
+            entries: Enumeration entry symbol -> integer value
+        """
+        self.value = value
+        self.writable = writable
+        self.entries = entries or {}
+        self.reads = 0
+        self.writes = 0
+
+
+class _Entry:
+    def __init__(self, symbol, value):
+        self.symbol = symbol
+        self.value = value
+
+    def GetSymbolic(self):
+        return self.symbol
+
+    def GetValue(self):
+        return self.value
+
+
+class NodePtr:
+    def __init__(self, node):
+        self.node = node
+
+    def GetValue(self):
+        self.node.reads += 1
+        return self.node.value
+
+    def SetValue(self, value):
+        if not self.node.writable:
+            raise SpinnakerException("Node is not writable")
+        self.node.writes += 1
+        self.node.value = value
+
+    def GetCurrentEntry(self):
+        self.node.reads += 1
+        return _Entry(self.node.value, self.node.entries[self.node.value])
+
+    def GetEntryByName(self, name):
+        return _Entry(name, self.node.entries[name]) if name in self.node.entries else None
+
+    def SetIntValue(self, value):
+        symbols = {number: symbol for symbol, number in self.node.entries.items()}
+        self.SetValue(symbols[value])
+
+
+class FakeNodeMap:
+    def __init__(self, nodes: dict):
+        self.nodes = nodes
+
+    def GetNode(self, name):
+        return self.nodes.get(name)
+
+
+def _target(pointer):
+    return getattr(pointer, "node", pointer)
+
+
+PySpin.SpinnakerException = SpinnakerException
+PySpin.CIntegerPtr = PySpin.CFloatPtr = PySpin.CStringPtr = PySpin.CBooleanPtr = PySpin.CEnumerationPtr = NodePtr
+PySpin.IsAvailable = lambda pointer: _target(pointer) is not None
+PySpin.IsReadable = lambda pointer: _target(pointer) is not None
+PySpin.IsWritable = lambda pointer: _target(pointer) is not None and getattr(_target(pointer), "writable", False)
+PySpin.Camera = type("Camera", (), {})
+PySpin.System = type("System", (), {})
+PySpin.PixelFormat_Mono16 = 17825799
+PySpin.PixelFormat_BGR16 = 35651635
+(PySpin.intfIInteger, PySpin.intfIFloat, PySpin.intfIString, PySpin.intfIBoolean, PySpin.intfICommand,
+ PySpin.intfIEnumeration) = range(6)
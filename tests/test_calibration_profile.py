@@ -0,0 +1,160 @@
+# * Library imports
+import pytest
+
+# * File imports
+from fake_pyspin import PySpin, FakeNode, FakeNodeMap, NodePtr
+from src.calibration import calibration_profile
+from src.calibration.calibration_profile import apply_profile, load_profile, parse_cal_params, PROFILE_VERSION
+from src.calibration.nodemap_snapshot import apply_snapshot
+
+PARAMS = """Integer Width: 640
+Integer WidthMax: 640
+Integer HeightInc: 1
+Float AcquisitionFrameRate: 125.0
+Float PS0FrameRateMin: 1.0
+Float DetectorBias: -199.5
+Integer UserSetLoadDefaultReg: 1
+Float DetectorBiasMinExpr: -250.0
+Integer PixelFormatValConv_ConvertTo: 17825799
+Enum EnumEntry_PixelFormat_Mono16: 17825799
+String DeviceUserID: camera
+"""
+
+
+@pytest.fixture(autouse=True)
+def fake_pyspin(monkeypatch):
+    # Also when the real SDK is installed, the nodemap below only speaks the fake API
+    monkeypatch.setattr(calibration_profile, "PySpin", PySpin)
+    node_types = {section: NodePtr for section in calibration_profile.NODE_TYPES}
+    monkeypatch.setattr(calibration_profile, "NODE_TYPES", node_types)
+
+
+@pytest.fixture
+def params_file(tmp_path):
+    path = tmp_path / "cal_params.txt"
+    path.write_text(PARAMS)
+    return path
+
+
+def test_parse_keeps_only_listed_nodes(params_file):
+    # The dump also holds detector settings and registers, by default only the resolution nodes are taken
+    profile = parse_cal_params(params_file)
+    assert profile["int"] == {"Width": 640}
+    assert not profile["float"]
+
+
+def test_parse_skips_limits_registers_and_unapplied_types(params_file):
+    listed = ("Width", "WidthMax", "HeightInc", "AcquisitionFrameRate", "PS0FrameRateMin",
+              "UserSetLoadDefaultReg", "DetectorBiasMinExpr", "PixelFormatValConv_ConvertTo", "DeviceUserID")
+    profile = parse_cal_params(params_file, listed)
+    assert profile["int"] == {"Width": 640}
+    assert profile["float"] == {"AcquisitionFrameRate": 125.0}
+    assert not profile["enum"] and not profile["str"]
+
+
+def test_only_differing_nodes_are_written():
+    nodes = {
+        "Width": FakeNode(640),
+        "Height": FakeNode(512),
+        "Locked": FakeNode(1, writable=False),
+        "PixelFormat": FakeNode("Mono8", entries={"Mono8": 1, "Mono16": 2}),
+    }
+    profile = {"int": {"Width": 640, "Height": 513, "Locked": 2, "Missing": 3}, "enum": {"PixelFormat": "Mono16"}}
+
+    stats = apply_profile(FakeNodeMap(nodes), profile)
+
+    assert (stats["written"], stats["unchanged"], stats["unavailable"], stats["failed"]) == (2, 1, 2, 0)
+    assert nodes["Width"].writes == 0
+    assert nodes["Height"].value == 513 and nodes["Height"].writes == 1
+    assert nodes["Locked"].value == 1
+    assert nodes["PixelFormat"].value == "Mono16"
+
+    # A camera that already holds the profile is only read
+    again = apply_profile(FakeNodeMap(nodes), profile)
+    assert again["written"] == 0 and again["unchanged"] == 3
+
+
+def test_float_tolerance():
+    nodes = {"Close": FakeNode(125.0 * (1 + 1e-8)), "Far": FakeNode(125.01)}
+
+    stats = apply_profile(FakeNodeMap(nodes), {"float": {"Close": 125.0, "Far": 125.0}})
+
+    assert stats["unchanged"] == 1 and stats["written"] == 1
+    assert nodes["Close"].writes == 0
+    assert nodes["Far"].value == 125.0
+
+
+class GatedNode(FakeNode):
+    """Writable only while another node holds a given value, like Gain under GainAuto."""
+
+    def __init__(self, value, gate: FakeNode, open_value):
+        super().__init__(value)
+        self.gate = gate
+        self.open_value = open_value
+
+    @property
+    def writable(self):
+        return self.gate.value == self.open_value
+
+    @writable.setter
+    def writable(self, value):
+        pass
+
+
+def test_enums_are_written_before_the_nodes_they_unlock():
+    gain_auto = FakeNode("Continuous", entries={"Continuous": 0, "Off": 1})
+    nodes = {"GainAuto": gain_auto, "Gain": GatedNode(1.0, gain_auto, "Off")}
+
+    # Sections in type order would reach Gain while GainAuto still locks it
+    stats = apply_profile(FakeNodeMap(nodes), {"float": {"Gain": 5.0}, "enum": {"GainAuto": "Off"}})
+
+    assert stats["written"] == 2 and stats["retried"] == 0
+    assert nodes["Gain"].value == 5.0
+
+
+def test_locked_nodes_are_retried_after_the_pass():
+    width = FakeNode(640)
+    nodes = {"Width": width, "OffsetX": GatedNode(0, width, 320), "Locked": FakeNode(1, writable=False)}
+
+    stats = apply_profile(FakeNodeMap(nodes), {"int": {"OffsetX": 160, "Width": 320, "Locked": 2}})
+
+    assert (stats["written"], stats["unavailable"], stats["retried"]) == (2, 1, 2)
+    assert nodes["OffsetX"].value == 160
+
+
+def test_snapshot_restores_enums_first():
+    gain_auto = FakeNode("Continuous", entries={"Continuous": 0, "Off": 1})
+    nodes = {"GainAuto": gain_auto, "Gain": GatedNode(1.0, gain_auto, "Off")}
+    snapshot = {"nodes": {"Gain": {"type": "float", "value": 5.0}, "GainAuto": {"type": "enum", "value": "Off"}}}
+
+    stats = apply_snapshot(FakeNodeMap(nodes), snapshot)
+
+    assert stats["written"] == 2 and stats["nodes"] == 2
+    assert nodes["Gain"].value == 5.0
+
+
+def test_cache_hit_and_invalidation(params_file, tmp_path):
+    cache_dir = tmp_path / "cache"
+
+    profile, cached = load_profile(params_file, cache_dir)
+    assert not cached
+    cache_files = list(cache_dir.glob("*.json"))
+    assert len(cache_files) == 1
+
+    again, cached = load_profile(params_file, cache_dir)
+    assert cached and again == profile
+
+    # An edited file has another SHA-256, so it is parsed again into a new cache entry
+    params_file.write_text(PARAMS.replace("Width: 640", "Width: 320"))
+    edited, cached = load_profile(params_file, cache_dir)
+    assert not cached and edited["int"]["Width"] == 320
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+
+def test_cache_from_other_version_is_ignored(params_file, tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    load_profile(params_file, cache_dir)
+
+    monkeypatch.setattr(calibration_profile, "PROFILE_VERSION", PROFILE_VERSION + 1)
+    _, cached = load_profile(params_file, cache_dir)
+    assert not cached